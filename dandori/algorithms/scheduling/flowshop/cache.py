@@ -0,0 +1,238 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+# Thrid-party dependencies
+import numpy as np
+from gstorm import GraphQLType
+from ortools.sat.python.cp_model import CpModel
+# Scheduler dependencies
+from .ignition import ORTuple
+from .recipes import CompiledRecipe, RecipeInstance, create_recipe_instance
+from .store import VariableStore
+
+CACHE_VERSION = 5  # Increase it if the layout of the built models changes
+
+
+def fingerprint(
+        planned: List[Tuple[CompiledRecipe, GraphQLType, List[int]]],
+        plans: List[GraphQLType],
+        optionals: Dict[str, list],
+        pivot: datetime,
+        scale: str,
+        compact: bool = False,
+        lateness: int = 0) -> str:
+    """Content hash of everything the model is built from. Durations are part of the
+    hash, so models built from other linked functions are never reused
+
+    Args:
+        planned (List[Tuple[CompiledRecipe, GraphQLType, List[int]]]): Compiled recipe,
+            order and durations of each recipe instance to be ignited
+        plans (List[GraphQLType]): Fixed plans, stops included
+        optionals (Dict[str, list]): Groups of optional resources by process' code
+        pivot (datetime): Minimal timestamp from which we calculate intervals
+        scale (str): Scale of the time to conver datetimes to integers
+        compact (bool, optional): True if fixed plans are constant intervals. Defaults to False.
+        lateness (int, optional): Time orders may end after their 'endAt'. Defaults to 0.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest
+    """
+    recipes = {}
+    instances = []
+    for compiled, order, durations in planned:
+        code = compiled.recipe.code
+        recipes[code] = (compiled.locked, compiled.names, compiled.optional,
+                         compiled.groups, compiled.resource_names,
+                         compiled.res_indptr, compiled.res_indices, compiled.edges,
+                         compiled.shared_indptr, compiled.shared_indices)
+        instances.append((order.name, order.startAt, order.endAt, code, durations))
+
+    content = (CACHE_VERSION, pivot, scale, compact, lateness, sorted(recipes.items()), instances,
+               [(plan.resource.name, plan.startAt, plan.endAt) for plan in plans],
+               sorted(optionals.items(), key=str))
+    return hashlib.sha256(repr(content).encode()).hexdigest()
+
+
+def index_model(
+        model: CpModel,
+        instances: List[RecipeInstance],
+        store: VariableStore,
+        or_singles: Dict[str, int],
+        or_overlaps: Dict[str, int],
+        or_windows: Dict[str, Tuple[int, int]]) -> Dict[str, Any]:
+    """Map the built model into plain proto indices, so it can be stored along with
+    the model's proto. ORtuples shared between structures are stored once and the
+    store is kept as its arrays
+
+    Args:
+        model (CpModel): CpModel from OR-tools' SAT, already built
+        instances (List[RecipeInstance]): Recipe instances in order of ignition
+        store (VariableStore): Tasks of the model, none of them removed yet
+        or_singles (Dict[str, int]): Index of the single recipe constraint by order
+        or_overlaps (Dict[str, int]): Index of the NoOverlap constraint by resource
+        or_windows (Dict[str, Tuple[int, int]]): Period covered by fixed intervals by resource
+
+    Returns:
+        Dict[str, Any]: Index map of the model
+    """
+    tuples = {}  # id(ORTuple), position
+
+    def position(or_tuple: ORTuple) -> int:
+        if id(or_tuple) not in tuples:
+            tuples[id(or_tuple)] = (len(tuples), tuple(
+                -1 if or_var is None else or_var.Index() for or_var in or_tuple))
+        return tuples[id(or_tuple)][0]
+
+    store.flush()
+    return {
+        "proto": model.Proto().SerializeToString(),
+        "instances": [(instance.or_recipe.Index(),
+                       [position(or_tuple) for or_tuple in instance.or_vars],
+                       [(edge, position(or_tuple)) for edge, or_tuple in instance.or_trans.items()],
+                       [(node, [(position(or_tuple), group) for or_tuple, group in or_alts])
+                        for node, or_alts in instance.or_alts.items()])
+                      for instance in instances],
+        "store": {"table": store.table.tolist(),
+                  "resources": {name: positions.tolist()
+                                for name, positions in store.resources.items()}},
+        "or_singles": dict(or_singles),
+        "or_overlaps": dict(or_overlaps),
+        "or_windows": dict(or_windows),
+        "tuples": [indices for _, indices in sorted(tuples.values())],
+    }
+
+
+def rehydrate_model(
+        model: CpModel,
+        index: Dict[str, Any],
+        planned: List[Tuple[CompiledRecipe, GraphQLType, List[int]]]) -> Dict[str, Any]:
+    """Load the stored proto into the CpModel and bind new recipe instances and
+    ORtuples to its variables. See 'index_model'
+
+    Args:
+        model (CpModel): Empty CpModel from OR-tools' SAT
+        index (Dict[str, Any]): Index map of the model
+        planned (List[Tuple[CompiledRecipe, GraphQLType, List[int]]]): Compiled recipe,
+            order and durations of each recipe instance, in order of ignition
+
+    Returns:
+        Dict[str, Any]: Recipe instances ("instances"), the store ("store") and the
+            same keys of the index map with ORtuples instead of indices
+    """
+    model.Proto().ParseFromString(index["proto"])
+
+    # Variables shared between ORtuples (e.g. the recipe's literal) are bound once
+    variables = {-1: None}
+
+    def variable(position: int):
+        if position not in variables:
+            variables[position] = model.GetIntVarFromProtoIndex(position)
+        return variables[position]
+
+    or_tuples = [ORTuple(active=variable(active), start=variable(start), end=variable(end),
+                         duration=variable(duration),
+                         interval=model.GetIntervalVarFromProtoIndex(interval))
+                 for active, start, end, duration, interval in index["tuples"]]
+
+    instances = []
+    for (compiled, order, durations), (or_recipe, or_vars, or_trans, or_alts) in zip(
+            planned, index["instances"]):
+        instance = create_recipe_instance(compiled, order, durations)
+        instance.or_recipe = variable(or_recipe)
+        instance.or_vars = [or_tuples[position] for position in or_vars]
+        instance.or_trans = {edge: or_tuples[position] for edge, position in or_trans}
+        instance.or_alts = {node: [(or_tuples[position], group) for position, group in alternatives]
+                            for node, alternatives in or_alts}
+        instances.append(instance)
+
+    table = np.array(index["store"]["table"], dtype=np.int64).reshape(-1, 6)
+    store = VariableStore(
+        table=table, removed=np.zeros(len(table), dtype=bool),
+        resources={name: np.array(positions, dtype=np.int64)
+                   for name, positions in index["store"]["resources"].items()})
+
+    return {
+        "instances": instances,
+        "store": store,
+        "or_singles": index["or_singles"],
+        "or_overlaps": index["or_overlaps"],
+        "or_windows": index["or_windows"],
+    }
+
+
+def load_index(directory: str, key: str) -> Optional[Dict[str, Any]]:
+    """Read the index map stored with the given key. Unreadable or corrupt entries
+    are treated as a miss, so the model is built and stored again
+
+    Args:
+        directory (str): Directory of the cache
+        key (str): Fingerprint of the model. See 'fingerprint'
+
+    Returns:
+        Optional[Dict[str, Any]]: Index map of the model, None if it was not stored
+    """
+    path = os.path.join(directory, key)
+    try:
+        with open(f"{path}.json", "r") as stream:
+            index = json.load(stream)
+        with open(f"{path}.pb", "rb") as stream:
+            index["proto"] = stream.read()
+    except (OSError, ValueError, TypeError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != CACHE_VERSION:
+        return None
+
+    # Recently used models are the last ones to be evicted
+    for extension in ["json", "pb"]:
+        os.utime(f"{path}.{extension}")
+    return index
+
+
+def dump_index(directory: str, key: str, index: Dict[str, Any], limit: int = 32) -> None:
+    """Store the index map with the given key: the model's proto as raw bytes and
+    the rest of the map as JSON. Files are replaced atomically, so concurrent runs
+    never read a partial model. The least recently used models are evicted once
+    there are more than 'limit' of them
+
+    Args:
+        directory (str): Directory of the cache, created if it does not exist
+        key (str): Fingerprint of the model. See 'fingerprint'
+        index (Dict[str, Any]): Index map of the model. See 'index_model'
+        limit (int, optional): Maximum number of stored models. Defaults to 32.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    path = os.path.join(directory, key)
+    content = dict(index, version=CACHE_VERSION)
+    proto = content.pop("proto")
+    # The proto goes first, an entry is complete once its JSON map exists
+    for extension, data, mode in [("pb", proto, "wb"), ("json", json.dumps(content), "w")]:
+        with open(f"{path}.{extension}.{os.getpid()}", mode) as stream:
+            stream.write(data)
+        os.replace(f"{path}.{extension}.{os.getpid()}", f"{path}.{extension}")
+    evict_models(directory, limit)
+
+
+def evict_models(directory: str, limit: int) -> None:
+    """Remove the least recently used models of the cache until there are 'limit'
+
+    Args:
+        directory (str): Directory of the cache
+        limit (int): Maximum number of stored models
+    """
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            try:
+                modified = os.path.getmtime(os.path.join(directory, name))
+                entries.append((modified, name[:-len(".json")]))
+            except OSError:  # Evicted by a concurrent run
+                continue
+
+    for _, key in sorted(entries, reverse=True)[limit:]:
+        for extension in ["json", "pb"]:
+            try:
+                os.remove(os.path.join(directory, f"{key}.{extension}"))
+            except OSError:
+                continue
@@ -0,0 +1,90 @@
+from copy import copy
+from collections import defaultdict
+from typing import Callable, List, Tuple
+# Thrid-party dependencies
+from gstorm import GraphQLType
+
+
+def group_campaigns(orders: List[GraphQLType], size: int = None,
+                    fits: Callable[[GraphQLType], bool] = None) -> List[List[GraphQLType]]:
+    """Group the orders of the same material whose windows overlap. Orders are swept
+    by their start and join the open campaign of their material while the intersection
+    of the windows is not empty and the merged work still fits inside it, so every
+    campaign can be fulfilled inside the window of each one of its orders
+
+    Args:
+        orders (List[GraphQLType]): Orders of the demand
+        size (int, optional): Maximum number of orders of a campaign. Defaults to None.
+        fits (Callable[[GraphQLType], bool], optional): True if the merged order of a
+            campaign can be fulfilled inside its window, see 'create_campaign'.
+            Defaults to None, campaigns only need a window.
+
+    Returns:
+        List[List[GraphQLType]]: Orders of each campaign, sorted by their start
+    """
+    materials = defaultdict(list)
+    for order in orders:
+        materials[order.material.name].append(order)
+
+    groups = []
+    for members in materials.values():
+        members.sort(key=lambda order: (order.startAt, order.endAt))
+        campaign, end = [], None
+        for order in members:
+            if campaign and order.startAt < end and (size is None or len(campaign) < size) \
+                    and (fits is None or fits(create_campaign(campaign + [order]))):
+                campaign.append(order)
+                end = min(end, order.endAt)
+                continue
+            if campaign:
+                groups.append(campaign)
+            campaign, end = [order], order.endAt
+        groups.append(campaign)
+    return groups
+
+
+def create_campaign(orders: List[GraphQLType]) -> GraphQLType:
+    """Merge the orders of a campaign into a single order. Its quantity is the sum of
+    the quantities, so the linked functions calculate the durations of the whole
+    campaign, and its window is the intersection of the windows. Orders without
+    quantity or priority count as zero
+
+    Args:
+        orders (List[GraphQLType]): Orders of the campaign, see 'group_campaigns'
+
+    Returns:
+        GraphQLType: New order of the campaign
+    """
+    campaign = copy(orders[0])
+    campaign.code = " + ".join(order.code for order in orders)
+    campaign.name = " + ".join(order.name for order in orders)
+    campaign.quantity = sum(order.quantity or 0 for order in orders)
+    campaign.priority = max(order.priority or 0 for order in orders)
+    campaign.startAt = max(order.startAt for order in orders)
+    campaign.endAt = min(order.endAt for order in orders)
+    return campaign
+
+
+def split_span(orders: List[GraphQLType], start: int,
+               end: int) -> List[Tuple[GraphQLType, float, float]]:
+    """Split the span of a process of a campaign into consecutive spans of its orders,
+    proportional to their quantities (or equal if there are no quantities)
+
+    Args:
+        orders (List[GraphQLType]): Orders of the campaign
+        start (int): Start of the process
+        end (int): End of the process
+
+    Returns:
+        List[Tuple[GraphQLType, float, float]]: Order, start & end of each span
+    """
+    quantities = [order.quantity or 0 for order in orders]
+    if not sum(quantities):
+        quantities = [1] * len(orders)
+
+    spans, total, done = [], sum(quantities), 0
+    for order, quantity in zip(orders, quantities):
+        first = start + (end - start) * done / total
+        done += quantity
+        spans.append((order, first, start + (end - start) * done / total))
+    return spans
@@ -1,73 +1,303 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple
+from itertools import combinations
+from collections import defaultdict
 # Thrid dependencies
-from pydash import group_by
-from networkx import DiGraph
-from ortools.sat.python.cp_model import CpModel
+import numpy as np
+from ortools.sat.python.cp_model import CpModel, Constraint
+# Scheduler dependencies
+from .ignition import ORTuple
+from .recipes import RecipeInstance
+from .store import INTERVAL, VariableStore
 
 
-def add_dependency(model: CpModel, GraphRecipe: DiGraph) -> None:
+def add_dependency(model: CpModel, instance: RecipeInstance) -> None:
     """Constrain for network dependency betweeen processes. In other words,
     if one process must be perfomed before another, this constrain achieve
     thar purpose.
 
     Args:
         model (CpModel): Ortools CpModel containing or_vars variables
-        GraphRecipe (DiGraph): Network dependency graph of the recipe on spot
+        instance (RecipeInstance): Recipe ignited for the order on spot
     """
-    or_recipe = GraphRecipe.graph["or_recipe"]
-    for u, v in GraphRecipe.edges():
-        or_prev = GraphRecipe.nodes[u]["or_vars"]
-        or_next = GraphRecipe.nodes[v]["or_vars"]
+    or_recipe = instance.or_recipe
+    for u, v in instance.template.edges:
+        or_prev = instance.or_vars[u]
+        or_next = instance.or_vars[v]
         model.Add(or_prev.end <= or_next.start
                   ).OnlyEnforceIf(or_recipe)
 
 
-def add_resource_no_overlap(model: CpModel, or_data: Dict[str, list], or_trans: Dict[str, list]) -> None:
+def add_resource_no_overlap(model: CpModel, store: VariableStore) -> Dict[str, int]:
     """Constrains that ensure that just a single process will be performed at any
-    time in any resource.
+    time in any resource. Processes, transitions and fixed plans of each resource
+    are sliced from the store
 
     Args:
         model (CpModel): Ortools CpModel containing or_vars variables
-        or_data (Dict[str, list], optional): Dictionary of ORtuples hashed and
-            group by the name of the resource. Each Ortuple represent a process
-            task. Defaults to defaultdict(list).
-        or_trans (Dict[str, list], optional): Dictionary of ORtuples hashed and
-            group by the name of the resource. Each Ortuple represent a transition
-            between two dependant processes. Defaults to defaultdict(list).
+        store (VariableStore): Tasks of the model grouped by the name of the resource
+
+    Returns:
+        Dict[str, int]: Index of the NoOverlap constraint of each resource
+    """
+    or_overlaps = {}
+    for name in store.names():
+        or_overlaps[name] = len(model.Proto().constraints)
+        model.Proto().constraints.add().no_overlap.intervals.extend(
+            store.column(INTERVAL, store.tasks(name)))
+    return or_overlaps
+
+
+def extend_resource_no_overlap(
+        model: CpModel, or_overlaps: Dict[str, int], store: VariableStore, since: int) -> None:
+    """Add the intervals of new processes and transitions to the NoOverlap constraint
+    of their resources. Resources without constraint get a new one
+
+    Args:
+        model (CpModel): Ortools CpModel containing or_vars variables
+        or_overlaps (Dict[str, int]): Index of the NoOverlap constraint of each resource.
+            See 'add_resource_no_overlap'
+        store (VariableStore): Tasks of the model grouped by the name of the resource
+        since (int): Position of the first new task in the store
     """
-    for name, or_list in or_data.items():
-        or_list += or_trans[name]
-        model.AddNoOverlap([or_tuple.interval for or_tuple in or_list])
+    for name in store.names():
+        intervals = store.column(INTERVAL, store.tasks(name, since=since))
+        if not intervals:
+            continue
+        if name not in or_overlaps:
+            or_overlaps[name] = len(model.Proto().constraints)
+            model.Proto().constraints.add()
+        model.Proto().constraints[or_overlaps[name]].no_overlap.intervals.extend(intervals)
 
 
-def add_optional_process(model: CpModel, GraphRecipe: DiGraph) -> None:
+def add_optional_process(model: CpModel, instance: RecipeInstance) -> None:
     """Constrain for activating one optional processes of a group if the recipe
     were activated. Otherwise none of this optional processes wil be activated
 
     Args:
         model (CpModel): Ortools CpModel containing or_recipe variables
-        GraphRecipe (DiGraph): Network dependency graph of the recipe on spot
+        instance (RecipeInstance): Recipe ignited for the order on spot
     """
     # TODO: como identificar un conjunto de procesos opcionales que pertenecen al mismo proceso?
     # TODO: Lo anterior deberia de ir en el schedule-logic?
-    optional_processes = group_by(
-        [info for _, info in GraphRecipe.nodes(data=True) if info.get("optional")], "group")
-
-    for processes in optional_processes.values():
+    for nodes in instance.template.groups.values():
         # Current recipe was activated, select one optional process per group
-        model.Add(sum(info["or_vars"].active for info in processes) == 1
-                  ).OnlyEnforceIf(GraphRecipe.or_recipe)
+        model.Add(sum(instance.or_vars[node].active for node in nodes) == 1
+                  ).OnlyEnforceIf(instance.or_recipe)
         # Current recipe was not activated, no optional process are activated
-        model.Add(sum(info["or_vars"].active for info in processes) == 0
-                  ).OnlyEnforceIf(GraphRecipe.or_recipe.Not())
+        model.Add(sum(instance.or_vars[node].active for node in nodes) == 0
+                  ).OnlyEnforceIf(instance.or_recipe.Not())
 
 
-def add_single_recipe(model: CpModel, networks: List[DiGraph]) -> None:
+def add_single_recipe(model: CpModel, networks: List[RecipeInstance]) -> Constraint:
     """Constrain for activating just one recipe from the given list of networks
 
     Args:
         model (CpModel): Ortools CpModel containing or_recipe variables
-        networks (List[DiGraph]): List of network dependency graphs which
+        networks (List[RecipeInstance]): List of recipe instances which
             contains or_recipe variables
+
+    Returns:
+        Constraint: Constraint of the order, cleared if the order is removed
+    """
+    return model.Add(sum(instance.or_recipe for instance in networks) == 1)
+
+
+def add_symmetry_breaking(model: CpModel, first: List[RecipeInstance],
+                          second: List[RecipeInstance]) -> List[Constraint]:
+    """Constrains for ordering two interchangeable orders (see 'find_interchangeable'),
+    so the solver does not explore their permutations. The second order never selects
+    an earlier recipe than the first one and, if both select the same recipe, it never
+    starts before the first one
+
+    Args:
+        model (CpModel): Ortools CpModel containing or_vars variables
+        first (List[RecipeInstance]): Recipe instances of the first order
+        second (List[RecipeInstance]): Recipe instances of the second order, ignited
+            from the same templates in the same order
+
+    Returns:
+        List[Constraint]: Constraints of the pair, cleared if some order is removed
+    """
+    constraints = []
+    if len(first) > 1:
+        constraints.append(model.Add(
+            sum(k * instance.or_recipe for k, instance in enumerate(first)) <=
+            sum(k * instance.or_recipe for k, instance in enumerate(second))))
+
+    for prev, post in zip(first, second):
+        # Optional processes may be inactive, the first mandatory one is compared
+        mandatory = [node for node, optional in enumerate(prev.template.optional) if not optional]
+        if not mandatory:
+            continue
+        node = mandatory[0]
+        constraints.append(model.Add(
+            prev.or_vars[node].start <= post.or_vars[node].start
+        ).OnlyEnforceIf([prev.or_recipe, post.or_recipe]))
+    return constraints
+
+
+def add_resource_cumulative(model: CpModel, store: VariableStore,
+                            groups: Dict[str, List[str]]) -> None:
+    """Redundant constrain that sees each group of resources as a single cumulative
+    resource whose capacity is the number of resources of the group. It is implied by
+    the NoOverlap of each resource, but it lets the solver reason about the energy
+    of the whole group
+
+    Args:
+        model (CpModel): Ortools CpModel containing or_vars variables
+        store (VariableStore): Tasks of the model grouped by the name of the resource
+        groups (Dict[str, List[str]]): Names of the resources of each group
     """
-    model.Add(sum(GraphRecipe.graph["or_recipe"] for GraphRecipe in networks) == 1)
+    for names in groups.values():
+        if len(names) < 2:
+            continue
+
+        # Processes performed in many resources of the group demand one unit of each
+        positions, demands = np.unique(np.concatenate([store.tasks(name) for name in names]),
+                                       return_counts=True)
+        if len(positions):
+            model.AddCumulative([model.GetIntervalVarFromProtoIndex(index)
+                                 for index in store.column(INTERVAL, positions)],
+                                demands.tolist(), len(names))
+
+
+def add_energy_bound(model: CpModel, instance: RecipeInstance) -> None:
+    """Redundant constrain for the work of each resource inside a recipe. Mandatory
+    processes performed in the same resource can not overlap, so the span of the
+    recipe is at least the work of its busiest resource. Only added if it is longer
+    than the critical path, which the precedences already imply
+
+    Args:
+        model (CpModel): Ortools CpModel containing or_vars variables
+        instance (RecipeInstance): Recipe ignited for the order on spot
+    """
+    compiled = instance.template
+    mandatory = [node for node in range(compiled.size) if not compiled.optional[node]]
+    if not mandatory:
+        return
+
+    # Resources of alternative groups are not occupied for sure
+    work = defaultdict(int)
+    for node in mandatory:
+        for r, or_tuple in instance.node_tuples(node):
+            if or_tuple is instance.or_vars[node]:
+                work[r] += instance.durations[node]
+    path = max(instance.heads[node] + instance.durations[node] + instance.tails[node]
+               for node in mandatory)
+    energy = max(work.values(), default=0)
+    if energy <= path:
+        return
+
+    starts = [instance.or_vars[node].start for node in mandatory]
+    ends = [instance.or_vars[node].end for node in mandatory]
+    or_first = model.NewIntVar(min(or_var.Proto().domain[0] for or_var in starts),
+                               min(or_var.Proto().domain[-1] for or_var in starts), "")
+    or_last = model.NewIntVar(max(or_var.Proto().domain[0] for or_var in ends),
+                              max(or_var.Proto().domain[-1] for or_var in ends), "")
+    model.AddMinEquality(or_first, starts)
+    model.AddMaxEquality(or_last, ends)
+    model.Add(or_last - or_first >= energy).OnlyEnforceIf(instance.or_recipe)
+
+
+def add_resource_circuit(model: CpModel, or_tuples: List[ORTuple],
+                         arcs: Dict[Tuple[int, int], int]) -> None:
+    """Sequence the processes of a resource through a circuit of successor literals.
+    The resource is the depot of the circuit and inactive processes are skipped through
+    their self-loop. If a process follows another one, it starts after the end of the
+    previous one plus the setup time of the arc. Processes without arc between them
+    can not be consecutive
+
+    Args:
+        model (CpModel): Ortools CpModel containing or_vars variables
+        or_tuples (List[ORTuple]): ORtuples of the processes performed in the resource
+        arcs (Dict[Tuple[int, int], int]): Setup time by pair of positions in 'or_tuples'
+            of processes that can be consecutive
+    """
+    or_empty = model.NewBoolVar("")
+    or_arcs = [(0, 0, or_empty)]
+    for k, or_tuple in enumerate(or_tuples, 1):
+        or_arcs.append((k, k, or_tuple.active.Not()))
+        or_arcs.append((0, k, model.NewBoolVar("")))
+        or_arcs.append((k, 0, model.NewBoolVar("")))
+        # Otherwise active processes could close a circuit without the depot
+        model.AddImplication(or_empty, or_tuple.active.Not())
+
+    for (i, j), setup in arcs.items():
+        or_next = model.NewBoolVar("")
+        or_arcs.append((i + 1, j + 1, or_next))
+        model.Add(or_tuples[j].start >= or_tuples[i].end + setup).OnlyEnforceIf(or_next)
+
+    model.AddCircuit(or_arcs)
+
+
+def add_resource_precedences(model: CpModel, or_tuples: List[ORTuple],
+                             arcs: Dict[Tuple[int, int], int]) -> None:
+    """Setup times between each pair of processes of a resource through a precedence
+    literal: if both are active, one starts after the end of the other one plus the
+    setup time of the arc. Unlike 'add_resource_circuit', setup times are kept between
+    processes which are not consecutive, which is exact if they satisfy the triangle
+    inequality (e.g. setup times that only depend on the next material). Pairs whose
+    intervals can not overlap given their domains get no literal nor constraint
+
+    Args:
+        model (CpModel): Ortools CpModel containing or_vars variables
+        or_tuples (List[ORTuple]): ORtuples of the processes performed in the resource
+        arcs (Dict[Tuple[int, int], int]): Setup time by pair of positions in 'or_tuples'
+            of processes that can be consecutive
+    """
+    # Earliest start and latest end of each process given the domains of its variables
+    starts = [or_tuple.start.Proto().domain[0] for or_tuple in or_tuples]
+    ends = [or_tuple.start.Proto().domain[-1] + or_tuple.duration.Proto().domain[-1]
+            for or_tuple in or_tuples]
+
+    for i, j in combinations(range(len(or_tuples)), 2):
+        prev, post = or_tuples[i], or_tuples[j]
+        forward, backward = arcs.get((i, j)), arcs.get((j, i))
+        # The NoOverlap of the resource already sequences them
+        if not forward and not backward and (i, j) in arcs and (j, i) in arcs:
+            continue
+        # Intervals that can not overlap are sequenced with their setup time by their domains
+        if backward is None and forward is not None and ends[i] + forward <= starts[j]:
+            continue
+        if forward is None and backward is not None and ends[j] + backward <= starts[i]:
+            continue
+
+        both = [prev.active, post.active]
+        if forward is None and backward is None:
+            model.AddBoolOr([prev.active.Not(), post.active.Not()])
+        elif backward is None:
+            model.Add(post.start >= prev.end + forward).OnlyEnforceIf(both)
+        elif forward is None:
+            model.Add(prev.start >= post.end + backward).OnlyEnforceIf(both)
+        else:
+            or_before = model.NewBoolVar("")
+            model.Add(post.start >= prev.end + forward).OnlyEnforceIf(both + [or_before])
+            model.Add(prev.start >= post.end + backward).OnlyEnforceIf(both + [or_before.Not()])
+
+
+def add_fixed_setups(model: CpModel, or_tuples: List[ORTuple], start: int, end: int,
+                     setups: List[int]) -> None:
+    """Setup times after a fixed plan of a resource: each active process either ends
+    before the start of the fixed plan or starts after its end plus the setup time
+    between their materials
+
+    Args:
+        model (CpModel): Ortools CpModel containing or_vars variables
+        or_tuples (List[ORTuple]): ORtuples of the processes performed in the resource
+        start (int): Start of the fixed plan
+        end (int): End of the fixed plan
+        setups (List[int]): Setup time of each process after the fixed plan
+    """
+    for or_tuple, setup in zip(or_tuples, setups):
+        earliest = or_tuple.start.Proto().domain[0]
+        # The NoOverlap of the resource already sequences them, or their domains do
+        if not setup or or_tuple.start.Proto().domain[-1] < end or earliest >= end + setup:
+            continue
+
+        # Ends of absent intervals are free, the earliest end is given by the start
+        if earliest + or_tuple.duration.Proto().domain[0] > start:
+            model.Add(or_tuple.start >= end + setup).OnlyEnforceIf(or_tuple.active)
+        else:
+            or_after = model.NewBoolVar("")
+            model.Add(or_tuple.start >= end + setup).OnlyEnforceIf([or_tuple.active, or_after])
+            model.Add(or_tuple.end <= start).OnlyEnforceIf([or_tuple.active, or_after.Not()])
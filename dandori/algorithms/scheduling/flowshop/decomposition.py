@@ -0,0 +1,140 @@
+from typing import Iterable, List, Set, Tuple
+# Thrid-party dependencies
+from attr import attrib, attrs
+from networkx import Graph, connected_components
+from ortools.sat import cp_model_pb2, sat_parameters_pb2
+from ortools.sat.python.cp_model import CpModel, CpSolver, IntVar
+# Scheduler dependencies
+from dandori.models import Order
+from .recipes import Recetary
+
+
+@attrs
+class ResponseSolver:
+    """Read-only solver built from a CpSolverResponse. It exposes the same reading
+    methods and parameters of CpSolver, so solutions computed in another process
+    (or by LNS) can be translated into plans and inspected after 'run'
+    """
+    response = attrib(factory=cp_model_pb2.CpSolverResponse)
+    parameters = attrib(factory=sat_parameters_pb2.SatParameters)  # Solved with them
+
+    def Value(self, or_var: IntVar) -> int:
+        """Value of the variable in the solution of the response
+
+        Args:
+            or_var (IntVar): OR-tools variable of the model that was solved
+
+        Returns:
+            int: Value of the variable
+        """
+        return self.response.solution[or_var.Index()]
+
+    def ObjectiveValue(self) -> float:
+        """Objective value of the best solution of the response"""
+        return self.response.objective_value
+
+    def BestObjectiveBound(self) -> float:
+        """Best bound of the objective found by the search"""
+        return self.response.best_objective_bound
+
+    def WallTime(self) -> float:
+        """Seconds spent by the search"""
+        return self.response.wall_time
+
+    def ResponseProto(self) -> cp_model_pb2.CpSolverResponse:
+        """Response the solver was built from"""
+        return self.response
+
+    def StatusName(self, status: int = None) -> str:
+        """Name of the status of the response
+
+        Args:
+            status (int, optional): Status to be named. Defaults to the response's status.
+
+        Returns:
+            str: Name of the status
+        """
+        if status is None:
+            status = self.response.status
+        return cp_model_pb2.CpSolverStatus.Name(status)
+
+
+def find_components(orders: List[Order], recetary: Recetary) -> List[Tuple[List[Order], Set[str]]]:
+    """Build the bipartite graph between orders and the resources that any of their
+    recipes may use and split it into connected components. Orders of different
+    components never share a resource, so they can be scheduled independently
+
+    Args:
+        orders (List[Order]): Orders of the demand
+        recetary (Recetary): Registry of compiled recipes
+
+    Returns:
+        List[Tuple[List[Order], Set[str]]]: Orders and names of the resources of each component
+    """
+    Bipartite = Graph()
+
+    for order in orders:
+        Bipartite.add_node(("order", order.name), order=order)
+        for compiled in recetary[order.material.name]:
+            for name in compiled.resource_names:
+                Bipartite.add_edge(("order", order.name), ("resource", name))
+
+    components = []
+    for nodes in connected_components(Bipartite):
+        component = [Bipartite.nodes[node]["order"]
+                     for node in nodes if node[0] == "order"]
+        resources = {name for kind, name in nodes if kind == "resource"}
+        components.append((component, resources))
+    return components
+
+
+def merge_statuses(statuses: Iterable[str]) -> str:
+    """The worst status of the solved parts is the status of the whole program
+
+    Args:
+        statuses (Iterable[str]): Status names of each part
+
+    Returns:
+        str: Status name of the whole program
+    """
+    statuses = set(statuses)
+    for status in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN", "FEASIBLE"]:
+        if status in statuses:
+            return status
+    return "OPTIMAL"
+
+
+def merge_objetives(targets: List[str], values: Iterable[List[float]]) -> List[float]:
+    """Objetives of the whole program from the objetives of its solved parts. Parts
+    share no resource, so the makespan is the latest one of the parts and the rest
+    of the objetives (sums over transitions or orders) are added up
+
+    Args:
+        targets (List[str]): Names of the objetives, see 'OBJETIVES'
+        values (Iterable[List[float]]): Value of each objetive of each part
+
+    Returns:
+        List[float]: Value of each objetive of the whole program
+    """
+    columns = list(zip(*values)) or [()] * len(targets)
+    return [max(column, default=0) if target == "makespan" else sum(column)
+            for target, column in zip(targets, columns)]
+
+
+def solve_model_proto(model_proto: bytes, parameters: bytes) -> bytes:
+    """Solve a serialized CpModel. This function is meant to be run inside a process
+    pool, that's why inputs and output are serialized protos
+
+    Args:
+        model_proto (bytes): Serialized CpModelProto
+        parameters (bytes): Serialized SatParameters
+
+    Returns:
+        bytes: Serialized CpSolverResponse
+    """
+    model = CpModel()
+    model.Proto().ParseFromString(model_proto)
+    solver = CpSolver()
+    solver.parameters.ParseFromString(parameters)
+    solver.Solve(model)
+    return solver.ResponseProto().SerializeToString()
@@ -0,0 +1,55 @@
+from ortools.sat import sat_parameters_pb2
+
+STRATEGIES = sat_parameters_pb2.SatParameters.SearchBranching.keys()
+
+DEFAULT_SEARCH = {
+    "workers": None,  # Available cores
+    "solvertime": None,  # Seconds of wall time, no limit
+    "dettime": None,  # Deterministic time, no limit
+    "gap": 0.0,  # Relative gap between objective and bound
+    "absgap": 0.0,  # Absolute gap between objective and bound
+    "seed": None,  # OR-tools' default seed
+    "strategy": "AUTOMATIC_SEARCH",
+    "first": False,  # Stop after the first solution
+}
+
+PRESETS = {
+    # Lowest latency, the first feasible program is good enough
+    "fast-feasible": {"first": True, "solvertime": 10, "dettime": None, "gap": 0.0},
+    # Spend time closing the gap between objective and bound
+    "quality": {"first": False, "solvertime": 300, "dettime": None, "gap": 0.0},
+    # Same inputs always give the same program, limited by deterministic time
+    "deterministic": {"first": False, "workers": 1, "seed": 0, "solvertime": None, "dettime": 60},
+}
+
+NEIGHBORHOODS = ["window", "resource", "material"]
+
+LNS_SEARCH = {
+    "neighborhoods": NEIGHBORHOODS,  # Used in turns
+    "iterations": 20,
+    "solvertime": 5,  # Seconds of wall time of each iteration
+    "budget": None,  # Seconds of wall time of all the iterations, no limit
+    "size": None,  # Maximum relaxed orders, a fifth of the orders
+    "seed": 0,
+    "log": None,  # Function to output each iteration, 'print' in verbose mode
+}
+
+REDUNDANCIES = [
+    "cumulative",  # Resources of the same type as a single cumulative resource
+    "energy",  # Work of each resource must fit in the span of its order
+]
+
+OBJETIVES = [
+    "makespan",  # End of the last process
+    "transitions",  # Time spent in transitions
+    "tardiness",  # Weighted time orders end after their 'endAt'
+    "earliness",  # Weighted time orders end before their 'endAt'
+    "completion",  # Weighted end of the orders
+]
+
+SOFT_TARGETS = ["tardiness"]  # Objetives activating soft windows, see 'soft_mode'
+
+SEQUENCINGS = [
+    "precedence",  # Precedence literal between each pair of processes of a resource
+    "circuit",  # Successor literals of a circuit through the processes of a resource
+]
@@ -1,55 +1,107 @@
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+from os import cpu_count
 from datetime import datetime
 from collections import defaultdict, namedtuple
 # Thrid-party dependencies
-from networkx import DiGraph
 from gstorm import GraphQLType
-from ortools.sat.python.cp_model import CpModel, IntVar
+from ortools.sat.python.cp_model import CpModel, CpSolver, IntVar
 # Scheduler dependencies
 from dandori.helpers import datetools as dt
 from .objetives import objetive_dict
+from .store import VariableStore
+from .recipes import RecipeInstance
 
 ORTuple = namedtuple("ORTuple", "active start end duration interval")
 
 
-def ignite_recipe(model: CpModel, GraphRecipe: DiGraph, pivot: datetime, scale="hours") -> Dict[str, list]:
+def ignite_search_params(solver: CpSolver, parameters: Dict[str, Any]) -> None:
+    """Set the user parameters into the CpSolver's SatParameters
+
+    Args:
+        solver (CpSolver): CpSolver from OR-tools' SAT
+        parameters (Dict[str, Any]): Dictionary with the keys of 'DEFAULT_SEARCH'.
+            None values leave OR-tools' defaults, except "workers" which defaults
+            to the available cores
+    """
+    or_params = solver.parameters
+    or_params.num_search_workers = parameters["workers"] or cpu_count() or 1
+
+    # Limits of the search
+    if parameters["solvertime"] is not None:
+        or_params.max_time_in_seconds = parameters["solvertime"]
+    if parameters["dettime"] is not None:
+        or_params.max_deterministic_time = parameters["dettime"]
+    or_params.relative_gap_limit = parameters["gap"]
+    or_params.absolute_gap_limit = parameters["absgap"]
+    or_params.stop_after_first_solution = parameters["first"]
+
+    # Search strategy
+    if parameters["seed"] is not None:
+        or_params.random_seed = parameters["seed"]
+    or_params.search_branching = or_params.SearchBranching.Value(parameters["strategy"])
+
+
+def ignite_recipe(model: CpModel, instance: RecipeInstance, pivot: datetime, scale="hours",
+                  optionals: Dict[str, List[List[str]]] = None,
+                  lateness: int = 0) -> Dict[str, list]:
     """This function initialize ortools variables for a recipe given its Network
-    dependency graph
+    dependency graph. Processes with optional groups of resources get an alternative
+    interval per group, sharing the variables of the process' interval but with its
+    own presence. Exactly one group is present if the process is active
 
     Args:
         model (CpModel): CpModel from OR-tools' SAT
-        GraphRecipe (DiGraph): Network Dependency graph from the recipe
-        program (GraphQLType): Main Program of the scheduler
+        instance (RecipeInstance): Recipe ignited for an order
+        pivot (datetime): Minimal timestamp from which we calculate intervals
         scale (str, optional): Scale of the time to conver datetimes to integers. Defaults to "hours".
+        optionals (Dict[str, List[List[str]]], optional): Groups of names of optional
+            resources by process' code. Groups with resources out of the process are
+            ignored. Defaults to None.
+        lateness (int, optional): Time the recipe may end after the order's 'endAt',
+            in units of the scale (soft windows). Defaults to 0.
 
     Returns:
         Dict[str, list]: Data structure that storage all ortools varaibles created
     """
     # Primitive variables
-    recipe = GraphRecipe.graph["recipe"]
-    order = GraphRecipe.graph["order"]
+    recipe = instance.recipe
+    order = instance.order
     start = dt.to_int(order.startAt, pivot, scale)
-    end = dt.to_int(order.endAt, pivot, scale)
+    end = dt.to_int(order.endAt, pivot, scale) + lateness
+
+    # Tight domains given the work to be done before ("head") and after ("tail")
+    # each process. If some process does not fit, the whole recipe is discarded
+    compiled = instance.template
+    domains = [(start + head, end - tail - duration)
+               for head, tail, duration in zip(instance.heads, instance.tails, instance.durations)]
+    fits = all(lower <= upper for lower, upper in domains)
 
     # Ignite data structures
     or_data = defaultdict(list)
     or_recipe = model.NewBoolVar(recipe.code + "_recipe")
-    GraphRecipe.graph["or_recipe"] = or_recipe
+    instance.or_recipe = or_recipe
+
+    if not fits:
+        model.Add(or_recipe == 0)
 
-    for node, info in GraphRecipe.nodes(data=True):
-        ref = f"{recipe.code}_{node}"
-        duration = info["task"].duration
+    for node in range(compiled.size):
+        ref = f"{recipe.code}_{compiled.names[node]}"
+        duration = instance.durations[node]
+        min_start, max_start = domains[node] if fits else (start, end)
+        # Ends of absent intervals are free down to the release of the order, so the
+        # processes of inactive recipes never raise the makespan
+        max_end = max_start + duration if fits else end
 
         # If it is an optional process, it has its own or_active
-        if info["task"].optional:
+        if compiled.optional[node]:
             or_active = model.NewBoolVar(ref + '_active')
         # Otherwise, if the or_recipe is activated, all non-optional processes will be activated
         else:
             or_active = or_recipe
 
         # Ortools variables
-        or_start = model.NewIntVar(start, end, f"{ref}_start")
-        or_end = model.NewIntVar(start, end, f"{ref}_end")
+        or_start = model.NewIntVar(min_start, max_start, f"{ref}_start")
+        or_end = model.NewIntVar(start, max_end, f"{ref}_end")
         or_duration = model.NewIntVar(duration, duration, f"{ref}_duration")
         or_interval = model.NewOptionalIntervalVar(
             or_start,
@@ -66,9 +118,30 @@ def ignite_recipe(model: CpModel, GraphRecipe: DiGraph, pivot: datetime, scale="
             interval=or_interval,
         )
 
-        GraphRecipe.nodes[node]["or_vars"] = or_tuple
-        for resource in info["resources"]:
-            or_data[resource.name].append(or_tuple)
+        instance.or_vars.append(or_tuple)
+
+        # Alternative intervals of the optional groups of resources
+        index = {compiled.resource_names[r]: r for r in compiled.node_resources(node)}
+        groups = [[index[name] for name in group]
+                  for group in (optionals or {}).get(compiled.tasks[node].process.code, [])
+                  if group and all(name in index for name in group)]
+        if groups:
+            or_alts = []
+            for k, group in enumerate(groups):
+                or_present = model.NewBoolVar(f"{ref}_group{k}")
+                or_alts.append((ORTuple(
+                    active=or_present,
+                    start=or_start,
+                    end=or_end,
+                    duration=or_duration,
+                    interval=model.NewOptionalIntervalVar(
+                        or_start, or_duration, or_end, or_present, f"{ref}_group{k}_interval"),
+                ), group))
+            model.Add(sum(or_alt.active for or_alt, _ in or_alts) == or_active)
+            instance.or_alts[node] = or_alts
+
+        for r, or_node in instance.node_tuples(node):
+            or_data[compiled.resource_names[r]].append(or_node)
 
     return or_data
 
@@ -116,12 +189,68 @@ def ignite_program(model: CpModel, program: GraphQLType, pivot: datetime, scale:
     return or_data
 
 
-def ignite_transitions(model: CpModel, GraphRecipe: DiGraph) -> Dict[str, list]:
+def ignite_fixed_intervals(
+        model: CpModel,
+        plans: List[GraphQLType],
+        windows: Dict[str, List[Tuple[int, int]]],
+        pivot: datetime,
+        scale: str = "hours") -> Dict[str, list]:
+    """This function initialize fixed plans (and stops) as constant intervals, so they
+    create no variables at all. Plans of the same resource are merged into blocks and
+    only the parts of the blocks inside the given windows are kept, so the size of the
+    model depends on the orders to be scheduled, not on the history of the program
+
+    Args:
+        model (CpModel): CpModel from OR-tools' SAT
+        plans (List[GraphQLType]): Fixed plans, stops included
+        windows (Dict[str, List[Tuple[int, int]]]): Periods of each resource where
+            the processes of the orders may be performed
+        pivot (datetime): Minimal timestamp from which we calculate intervals
+        scale (str, optional): Scale of the time to conver datetimes to integers.
+            Defaults to "hours".
+
+    Returns:
+        Dict[str, list]: Data structure that storage all ortools varaibles created.
+            Only the intervals of the ORtuples are set
+    """
+    # Ignite data structures
+    or_data = defaultdict(list)
+    blocks = defaultdict(list)
+
+    for plan in plans:
+        name = plan.resource.name
+        if name in windows:
+            blocks[name].append((dt.to_int(plan.startAt, pivot, scale),
+                                 dt.to_int(plan.endAt, pivot, scale)))
+
+    for name, items in blocks.items():
+        # Overlapping or adjacent plans are merged into a single block
+        items.sort()
+        merged = [list(items[0])]
+        for start, end in items[1:]:
+            if start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        for lower, upper in windows[name]:
+            for start, end in merged:
+                start, end = max(start, lower), min(end, upper)
+                if start >= end:
+                    continue
+                or_interval = model.NewFixedSizeIntervalVar(start, end - start, f"{name}_fixed")
+                or_data[name].append(ORTuple(
+                    active=None, start=None, end=None, duration=None, interval=or_interval))
+
+    return or_data
+
+
+def ignite_transitions(model: CpModel, instance: RecipeInstance) -> Dict[str, list]:
     """This function initialize ortools variables for transitions between dependent processes
 
     Args:
         model (CpModel): CpModel from OR-tools' SAT
-        GraphRecipe (DiGraph): Network Dependency graph from the recipe
+        instance (RecipeInstance): Recipe ignited for an order
 
     Returns:
         Dict[str, list]: Data structure that storage all ortools varaibles created
@@ -129,18 +258,19 @@ def ignite_transitions(model: CpModel, GraphRecipe: DiGraph) -> Dict[str, list]:
     # Ignite data structures
     or_trans = defaultdict(list)
 
-    for u, v in GraphRecipe.edges():
+    compiled = instance.template
+
+    for edge, (u, v) in enumerate(compiled.edges):
         # Are there resources in common?
-        u_resources = GraphRecipe.nodes[u]["resources"]
-        v_resources = GraphRecipe.nodes[v]["resources"]
-        resources = [res for res in u_resources if res in v_resources]
+        resources = compiled.edge_resources(edge)
 
         if not resources:
             continue
+        ref = f"{compiled.names[u]}->{compiled.names[v]}"
 
         # Getting protovariables from u & v
-        or_prev = GraphRecipe.nodes[u]["or_vars"]
-        or_next = GraphRecipe.nodes[v]["or_vars"]
+        or_prev = instance.or_vars[u]
+        or_next = instance.or_vars[v]
         proto_prev = or_prev.start.Proto()
         proto_next = or_next.end.Proto()
 
@@ -149,14 +279,14 @@ def ignite_transitions(model: CpModel, GraphRecipe: DiGraph) -> Dict[str, list]:
         end = max(proto_next.domain[1], proto_next.domain[1])
         duration = (0, end - start)
 
-        # or_start = model.NewIntVar(start, end, f"{u}->{v}_start")
-        # or_end = model.NewIntVar(start, end, f"{u}->{v}_end")
-        or_active = model.NewBoolVar(f"{u}->{v}_active")
+        # or_start = model.NewIntVar(start, end, f"{ref}_start")
+        # or_end = model.NewIntVar(start, end, f"{ref}_end")
+        or_active = model.NewBoolVar(f"{ref}_active")
         or_start = or_prev.end
         or_end = or_next.start
-        or_duration = model.NewIntVar(*duration, f"{u}->{v}_duration")
+        or_duration = model.NewIntVar(*duration, f"{ref}_duration")
         or_interval = model.NewOptionalIntervalVar(or_start, or_duration, or_end, or_active,
-                                                   f"{u}->{v}_interval")
+                                                   f"{ref}_interval")
         or_tuple = ORTuple(
             active=or_active,
             start=or_start,
@@ -170,41 +300,193 @@ def ignite_transitions(model: CpModel, GraphRecipe: DiGraph) -> Dict[str, list]:
             or_active, [or_prev.active, or_next.active])
 
         # Saving ORTuple generated in data structures
-        GraphRecipe.edges[u, v]["or_vars"] = or_tuple
-        for resource in resources:
-            or_trans[resource.name].append(or_tuple)
+        instance.or_trans[edge] = or_tuple
+        for r in resources:
+            or_trans[compiled.resource_names[r]].append(or_tuple)
 
     return or_trans
 
 
+def ignite_hints(model: CpModel, ignitions: Dict[str, list], program: GraphQLType,
+                 pivot: datetime, scale: str = "hours") -> int:
+    """This function seeds the CpModel with hints taken from the plans of a previous
+    program, so the solver can start its search from a known schedule (warm-start).
+    Plans are matched with the recipe instances through the order's name, the
+    recipe's code and the process' name.
+
+    Args:
+        model (CpModel): CpModel from OR-tools' SAT
+        ignitions (Dict[str, list]): Recipe instances grouped by the name of the order
+        program (GraphQLType): Program with the plans to be used as hints
+        pivot (datetime): Minimal timestamp from which we calculate intervals
+        scale (str, optional): Scale of the time to conver datetimes to integers.
+            Defaults to "hours".
+
+    Returns:
+        int: Number of hinted variables
+    """
+    # Index plans of solved orders. Plans of the same process share the interval
+    hinted = {}
+    for plan in program.plans:
+        if not (plan.toSolve and plan.recipe and plan.process):
+            continue
+        hinted[plan.toSolve.name, plan.recipe.code, plan.process.name] = plan
+
+    # Orders which were not scheduled in the program remain without hints
+    orders = {name for name, *_ in hinted}
+    hints = {}
+
+    for name, networks in ignitions.items():
+        if name not in orders:
+            continue
+
+        for instance in networks:
+            code = instance.recipe.code
+            or_recipe = instance.or_recipe
+            plans = [hinted.get((name, code, process))
+                     for process in instance.template.names]
+            selected = any(plans)
+            hints[or_recipe.Index()] = (or_recipe, int(selected))
+
+            if not selected:
+                continue
+
+            for or_tuple, plan in zip(instance.or_vars, plans):
+                # Optional processes have their own activation variable
+                if or_tuple.active is not or_recipe:
+                    hints[or_tuple.active.Index()] = (or_tuple.active, int(bool(plan)))
+                if not plan:
+                    continue
+                start = dt.to_int(plan.startAt, pivot, scale)
+                end = dt.to_int(plan.endAt, pivot, scale)
+                hints[or_tuple.start.Index()] = (or_tuple.start, start)
+                hints[or_tuple.end.Index()] = (or_tuple.end, end)
+
+    # Values out of the variable's domain are not worth hinting
+    count = 0
+    for or_var, value in hints.values():
+        lower, upper = or_var.Proto().domain[0], or_var.Proto().domain[-1]
+        if lower <= value <= upper:
+            model.AddHint(or_var, value)
+            count += 1
+    return count
+
+
 def ignite_optimizator(
         model: CpModel,
-        or_data: Dict[str, list],
-        or_trans: Dict[str, list],
+        store: VariableStore,
         targets: List[str] = None,
-        mode: str = "minimize") -> List[IntVar]:
+        mode: str = "minimize",
+        horizon: Tuple[int, int] = None,
+        ignitions: Dict[str, list] = None,
+        dues: Dict[str, int] = None,
+        lexicographic: bool = False) -> List[IntVar]:
     """This function initialize optimized mode given the target from the user.
 
     Args:
         model (CpModel): CpModel from Ortools' SAT module
-        or_data (Dict[str, list], optional): Data structure with all ortools
-            variables created. Defaults to defaultdict(list).
+        store (VariableStore): Tasks of the model, see 'VariableStore'
         target (str, optional): Name of the objetive to optimize. Defaults to "makespan".
         mode (str, optional): Select "minimize" or "maximize". Defaults to "minimize".
+        horizon (Tuple[int, int], optional): Lower and upper bounds of the program's
+            end. See 'calculate_horizon'. Defaults to None.
+        ignitions (Dict[str, list], optional): Recipe instances grouped by the name
+            of the order, used by the objetives of the orders. Defaults to None.
+        dues (Dict[str, int], optional): Due date of each order in units of the
+            scale. Defaults to None.
+        lexicographic (bool, optional): True if only the first objetive is optimized,
+            see 'ignite_lexicographic_stage'. Defaults to False.
 
     Returns:
         IntVar: OR-tools IntVar that reflect the objetive value
     """
     if targets is None:
         targets = ["makespan"]
-    # TODO: Investigar si se puede acotar de una forma eficiente el intervalo del target
     # TODO: Programar una función que te dé la ecuación a optimizar
     # TODO: Programar un set de optimizadores predefinidos como el makespan
-    or_targets = [objetive_dict[target](model, or_data, or_trans)
+    or_targets = [objetive_dict[target](model, store, horizon=horizon,
+                                        ignitions=ignitions, dues=dues)
                   for target in targets]
+    or_objetive = or_targets[:1] if lexicographic else or_targets
 
     if mode == "minimize":
-        model.Minimize(sum(or_targets))
+        model.Minimize(sum(or_objetive))
     else:  # "maximize"
-        model.Maximize(sum(or_targets))
+        model.Maximize(sum(or_objetive))
     return or_targets
+
+
+def ignite_lexicographic_stage(model: CpModel, or_targets: List[IntVar], stage: int,
+                               mode: str = "minimize", solution: List[int] = None) -> Optional[int]:
+    """This function prepares the CpModel for a stage of a lexicographic optimization,
+    where the objetives are optimized one after another in priority order. The value
+    of the previous objetive in its solution becomes a bound and the whole solution
+    is hinted, so the solver starts each stage from a feasible solution
+
+    Args:
+        model (CpModel): CpModel from OR-tools' SAT
+        or_targets (List[IntVar]): Objetive variables in priority order
+        stage (int): Index of the objetive to be optimized
+        mode (str, optional): Select "minimize" or "maximize". Defaults to "minimize".
+        solution (List[int], optional): Value of each variable in the solution of the
+            previous stage. Not used in the first stage. Defaults to None.
+
+    Returns:
+        Optional[int]: Index of the constraint bounding the previous objetive, None
+            in the first stage
+    """
+    or_target = or_targets[stage]
+    if not stage:
+        if mode == "minimize":
+            model.Minimize(or_target)
+        else:  # "maximize"
+            model.Maximize(or_target)
+        return None
+
+    or_last = or_targets[stage - 1]
+    value = solution[or_last.Index()]
+    if mode == "minimize":
+        or_bound = model.Add(or_last <= value)
+        model.Minimize(or_target)
+    else:  # "maximize"
+        or_bound = model.Add(or_last >= value)
+        model.Maximize(or_target)
+
+    model.ClearHints()
+    proto = model.Proto()
+    proto.solution_hint.vars.extend(range(len(solution)))
+    proto.solution_hint.values.extend(solution)
+    return or_bound.Index()
+
+
+def ignite_solution_hints(model: CpModel, ignitions: Dict[str, list], solution: List[int]) -> int:
+    """This function replaces the hints of the CpModel with the recipes and optional
+    processes activated in a previous solution of the same model. Start & end times
+    are not hinted: once the demand changes they usually conflict with the new
+    orders, and repairing them is slower than searching them again.
+
+    Args:
+        model (CpModel): CpModel from OR-tools' SAT
+        ignitions (Dict[str, list]): Recipe instances grouped by the name of the order
+        solution (List[int]): Value of each variable of the model when it was solved.
+            Variables created after it remain without hints
+
+    Returns:
+        int: Number of hinted variables
+    """
+    proto = model.Proto()
+    del proto.solution_hint.vars[:]
+    del proto.solution_hint.values[:]
+
+    hints = {}
+    for networks in ignitions.values():
+        for instance in networks:
+            or_tuples = list(instance.or_vars) + list(instance.or_trans.values()) + \
+                [or_alt for or_alts in instance.or_alts.values() for or_alt, _ in or_alts]
+            for or_var in [instance.or_recipe] + [or_tuple.active for or_tuple in or_tuples]:
+                if or_var.Index() < len(solution):
+                    hints[or_var.Index()] = solution[or_var.Index()]
+
+    proto.solution_hint.vars.extend(hints)
+    proto.solution_hint.values.extend(hints.values())
+    return len(hints)
@@ -0,0 +1,117 @@
+from random import Random
+from typing import Dict, List, Set
+# Thrid-party dependencies
+from ortools.sat import cp_model_pb2
+from ortools.sat.python.cp_model import CpSolver
+# Scheduler dependencies
+from .globals import NEIGHBORHOODS
+from .recipes import RecipeInstance
+
+
+def selected_instances(ignitions: Dict[str, List[RecipeInstance]],
+                       solver: CpSolver) -> Dict[str, RecipeInstance]:
+    """Recipe instance activated for each order in the solution
+
+    Args:
+        ignitions (Dict[str, List[RecipeInstance]]): Recipe instances grouped by the name
+            of the order
+        solver (CpSolver): OR-tools instance to view the value of the CpModel's variables
+
+    Returns:
+        Dict[str, RecipeInstance]: Activated instance by the name of the order
+    """
+    return {name: instance
+            for name, networks in ignitions.items()
+            for instance in networks if solver.Value(instance.or_recipe)}
+
+
+def select_neighborhood(
+        kind: str,
+        selected: Dict[str, RecipeInstance],
+        solver: CpSolver,
+        size: int,
+        rng: Random) -> Set[str]:
+    """Select the orders to be relaxed. A neighborhood is made of the orders whose
+    processes are the closest in time to a random process ("window"), the orders
+    using a random resource ("resource") or the orders of a random material ("material").
+    Neighborhoods are limited to 'size' orders
+
+    Args:
+        kind (str): Type of neighborhood. See 'NEIGHBORHOODS'
+        selected (Dict[str, RecipeInstance]): Activated instance by the name of the order
+        solver (CpSolver): OR-tools instance to view the value of the CpModel's variables
+        size (int): Maximum number of orders to be relaxed
+        rng (Random): Random generator
+
+    Raises:
+        NotImplementedError: If the kind of neighborhood is not implemented
+
+    Returns:
+        Set[str]: Names of the orders to be relaxed
+    """
+    names = sorted(selected)
+    if not names:
+        return set()
+
+    if kind == "window":
+        starts = {name: min(solver.Value(or_tuple.start) for or_tuple in instance.or_vars)
+                  for name, instance in selected.items()}
+        names.sort(key=starts.get)
+        first = rng.randrange(max(1, len(names) - size + 1))
+        return set(names[first:first + size])
+
+    if kind == "resource":
+        resources = {name: set(instance.template.resource_names)
+                     for name, instance in selected.items()}
+        candidates = sorted(set().union(*resources.values()))
+        if not candidates:
+            return set()
+        resource = rng.choice(candidates)
+        names = [name for name in names if resource in resources[name]]
+    elif kind == "material":
+        materials = {instance.order.material.name for instance in selected.values()}
+        material = rng.choice(sorted(materials))
+        names = [name for name in names if selected[name].order.material.name == material]
+    else:
+        raise NotImplementedError(
+            f"neighborhood '{kind}' not implemented. Try one of this: {NEIGHBORHOODS}")
+
+    return set(rng.sample(names, min(size, len(names))))
+
+
+def fix_model_proto(
+        model_proto: cp_model_pb2.CpModelProto,
+        ignitions: Dict[str, List[RecipeInstance]],
+        relaxed: Set[str],
+        solution: List[int]) -> None:
+    """Fix the variables of all the orders but the relaxed ones to their value in
+    the solution, then hint the whole solution
+
+    Args:
+        model_proto (cp_model_pb2.CpModelProto): Copy of the proto of the model
+        ignitions (Dict[str, List[RecipeInstance]]): Recipe instances grouped by the name
+            of the order
+        relaxed (Set[str]): Names of the orders to be relaxed
+        solution (List[int]): Value of each variable of the model
+    """
+    indices = set()
+    for name, networks in ignitions.items():
+        if name in relaxed:
+            continue
+        for instance in networks:
+            indices.add(instance.or_recipe.Index())
+            or_alts = [or_alt for alternatives in instance.or_alts.values()
+                       for or_alt, _ in alternatives]
+            for or_tuple in list(instance.or_vars) + list(instance.or_trans.values()) + or_alts:
+                indices.update(or_var.Index() for or_var in
+                               (or_tuple.active, or_tuple.start, or_tuple.end, or_tuple.duration))
+
+    for index in indices:
+        domain = model_proto.variables[index].domain
+        del domain[:]
+        domain.extend([solution[index], solution[index]])
+
+    del model_proto.solution_hint.vars[:]
+    del model_proto.solution_hint.values[:]
+    model_proto.solution_hint.vars.extend(range(len(solution)))
+    model_proto.solution_hint.values.extend(solution)
@@ -1,34 +1,296 @@
-from typing import Dict
-from ortools.sat.python.cp_model import CpModel, IntVar
+from typing import Dict, List, Tuple
+from collections import defaultdict
+from ortools.sat.python.cp_model import CpModel, IntVar, LinearExpr
+# Scheduler dependencies
+from .store import DURATION, END, PROCESS, START, TRANSITION, VariableStore
 
 
-def makespan(model: CpModel, or_data: Dict[str, list], or_trans: Dict[str, list], target: str = "makespan") -> IntVar:
+def calculate_horizon(ignitions: Dict[str, list]) -> Tuple[int, int]:
+    """Calculate lower and upper bounds for the end of the program from the domains
+    of the recipes' variables. The lower bound is the greatest between the earliest
+    end of each order (given its fastest recipe) and the load of the mandatory
+    processes of each resource.
+
+    Args:
+        ignitions (Dict[str, list]): Recipe instances grouped by the name of the order
+
+    Returns:
+        Tuple[int, int]: Lower and upper bounds of the program's end
+    """
+    lower, upper = 0, 0
+    loads = defaultdict(list)
+
+    for networks in ignitions.values():
+        ends = []
+        for instance in networks:
+            compiled = instance.template
+            # Ends of absent intervals are free, the earliest end of a process is
+            # given by its start. Optional processes may not be performed at all
+            ends.append(max((instance.or_vars[node].start.Proto().domain[0] +
+                             instance.durations[node] for node in range(compiled.size)
+                             if not compiled.optional[node]), default=0))
+            upper = max([upper] + [or_tuple.end.Proto().domain[-1]
+                                   for or_tuple in instance.or_vars])
+
+            # Processes of an order with a single recipe will be always performed
+            if len(networks) > 1:
+                continue
+            for node in range(compiled.size):
+                if compiled.optional[node]:
+                    continue
+                # Resources of alternative groups are not occupied for sure
+                for r, or_tuple in instance.node_tuples(node):
+                    if or_tuple is instance.or_vars[node]:
+                        loads[compiled.resource_names[r]].append(or_tuple)
+
+        lower = max(lower, min(ends))
+
+    # Mandatory processes of a resource can not overlap between them
+    for or_list in loads.values():
+        release = min(or_tuple.start.Proto().domain[0] for or_tuple in or_list)
+        work = sum(or_tuple.duration.Proto().domain[0] for or_tuple in or_list)
+        lower = max(lower, release + work)
+
+    return lower, max(lower, upper)
+
+
+def resource_windows(model: CpModel, store: VariableStore,
+                     since: int = 0) -> Dict[str, Tuple[int, int]]:
+    """Calculate the period of each resource where processes may be performed from
+    the domains of their variables. Transitions and fixed plans are not taken into account
+
+    Args:
+        model (CpModel): OR-tools' SAT module.
+        store (VariableStore): Tasks of the model, the processes of each resource are sliced.
+        since (int, optional): Only processes registered from this position on, see
+            'VariableStore.tasks'. Defaults to 0.
+
+    Returns:
+        Dict[str, Tuple[int, int]]: Earliest start and latest end of each resource
+    """
+    variables = model.Proto().variables
+    windows = {}
+    for name in store.names():
+        positions = store.tasks(name, kinds=[PROCESS], since=since)
+        if not len(positions):
+            continue
+        windows[name] = (min(variables[index].domain[0]
+                             for index in store.column(START, positions)),
+                         max(variables[index].domain[-1]
+                             for index in store.column(END, positions)))
+    return windows
+
+
+def makespan(model: CpModel, store: VariableStore, target: str = "makespan",
+             horizon: Tuple[int, int] = None, **kwargs) -> IntVar:
     """Activate makespan objetive
 
     Args:
         model (CpModel): OR-tools' SAT module.
-        or_data (Dict[str, list]): Data structure with all ortools variables created.
+        store (VariableStore): Tasks of the model, the ends of its processes are sliced.
         target (str, optional): Name of the variable. Defaults to "makespan".
+        horizon (Tuple[int, int], optional): Lower and upper bounds of the makespan.
+            If None, they are taken from the domains of the variables. Defaults to None.
 
     Returns:
         IntVar: Ortools variable in charge of tracking makespan
     """
-    or_target = model.NewIntVar(0, 1 << 28, target)
-    model.AddMaxEquality(or_target, [or_tuple.end
-                                     for or_list in or_data.values()
-                                     for or_tuple in or_list if or_tuple.active])
+    indices = store.column(END, store.tasks(kinds=[PROCESS]))
+    domains = [model.Proto().variables[index].domain for index in indices]
+
+    if horizon is None:
+        horizon = (max((domain[0] for domain in domains), default=0),
+                   max((domain[-1] for domain in domains), default=0))
+
+    or_target = model.NewIntVar(*horizon, target)
+    model.AddMaxEquality(or_target, [model.GetIntVarFromProtoIndex(index) for index in indices])
+    return or_target
+
+
+def transitions(model: CpModel, store: VariableStore, target: str = "transitions",
+                horizon: Tuple[int, int] = None, **kwargs) -> IntVar:
+    """Activate total transitions time objetive
+
+    Args:
+        model (CpModel): OR-tools' SAT module.
+        store (VariableStore): Tasks of the model, the durations of its transitions are sliced.
+        target (str, optional): Name of the variable. Defaults to "transitions".
+        horizon (Tuple[int, int], optional): Not used, total transition time is
+            bounded by the domains of the transitions. Defaults to None.
+
+    Returns:
+        IntVar: Ortools variable in charge of tracking the total transition time
+    """
+    indices = store.column(DURATION, store.tasks(kinds=[TRANSITION]))
+    upper = sum(model.Proto().variables[index].domain[-1] for index in indices)
+
+    or_target = model.NewIntVar(0, upper, target)
+    model.Add(or_target == LinearExpr.Sum(
+        [model.GetIntVarFromProtoIndex(index) for index in indices]))
+    return or_target
+
+
+def order_completions(model: CpModel, ignitions: Dict[str, list]) -> Dict[str, IntVar]:
+    """Completion of each order: the latest end of the final processes (without
+    successors) of its activated recipe. Non-final processes end before them
+
+    Args:
+        model (CpModel): OR-tools' SAT module.
+        ignitions (Dict[str, list]): Recipe instances grouped by the name of the order
+
+    Returns:
+        Dict[str, IntVar]: Ortools variable of the completion by the name of the order
+    """
+    or_completions = {}
+    for name, networks in ignitions.items():
+        or_lasts = []
+        for instance in networks:
+            compiled = instance.template
+            finals = [node for node in range(compiled.size) if not compiled.optional[node] and
+                      compiled.succ_indptr[node] == compiled.succ_indptr[node + 1]]
+            if not finals:
+                continue
+            or_ends = [instance.or_vars[node].end for node in finals]
+            or_last = model.NewIntVar(max(or_end.Proto().domain[0] for or_end in or_ends),
+                                      max(or_end.Proto().domain[-1] for or_end in or_ends), "")
+            model.AddMaxEquality(or_last, or_ends)
+            or_lasts.append((instance.or_recipe, or_last))
+        if not or_lasts:
+            continue
+
+        or_completion = model.NewIntVar(min(or_last.Proto().domain[0] for _, or_last in or_lasts),
+                                        max(or_last.Proto().domain[-1] for _, or_last in or_lasts),
+                                        f"{name}_completion")
+        for or_recipe, or_last in or_lasts:
+            model.Add(or_completion == or_last).OnlyEnforceIf(or_recipe)
+        or_completions[name] = or_completion
+    return or_completions
+
+
+def order_weights(ignitions: Dict[str, list], names: List[str]) -> List[int]:
+    """Weight of each order given its priority. Orders without priority weigh one
+
+    Args:
+        ignitions (Dict[str, list]): Recipe instances grouped by the name of the order
+        names (List[str]): Names of the orders
+
+    Returns:
+        List[int]: Weight of each order
+    """
+    return [max(ignitions[name][0].order.priority or 0, 1) for name in names]
+
+
+def weighted_deviation(model: CpModel, ignitions: Dict[str, list], dues: Dict[str, int],
+                       target: str, late: bool) -> IntVar:
+    """Weighted sum of the time each order is completed after ("late") or before its
+    due date, built as a single weighted sum
+
+    Args:
+        model (CpModel): OR-tools' SAT module.
+        ignitions (Dict[str, list]): Recipe instances grouped by the name of the order
+        dues (Dict[str, int]): Due date of each order in units of the scale
+        target (str): Name of the variable
+        late (bool): True for tardiness, False for earliness
+
+    Returns:
+        IntVar: Ortools variable in charge of tracking the weighted deviation
+    """
+    or_completions = order_completions(model, ignitions)
+    names = sorted(or_completions)
+    sign = 1 if late else -1
+
+    or_deviations, uppers = [], []
+    for name in names:
+        or_completion = or_completions[name]
+        domain = or_completion.Proto().domain
+        uppers.append(max(sign * (domain[0] - dues[name]), sign * (domain[-1] - dues[name]), 0))
+        or_deviation = model.NewIntVar(0, uppers[-1], f"{name}_{target}")
+        model.AddMaxEquality(or_deviation, [sign * (or_completion - dues[name]), 0])
+        or_deviations.append(or_deviation)
+
+    weights = order_weights(ignitions, names)
+    or_target = model.NewIntVar(0, sum(w * u for w, u in zip(weights, uppers)), target)
+    model.Add(or_target == LinearExpr.WeightedSum(or_deviations, weights))
     return or_target
 
 
-def transitions(model: CpModel,  or_data: Dict[str, list], or_trans: Dict[str, list], target="transitions") -> IntVar:
-    or_target = model.NewIntVar(0, 1 << 28, target)
-    model.Add(or_target == sum([or_tuple.duration
-                                for or_list in or_trans.values()
-                                for or_tuple in or_list if or_tuple.active]))
+def tardiness(model: CpModel, store: VariableStore,
+              target: str = "tardiness", horizon: Tuple[int, int] = None,
+              ignitions: Dict[str, list] = None, dues: Dict[str, int] = None, **kwargs) -> IntVar:
+    """Activate total weighted tardiness objetive: time each order is completed after
+    its 'endAt' weighted by its priority. Meant to be used with soft windows
+
+    Args:
+        model (CpModel): OR-tools' SAT module.
+        store (VariableStore): Not used, see 'ignitions'.
+        target (str, optional): Name of the variable. Defaults to "tardiness".
+        horizon (Tuple[int, int], optional): Not used. Defaults to None.
+        ignitions (Dict[str, list], optional): Recipe instances grouped by the name of
+            the order. Defaults to None.
+        dues (Dict[str, int], optional): Due date of each order in units of the scale.
+            Defaults to None.
+
+    Returns:
+        IntVar: Ortools variable in charge of tracking the weighted tardiness
+    """
+    return weighted_deviation(model, ignitions, dues, target, late=True)
+
+
+def earliness(model: CpModel, store: VariableStore,
+              target: str = "earliness", horizon: Tuple[int, int] = None,
+              ignitions: Dict[str, list] = None, dues: Dict[str, int] = None, **kwargs) -> IntVar:
+    """Activate total weighted earliness objetive: time each order is completed before
+    its 'endAt' weighted by its priority (e.g. to reduce inventory)
+
+    Args:
+        model (CpModel): OR-tools' SAT module.
+        store (VariableStore): Not used, see 'ignitions'.
+        target (str, optional): Name of the variable. Defaults to "earliness".
+        horizon (Tuple[int, int], optional): Not used. Defaults to None.
+        ignitions (Dict[str, list], optional): Recipe instances grouped by the name of
+            the order. Defaults to None.
+        dues (Dict[str, int], optional): Due date of each order in units of the scale.
+            Defaults to None.
+
+    Returns:
+        IntVar: Ortools variable in charge of tracking the weighted earliness
+    """
+    return weighted_deviation(model, ignitions, dues, target, late=False)
+
+
+def completion(model: CpModel, store: VariableStore,
+               target: str = "completion", horizon: Tuple[int, int] = None,
+               ignitions: Dict[str, list] = None, **kwargs) -> IntVar:
+    """Activate total weighted completion time objetive, weighted by the priority of
+    each order
+
+    Args:
+        model (CpModel): OR-tools' SAT module.
+        store (VariableStore): Not used, see 'ignitions'.
+        target (str, optional): Name of the variable. Defaults to "completion".
+        horizon (Tuple[int, int], optional): Not used. Defaults to None.
+        ignitions (Dict[str, list], optional): Recipe instances grouped by the name of
+            the order. Defaults to None.
+
+    Returns:
+        IntVar: Ortools variable in charge of tracking the weighted completion time
+    """
+    or_completions = order_completions(model, ignitions)
+    names = sorted(or_completions)
+    weights = order_weights(ignitions, names)
+    or_vars = [or_completions[name] for name in names]
+    lower = sum(w * or_var.Proto().domain[0] for w, or_var in zip(weights, or_vars))
+    upper = sum(w * or_var.Proto().domain[-1] for w, or_var in zip(weights, or_vars))
+
+    or_target = model.NewIntVar(lower, upper, target)
+    model.Add(or_target == LinearExpr.WeightedSum(or_vars, weights))
     return or_target
 
 
 objetive_dict = {
     "makespan": makespan,
     "transitions": transitions,
+    "tardiness": tardiness,
+    "earliness": earliness,
+    "completion": completion,
 }
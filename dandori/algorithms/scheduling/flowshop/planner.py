@@ -1,21 +1,46 @@
-from copy import deepcopy
-from datetime import datetime
+from copy import copy, deepcopy
+from datetime import datetime, timedelta
+from itertools import islice
+from os import cpu_count
+from random import Random
+from time import perf_counter
 from collections import defaultdict
-from typing import Callable, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Set, Tuple
 # * Thrid-party dependencies
 from attr import attrib, attrs
 from gstorm import GraphQLType
 from ortools.sat.python import cp_model
+from google.protobuf.message import DecodeError
 # * Scheduler dependencies
+from dandori.helpers import datetools as dt
 from dandori.helpers import graphtools as gt
 from dandori.helpers import printers as pt
 from dandori.helpers import metadata as mt
-from dandori.models import Program, Demand, Time, FunctionType
-from dandori.validators import valid_demand, valid_stop, valid_recipe, valid_program
+from dandori.models import Program, Demand, Time, FunctionType, evaluate_durations
+from dandori.validators import valid_demand, valid_order, valid_stop, valid_recipe, valid_program, \
+    valid_changeover
 # * Direct dependencies
-from .traductor import insert_plans, insert_stops
-from .ignition import ignite_optimizator, ignite_program, ignite_recipe, ignite_transitions
-from .constrains import add_dependency, add_optional_process, add_resource_no_overlap, add_single_recipe
+from .traductor import Solution, SolutionStreamer, create_program, insert_stops
+from .objetives import calculate_horizon
+from .decomposition import ResponseSolver, find_components, merge_statuses, solve_model_proto
+from .objetives import resource_windows
+from .recipes import CompiledRecipe, Recetary, RecipeInstance, compile_recipe, \
+    create_recipe_instance, find_interchangeable
+from .globals import DEFAULT_SEARCH, LNS_SEARCH, NEIGHBORHOODS, OBJETIVES, PRESETS, REDUNDANCIES, \
+    SEQUENCINGS, SOFT_TARGETS, STRATEGIES
+from .cache import dump_index, fingerprint, index_model, load_index, rehydrate_model
+from .campaigns import create_campaign, group_campaigns
+from .store import VariableStore
+from .lns import fix_model_proto, select_neighborhood, selected_instances
+from . import scenarios as sc
+from .scenarios import Scenario
+from .ignition import ignite_optimizator, ignite_program, ignite_recipe, ignite_transitions, \
+    ignite_hints, ignite_search_params, ignite_solution_hints, ignite_fixed_intervals, \
+    ignite_lexicographic_stage
+from .constrains import add_dependency, add_optional_process, add_resource_no_overlap, \
+    add_single_recipe, add_symmetry_breaking, extend_resource_no_overlap, add_resource_cumulative, \
+    add_energy_bound, add_resource_circuit, add_resource_precedences, add_fixed_setups
 
 
 @attrs
@@ -36,28 +61,62 @@ class FlowShop(object):
     model = attrib(default=None)
     solver = attrib(default=None)
     printer = attrib(default=None)
-    recetary = attrib(factory=lambda: defaultdict(list))  # material.name,[G]
+    recetary = attrib(factory=Recetary)  # recipe.code & material.name, CompiledRecipe
     ignitions = attrib(factory=lambda: defaultdict(list))  # order.name,[G]
-    or_data = attrib(factory=lambda: defaultdict(list))  # resource.name,[G]
-    or_trans = attrib(factory=lambda: defaultdict(list))  # resource.name,[G]
+    store = attrib(factory=VariableStore)  # Processes, transitions & fixed plans in arrays
     optionals = attrib(factory=lambda: defaultdict(list))  # process.code, [[str]]
     funbook = attrib(factory=lambda: defaultdict(Time))
+    changeovers = attrib(factory=dict)  # (process.code, before.code, after.code), Changeover
+    setupfunc = attrib(default=None)
+    sequencing = attrib(default="precedence")
     in_program = attrib(factory=Program)
+    hint_program = attrib(default=None)
     out_program = attrib(factory=Program)
     demand = attrib(factory=Demand)
     pivot = attrib(factory=datetime.utcnow)
     stops = attrib(factory=list)
     targets = attrib(factory=list)
     or_targets = attrib(factory=list)
+    or_singles = attrib(factory=dict)  # order.name, constraint index
+    or_overlaps = attrib(factory=dict)  # resource.name, constraint index
+    or_symmetries = attrib(factory=lambda: defaultdict(list))  # order.name, [constraint index]
+    or_windows = attrib(factory=dict)  # resource.name, (start, end) covered by fixed intervals
+    or_goals = attrib(factory=lambda: range(0))  # Indices of the targets' constraints
+    or_sequences = attrib(factory=lambda: range(0))  # Indices of the sequencing constraints
+    or_redundancies = attrib(factory=lambda: range(0))  # Indices of the redundant constraints
+    or_bounds = attrib(factory=list)  # Indices of the bounds of lexicographic stages
     status = attrib(default="UNKNOWN")
     scale = attrib(default="minutes")
     optim_mode = attrib(default="minimize")
-    batch_mode = attrib(default=False)
+    lexicographic = attrib(default=False)
+    parameters = attrib(factory=lambda: dict(DEFAULT_SEARCH))
+    callback = attrib(default=None)
+    batching = attrib(default=False)
+    batch_size = attrib(default=None)
+    campaigns = attrib(factory=dict)  # campaign.name, [Order]
+    decompose = attrib(default=False)
+    workers = attrib(default=None)
+    components = attrib(factory=list)
+    rolling = attrib(default=False)
+    window = attrib(default=timedelta(days=7))
+    step = attrib(default=timedelta(days=3))
+    lns = attrib(default=False)
+    lns_params = attrib(factory=lambda: dict(LNS_SEARCH))
+    caching = attrib(default=False)
+    cache_dir = attrib(default=None)
+    cache_limit = attrib(default=32)
+    rehydrated = attrib(default=False)
+    symmetry = attrib(default=False)
+    redundancies = attrib(factory=list)
+    compact = attrib(default=False)
+    lateness = attrib(default=None)  # timedelta orders may end after their 'endAt'
 
     def add_optionals(self, orderCode: str, processCode: str, groups: list[list[str]]) -> None:
         """Activate the optional resources constraint liked to the given process.
         This constraint is meant to select in a sigle process just a group of resources
-        in the list given by the user.
+        in the list given by the user. Each group is an alternative interval of the
+        process, exactly one of them is present if the process is performed. Groups
+        apply to the process in every order and recipe
 
         Args:
             orderCode (str): Code of the order which will have this constraint
@@ -80,15 +139,69 @@ class FlowShop(object):
 
         self.stops.extend(stops)
 
+    def add_changeovers(self, changeovers: List[GraphQLType]) -> None:
+        """Add new changeovers between two materials. Processes of each resource
+        with changeovers are sequenced, so a process starts after the end of the
+        previous one plus the setup time of the changeover between their materials
+        (see 'set_changeover_function' & 'set_sequencing'). Processes of the same
+        material or without changeover between their materials have no setup time.
+        The last fixed plan of each resource is the predecessor of the new processes
+        starting after it. Processes placed between earlier fixed plans of the resource
+        have no setup time after them
+
+        Args:
+            changeovers (List[GraphQLType]): List of Schedule-Logic's Changeovers. Each
+                relates the material before & after the setup of its process
+        """
+        # Raise invalid changeovers
+        for changeover in changeovers:
+            valid_changeover(changeover)
+
+        for changeover in changeovers:
+            key = (changeover.process.code, changeover.before.code, changeover.after.code)
+            self.changeovers[key] = changeover
+
+    def set_changeover_function(self, function: Callable) -> None:
+        """Set the function to be called when the model wants to calculate the
+        setup time between two orders (changeover transition), in units of the scale
+
+        Args:
+            function (Callable): Callable funtion. Has to return an integer and have
+                'prev_order', 'next_order' & 'changeover' as inputs
+        """
+        mt.raise_invalid_func(function, FunctionType.CHANGEOVER_COST)
+        self.setupfunc = function
+
+    def set_sequencing(self, sequencing: str) -> None:
+        """Set how setup times are enforced between the processes of a resource.
+        "precedence" keeps them between every pair of processes, which is exact if
+        they satisfy the triangle inequality. "circuit" keeps them only between
+        consecutive processes through successor literals, which is exact for any
+        setup times but much harder to solve. Both are quadratic in the processes of
+        each resource: every pair is checked and "precedence" adds a literal for each
+        pair whose intervals may overlap in either order, "circuit" one per arc
+
+        Args:
+            sequencing (str): Try one of the followings: "precedence", "circuit"
+
+        Raises:
+            NotImplementedError: If the sequencing is not implemented
+        """
+        if sequencing not in SEQUENCINGS:
+            raise NotImplementedError(
+                f"sequencing '{sequencing}' not implemented. Try one of this: {SEQUENCINGS}")
+        self.sequencing = sequencing
+
     def add_recipes(self, recipes: List[GraphQLType], locked: bool = False) -> None:
         """Add a new recipe to be considered as new way to create materials.
-        This recipe will be registered in the recetary
+        This recipe will be registered in the recetary. Recipes whose code is
+        already registered are skipped
 
         Args:
             recipes (GraphQLType): List of Schedule-Logic's Recipes to be added.
                 Each has to have a list of processes conected in DAG form
-            mode (str): Optional default "unlocked". You could choose between
-                "unlock" & "locked"
+            locked (bool): True if transitions between dependent processes
+                must be modeled. Defaults to False.
         """
         # Raise invalid recipe
         for recipe in recipes:
@@ -97,21 +210,19 @@ class FlowShop(object):
         # Register all recipes into the recetary
         for recipe in recipes:
             # Is the recipe already registered?
-            if any(NetTemplate.graph["recipe"].code == recipe.code
-                   for networks in self.recetary.values()
-                   for NetTemplate in networks):
-                return
+            if recipe.code in self.recetary:
+                continue
 
-            # Create graph template for the recipe
+            # Create graph template for the recipe and compile it into flat lists
             NetTemplate = gt.create_network_template(recipe, self.funbook)
-            NetTemplate.graph["locked"] = locked
+            compiled = compile_recipe(NetTemplate, locked)
 
-            # Add the material the recetary and then append recipe graph template for future copies
-            for rel in recipe.recipeMaterials:
-                name = rel.material.name
-                self.recetary[name].append(NetTemplate)
+            # Index the compiled recipe by its code and the materials it produces
+            self.recetary.register(
+                compiled, [rel.material.name for rel in recipe.recipeMaterials])
 
-    def link_function(self, function: Callable, code: str) -> None:
+    def link_function(self, function: Callable, code: str, cache_key: Callable = None,
+                      cache_size: int = 1024, batch: bool = False) -> None:
         """This method links the current callable with identifier 'code' to all
         the Schedule-Logic's Functions with the same code in order to calculate
         process time in a fashinable way.
@@ -120,10 +231,21 @@ class FlowShop(object):
             function (Callable): function to be called during execution, Has to
                 return and integer and have 'order' & 'process' as inputs
             code (str): Identifier of the function
+            cache_key (Callable, optional): Opt-in memoization. Function with 'order'
+                & 'process' as inputs returning a hashable key (e.g. material code and
+                process code); calls with the same key reuse the duration. Memoized
+                durations are kept between runs. Defaults to None.
+            cache_size (int, optional): Maximum number of memoized durations, least
+                recently used ones are evicted. Defaults to 1024.
+            batch (bool, optional): True if the function is vectorized: it has 'orders'
+                & 'processes' arrays as inputs and returns an array of integers. It is
+                called once per run with all the pairs of the code. Defaults to False.
         """
-        mt.raise_invalid_func(function, FunctionType.PROCESS_TIME)
+        mt.raise_invalid_func(function, FunctionType.PROCESS_TIME, batch)
         self.funbook[code].call = function
         self.funbook[code].linked = True
+        self.funbook[code].batch = batch
+        self.funbook[code].memoize(cache_key, cache_size)
 
     def set_scale(self, scale: str) -> None:
         """Set time scale which integer OR-tools variables will be set
@@ -149,6 +271,38 @@ class FlowShop(object):
         mt.raise_invalid_date(pivot)
         self.pivot = pivot
 
+    def set_parameters(self, preset: str = None, **params: Any) -> None:
+        """Update if needed default parameters of OR-tools' CpSolver. A preset replaces
+        the current parameters over the default ones, then the given parameters
+        override it
+
+        Args:
+            preset (str, optional): Named set of parameters, try one of the followings:
+                "fast-feasible", "quality", "deterministic". Defaults to None.
+            **params: Any key of 'DEFAULT_SEARCH': "workers" (defaults to available cores),
+                "solvertime" & "dettime" (limits in seconds), "gap" & "absgap" (relative &
+                absolute gap limits), "seed", "strategy" (SatParameters' SearchBranching)
+                and "first" (stop after the first solution)
+
+        Raises:
+            NotImplementedError: If the preset or the strategy is not implemented
+            KeyError: If some parameter does not exist
+        """
+        if preset is not None and preset not in PRESETS:
+            raise NotImplementedError(
+                f"preset '{preset}' not implemented. Try one of this: {list(PRESETS)}")
+        unknown = [key for key in params if key not in DEFAULT_SEARCH]
+        if unknown:
+            raise KeyError(
+                f"parameters {unknown} do not exist. Try some of this: {list(DEFAULT_SEARCH)}")
+        if params.get("strategy", "AUTOMATIC_SEARCH") not in STRATEGIES:
+            raise NotImplementedError(
+                f"strategy '{params['strategy']}' not implemented. Try one of this: {STRATEGIES}")
+
+        if preset is not None:
+            self.parameters = dict(DEFAULT_SEARCH, **PRESETS[preset])
+        self.parameters.update(params)
+
     def set_demand(self, demand: GraphQLType) -> None:
         """Set the orders to be scheduled for the algorithm. These orders has to have valida data
 
@@ -171,6 +325,35 @@ class FlowShop(object):
         # Copying all program data
         self.in_program = deepcopy(program)
 
+    def set_hint_program(self, program: GraphQLType) -> None:
+        """Set a previous program whose plans will be used as a starting point
+        (warm-start) for the solver. Usually the result of a previous run over
+        almost the same demand.
+
+        Args:
+            program (GraphQLType): Program object with the plans to be hinted
+        """
+        # Raise invalid program
+        valid_program(program)
+        # Plans are only read, there is no need to copy them
+        self.hint_program = program
+
+    def set_solution_callback(self, callback: Callable) -> None:
+        """Set a function to be called on each new solution found while running.
+        It receives a 'Solution' namedtuple with the program of the solution, the
+        objective, the best bound and the wall time in seconds. Not called for the
+        components of the decomposition mode, which are solved in other processes
+
+        Args:
+            callback (Callable): Function with a single 'Solution' as input
+
+        Raises:
+            ValueError: If 'callback' is not callable
+        """
+        if not callable(callback):
+            raise ValueError(f"Instance {callback} is not callable")
+        self.callback = callback
+
     def optimize(self, target: str = "makespan", mode: str = "minimize"):
         """Use this function to activate optimization mode and set objetive variable
 
@@ -179,71 +362,362 @@ class FlowShop(object):
             mode (str, optional): Choose between "minimize" or "maximize". Defaults to "minimize".
 
         Raises:
-            NotImplementedError: If "minimize" nor "maximize" were chosen
+            NotImplementedError: If "minimize" nor "maximize" were chosen or the
+                objetive is not implemented
         """
         if mode not in ["minimize", "maximize"]:
             raise NotImplementedError(
                 f"mode '{mode}' not implemented. Try 'minimize' or 'maximize'.")
+        if target not in OBJETIVES:
+            raise NotImplementedError(
+                f"objetive '{target}' not implemented. Try one of this: {OBJETIVES}")
+
+        # Tardiness is always zero with hard windows
+        if target in SOFT_TARGETS and self.lateness is None:
+            self.soft_mode(True)
 
         self.targets.append(target)
         self.optim_mode = mode
 
+    def __init_state(self):
+        """Forget the model built by a previous run, its components included, so they
+        are neither solved nor merged into the result again
+        """
+        self.model = None
+        self.solver = None
+        self.components = []
+        self.ignitions = defaultdict(list)
+        self.store = VariableStore()
+        self.or_targets = []
+        self.or_singles = {}
+        self.or_overlaps = {}
+        self.or_symmetries = defaultdict(list)
+        self.or_windows = {}
+        self.or_goals = range(0)
+        self.or_sequences = range(0)
+        self.or_redundancies = range(0)
+        self.or_bounds = []
+        self.campaigns = {}
+
     def __init_model(self):
         """Ignite OR-tools' CpModel and CpSolver in order to create a new schedule program
         """
         self.model = cp_model.CpModel()
         self.solver = cp_model.CpSolver()
         self.printer = cp_model.ObjectiveSolutionPrinter()
-        self.solver.parameters.num_search_workers = 6
+        ignite_search_params(self.solver, self.parameters)
 
     def __init_demand(self):
-        """Select all the available recipes for each order and make a Network
-        Depency Graph from GraphTemplate
+        """Select all the available recipes for each order and ignite a recipe
+        instance from each compiled template
+        """
+        self.__ignite_orders(self.__plan_orders(self.__batch_orders()))
+
+    def __batch_orders(self) -> List[GraphQLType]:
+        """Orders of the demand to be ignited. In batch mode, orders of the same material
+        whose windows overlap are merged into campaigns, see 'batch_mode'
+
+        Returns:
+            List[GraphQLType]: Orders and campaigns to be ignited
         """
-        for order in self.demand.orders:
+        if not self.batching:
+            return self.demand.orders
+
+        self.campaigns = {}
+        orders = []
+        for members in group_campaigns(self.demand.orders, self.batch_size, self.__fits):
+            if len(members) == 1:
+                orders.append(members[0])
+                continue
+            campaign = create_campaign(members)
+            self.campaigns[campaign.name] = members
+            orders.append(campaign)
+        return orders
+
+    def __fits(self, order: GraphQLType) -> bool:
+        """Check if some recipe of the order fits in its window given the work to be
+        done before and after each process, as in 'ignite_recipe'
+
+        Args:
+            order (GraphQLType): Order (or campaign) to be ignited
+
+        Returns:
+            bool: True if some recipe would not be discarded
+        """
+        start = dt.to_int(order.startAt, self.pivot, self.scale)
+        end = dt.to_int(order.endAt, self.pivot, self.scale) + self.__lateness()
+        for compiled, _, durations in self.__plan_orders([order]):
+            instance = create_recipe_instance(compiled, order, durations)
+            if all(start + head <= end - tail - duration for head, tail, duration
+                   in zip(instance.heads, instance.tails, instance.durations)):
+                return True
+        return False
+
+    def __plan_orders(
+            self, orders: List[GraphQLType]) -> List[Tuple[CompiledRecipe, GraphQLType, List[int]]]:
+        """Select all the available recipes for each order and calculate the durations
+        of their processes at once, see 'evaluate_durations'
+
+        Args:
+            orders (List[GraphQLType]): Orders to be ignited
+
+        Returns:
+            List[Tuple[CompiledRecipe, GraphQLType, List[int]]]: Compiled recipe, order
+                and durations of each recipe instance to be ignited
+        """
+        ignitions = [(compiled, order)
+                     for order in orders
+                     for compiled in self.recetary[order.material.name]]
+        durations = iter(evaluate_durations([
+            (time, order, task.process)
+            for compiled, order in ignitions
+            for task, time in zip(compiled.tasks, compiled.times)]))
+
+        return [(compiled, order, list(islice(durations, compiled.size)))
+                for compiled, order in ignitions]
+
+    def __ignite_orders(self, planned: List[Tuple[CompiledRecipe, GraphQLType, List[int]]]) -> None:
+        """Ignite a recipe instance for each order and each of its available recipes.
+        Their processes and transitions are registered in the store
+
+        Args:
+            planned (List[Tuple[CompiledRecipe, GraphQLType, List[int]]]): Compiled
+                recipe, order and durations of each instance. See '__plan_orders'
+        """
+        for compiled, order, durations in planned:
             # Ignite all the recipes for this order
-            for NetTemplate in self.recetary[order.material.name]:
-                GraphRecipe = deepcopy(NetTemplate)
-                GraphRecipe.graph["order"] = order
-                gt.calculate_durations(GraphRecipe)
-                self.ignitions[order.name].append(GraphRecipe)
-
-                # Save OR-tools' variables from processes
-                or_output = ignite_recipe(
-                    self.model, GraphRecipe, self.pivot, self.scale)
-                for name, or_tuples in or_output.items():
-                    self.or_data[name].extend(or_tuples)
-
-                # Save OR-tools' variables from transitions
-                if GraphRecipe.graph["locked"]:
-                    or_output = ignite_transitions(self.model, GraphRecipe)
-                    for name, or_tuples in or_output.items():
-                        self.or_trans[name].extend(or_tuples)
+            instance = create_recipe_instance(compiled, order, durations)
+            self.ignitions[order.name].append(instance)
 
-    def __init_program(self):
-        """Set forced ortools variables from program's plans
+            # Save OR-tools' variables from processes
+            self.store.extend(ignite_recipe(
+                self.model, instance, self.pivot, self.scale, self.optionals, self.__lateness()))
+
+            # Save OR-tools' variables from transitions
+            if instance.locked:
+                self.store.extend(ignite_transitions(self.model, instance), transition=True)
+
+    def __init_fixed(self):
+        """Create the output program with the fixed plans and the stops. Plans are
+        only read, so the input program is copied but its plans are not
         """
-        self.out_program = deepcopy(self.in_program)
+        self.out_program = copy(self.in_program)
+        self.out_program.plans = list(self.in_program.plans)
 
         # Initialize stops into program's plans
         insert_stops(self.out_program, self.stops)
 
-        or_output = ignite_program(
-            self.model, self.out_program, self.pivot, self.scale)
-        for name, or_list in or_output.items():
-            self.or_data[name].extend(or_list)
+    def __init_program(self):
+        """Set forced ortools variables from program's plans. In compact mode they
+        are constant intervals inside the windows of the orders of each resource
+        """
+        self.__init_fixed()
+
+        if self.compact:
+            self.or_windows = resource_windows(self.model, self.store)
+            or_output = ignite_fixed_intervals(
+                self.model, self.out_program.plans,
+                {name: [window] for name, window in self.or_windows.items()},
+                self.pivot, self.scale)
+        else:
+            or_output = ignite_program(
+                self.model, self.out_program, self.pivot, self.scale)
+        self.store.extend(or_output)
 
     def __init_constrains(self):
-        """Apply all constrains to or_data
+        """Apply all constrains to the recipe instances and the tasks of the store
         """
+        for name, networks in self.ignitions.items():
+            # One recipe for order
+            self.or_singles[name] = add_single_recipe(self.model, networks).Index()
+            for instance in networks:
+                add_dependency(self.model, instance)  # Processes dependency
+                if instance.template.groups:
+                    add_optional_process(self.model, instance)  # One optional process per group
+        self.or_overlaps = add_resource_no_overlap(self.model, self.store)
+
+    def __init_build(self):
+        """Build the recipes, fixed plans and constrains of the model, or rehydrate
+        them from the cache if caching mode is activated
+        """
+        if self.caching:
+            self.__init_cached()
+            return
+
+        self.__init_demand()
+        self.__init_program()
+        self.__init_constrains()
+
+    def __init_cached(self):
+        """Rehydrate the model stored with the fingerprint of the inputs. On a miss the
+        model is built and stored before hints and targets are added, so runs that
+        only change the solver parameters, hints or targets reuse it
+        """
+        planned = self.__plan_orders(self.__batch_orders())
+        self.__init_fixed()
+        key = fingerprint(planned, self.out_program.plans,
+                          self.optionals, self.pivot, self.scale, self.compact, self.__lateness())
+
+        built = None
+        index = load_index(self.cache_dir, key)
+        if index is not None:
+            try:
+                built = rehydrate_model(self.model, index, planned)
+            except (DecodeError, IndexError, KeyError, TypeError, ValueError):
+                self.model.Proto().Clear()  # Corrupt model, built again as on a miss
+
+        self.rehydrated = built is not None
+        if built is None:
+            self.__ignite_orders(planned)
+            self.__init_program()
+            self.__init_constrains()
+            instances = [instance for networks in self.ignitions.values() for instance in networks]
+            dump_index(self.cache_dir, key, index_model(
+                self.model, instances, self.store, self.or_singles,
+                self.or_overlaps, self.or_windows), self.cache_limit)
+            return
+
+        for instance in built["instances"]:
+            self.ignitions[instance.order.name].append(instance)
+        self.store = built["store"]
+        self.or_singles = built["or_singles"]
+        self.or_overlaps = built["or_overlaps"]
+        self.or_windows = built["or_windows"]
+
+    def __init_symmetries(self):
+        """Order the start of interchangeable orders if symmetry breaking is activated
+        """
+        if not self.symmetry:
+            return
+
+        for names in find_interchangeable(self.ignitions):
+            for first, second in zip(names, names[1:]):
+                for constraint in add_symmetry_breaking(
+                        self.model, self.ignitions[first], self.ignitions[second]):
+                    self.or_symmetries[first].append(constraint.Index())
+                    self.or_symmetries[second].append(constraint.Index())
+
+    def __init_redundancies(self):
+        """Add the activated redundant constrains, see 'redundant_mode'
+        """
+        first = len(self.model.Proto().constraints)
+        if "cumulative" in self.redundancies:
+            templates = {id(instance.template): instance.template
+                         for networks in self.ignitions.values() for instance in networks}
+            groups = defaultdict(set)  # resource.resourceType, {resource.name}
+            for compiled in templates.values():
+                for resource in compiled.resources:
+                    groups[resource.resourceType].add(resource.name)
+            add_resource_cumulative(self.model, self.store,
+                                    {kind: sorted(names) for kind, names in groups.items()})
+
+        if "energy" in self.redundancies:
+            for networks in self.ignitions.values():
+                for instance in networks:
+                    add_energy_bound(self.model, instance)
+        self.or_redundancies = range(first, len(self.model.Proto().constraints))
+
+    def __init_changeovers(self):
+        """Sequence the processes of each resource with setup times, see
+        'add_changeovers' & 'set_sequencing'
+
+        Raises:
+            ValueError: If there are changeovers but no changeover function
+        """
+        if not self.changeovers:
+            return
+        if self.setupfunc is None:
+            raise ValueError(
+                "There is no changeover function. Set it up with 'set_changeover_function' method")
+
+        processes = defaultdict(list)  # resource.name, [(RecipeInstance, node, ORTuple)]
         for networks in self.ignitions.values():
-            add_single_recipe(self.model, networks)  # One recipe for order
-            for GraphRecipe in networks:
-                add_dependency(self.model, GraphRecipe)  # Processes dependency
-        add_resource_no_overlap(self.model, self.or_data, self.or_trans)
+            for instance in networks:
+                compiled = instance.template
+                for node in range(compiled.size):
+                    for r, or_tuple in instance.node_tuples(node):
+                        processes[compiled.resource_names[r]].append((instance, node, or_tuple))
+
+        # Last fixed plan of each resource, the predecessor of its first new process
+        fixed = {}  # resource.name, Plan
+        for plan in self.out_program.plans:
+            name = plan.resource.name
+            if plan.toSolve and (name not in fixed or plan.endAt > fixed[name].endAt):
+                fixed[name] = plan
 
-        if self.optionals:
-            add_optional_process(self.model, self.recetary, )
+        setups = {}  # (prev order.name, next order.name, process.code), int
+
+        def setup(prev: GraphQLType, post: RecipeInstance, node: int) -> int:
+            process = post.template.tasks[node].process.code
+            before, after = prev.material.code, post.order.material.code
+            changeover = self.changeovers.get((process, before, after))
+            if before == after or changeover is None:
+                return 0
+            key = (prev.name, post.order.name, process)
+            if key not in setups:
+                setups[key] = self.setupfunc(
+                    prev_order=prev, next_order=post.order, changeover=changeover)
+            return setups[key]
+
+        first = len(self.model.Proto().constraints)
+        for name, items in processes.items():
+            or_tuples = [or_tuple for _, _, or_tuple in items]
+            if name in fixed:
+                plan = fixed[name]
+                add_fixed_setups(self.model, or_tuples,
+                                 dt.to_int(plan.startAt, self.pivot, self.scale),
+                                 dt.to_int(plan.endAt, self.pivot, self.scale),
+                                 [setup(plan.toSolve, post, v) for post, v, _ in items])
+
+            # Arcs between processes that can be consecutive given their domains.
+            # Instances of the same order are never active at the same time. Ends of
+            # absent intervals are free, the earliest end is given by the start
+            arcs = {}
+            for i, (prev, u, or_prev) in enumerate(items):
+                earliest = or_prev.start.Proto().domain[0] + prev.durations[u]
+                for j, (post, v, or_post) in enumerate(items):
+                    if i == j or (prev is not post and prev.order.name == post.order.name):
+                        continue
+                    time = setup(prev.order, post, v)
+                    if earliest + time <= or_post.start.Proto().domain[-1]:
+                        arcs[i, j] = time
+
+            # Resources without setup times are already sequenced by their NoOverlap
+            if not any(arcs.values()):
+                continue
+            if self.sequencing == "circuit":
+                add_resource_circuit(self.model, or_tuples, arcs)
+            else:
+                add_resource_precedences(self.model, or_tuples, arcs)
+        self.or_sequences = range(first, len(self.model.Proto().constraints))
+
+    def __resequence(self):
+        """Replace the sequencing of the resources after new orders were added
+        """
+        for index in self.or_sequences:
+            self.model.Proto().constraints[index].Clear()
+        self.__init_changeovers()
+
+    def __restrengthen(self):
+        """Replace the symmetry breaking and the redundant constrains after new orders
+        were added, so they cover the new orders as in a new 'run'
+        """
+        proto = self.model.Proto()
+        symmetries = {index for indices in self.or_symmetries.values() for index in indices}
+        for index in sorted(symmetries) + list(self.or_redundancies):
+            proto.constraints[index].Clear()
+        self.or_symmetries = defaultdict(list)
+        self.__init_symmetries()
+        self.__init_redundancies()
+
+    def __init_hints(self):
+        """Seed the solver with the plans of the hint program if there is one
+        """
+        if self.hint_program is None:
+            return
+
+        ignite_hints(self.model, self.ignitions, self.hint_program,
+                     self.pivot, self.scale)
 
     def __init_target(self):
         """Set objetive variable through math equation
@@ -251,9 +725,149 @@ class FlowShop(object):
         if not self.targets:
             return
 
+        # Constraints of the targets are cleared if the demand changes
+        first = len(self.model.Proto().constraints)
+        dues = {name: dt.to_int(networks[0].order.endAt, self.pivot, self.scale)
+                for name, networks in self.ignitions.items()}
         self.or_targets = ignite_optimizator(
-            self.model, self.or_data, self.or_trans,
-            self.targets, self.optim_mode)
+            self.model, self.store,
+            self.targets, self.optim_mode,
+            calculate_horizon(self.ignitions),
+            self.ignitions, dues, self.lexicographic)
+        self.or_goals = range(first, len(self.model.Proto().constraints))
+
+    def __retarget(self):
+        """Replace the objetive variable of the model after its demand changed
+        """
+        for index in self.or_goals:
+            self.model.Proto().constraints[index].Clear()
+        self.__init_target()
+
+    def __previous_solution(self) -> List[int]:
+        """Values of the variables in the last solution of the model
+
+        Returns:
+            List[int]: Value of each variable, empty if there is no solution
+        """
+        if self.status not in ["FEASIBLE", "OPTIMAL"]:
+            return []
+        return list(self.solver.ResponseProto().solution)
+
+    def add_orders(self, orders: List[GraphQLType]) -> None:
+        """Add new orders to the demand (e.g. rush orders). If the model was already
+        built by 'run', only the recipe instances of the new orders are ignited and
+        their intervals are added to the NoOverlap of their resources (and to their
+        sequencing if there are changeovers). Symmetry breaking and redundant constrains
+        are posted again over the whole demand. The recipes of the last solution are
+        hinted, so 'resolve' reacts faster than a new 'run'
+
+        Args:
+            orders (List[GraphQLType]): Orders to be added
+
+        Raises:
+            ValueError: If some order is not valid or is already in the demand
+        """
+        names = {order.name for order in self.demand.orders}
+        for order in orders:
+            valid_order(order)
+            if order.name in names:
+                raise ValueError(f"Order instance {order.id} is already in the demand")
+            names.add(order.name)
+
+        orders = deepcopy(orders)
+        self.demand.orders = list(self.demand.orders) + orders
+        # Nothing has been built yet, orders are ignited by 'run'
+        if self.model is None:
+            return
+
+        solution = self.__previous_solution()
+        since = len(self.store)
+        self.__ignite_orders(self.__plan_orders(orders))
+        if self.compact:
+            self.__extend_windows(resource_windows(self.model, self.store, since))
+        for order in orders:
+            if order.name not in self.ignitions:
+                continue
+            networks = self.ignitions[order.name]
+            self.or_singles[order.name] = add_single_recipe(self.model, networks).Index()
+            for instance in networks:
+                add_dependency(self.model, instance)
+                if instance.template.groups:
+                    add_optional_process(self.model, instance)
+        extend_resource_no_overlap(self.model, self.or_overlaps, self.store, since)
+
+        self.__restrengthen()
+        self.__resequence()
+        self.__retarget()
+        ignite_solution_hints(self.model, self.ignitions, solution)
+
+    def __extend_windows(self, windows: Dict[str, Tuple[int, int]]) -> None:
+        """Post the fixed intervals of the parts of the windows which were not covered
+        yet, see 'ignite_fixed_intervals'
+
+        Args:
+            windows (Dict[str, Tuple[int, int]]): Windows of the new orders by resource
+        """
+        periods = {}
+        for name, (lower, upper) in windows.items():
+            if name not in self.or_windows:
+                periods[name] = [(lower, upper)]
+                self.or_windows[name] = (lower, upper)
+                continue
+            first, last = self.or_windows[name]
+            periods[name] = [(lower, min(upper, first)), (max(lower, last), upper)]
+            self.or_windows[name] = (min(lower, first), max(upper, last))
+
+        self.store.extend(ignite_fixed_intervals(
+            self.model, self.out_program.plans, periods, self.pivot, self.scale))
+
+    def remove_orders(self, names: List[str]) -> None:
+        """Remove orders from the demand (e.g. cancelled orders). If the model was
+        already built by 'run', the recipe instances of the orders are deactivated
+        instead of removed. The recipes of the last solution are hinted, see 'resolve'
+
+        Args:
+            names (List[str]): Names of the orders to be removed
+
+        Raises:
+            ValueError: If some order is not in the demand
+            NotImplementedError: If some order was merged into a campaign of the built model
+        """
+        names = set(names)
+        unknown = names - {order.name for order in self.demand.orders}
+        if unknown:
+            raise ValueError(f"Orders {sorted(unknown)} are not in the demand")
+        merged = names & {order.name for members in self.campaigns.values() for order in members}
+        if merged and self.model is not None:
+            raise NotImplementedError(
+                f"Orders {sorted(merged)} were merged into campaigns. Remove them before 'run'")
+
+        self.demand.orders = [order for order in self.demand.orders
+                              if order.name not in names]
+        if self.model is None:
+            return
+
+        # Instances are deactivated and their variables leave the targets
+        solution = self.__previous_solution()
+        proto = self.model.Proto()
+        actives = []
+        for name in names:
+            if name in self.or_singles:
+                proto.constraints[self.or_singles.pop(name)].Clear()
+            for index in self.or_symmetries.pop(name, []):
+                proto.constraints[index].Clear()
+            for instance in self.ignitions.pop(name, []):
+                or_tuples = list(instance.or_vars) + list(instance.or_trans.values()) + \
+                    [or_alt for or_alts in instance.or_alts.values() for or_alt, _ in or_alts]
+                for or_var in [instance.or_recipe] + [or_tuple.active for or_tuple in or_tuples]:
+                    domain = proto.variables[or_var.Index()].domain
+                    del domain[:]
+                    domain.extend([0, 0])
+                    actives.append(or_var.Index())
+        self.store.remove(actives)
+
+        self.__retarget()
+        ignite_solution_hints(self.model, self.ignitions, solution)
 
     def debug_mode(self, activated: bool = False) -> None:
         """This method is a settler for debugging mode in OR-tools
@@ -266,24 +880,584 @@ class FlowShop(object):
         else:
             self.solver.parameters.log_search_progress = False
 
+    def decomposition_mode(self, activated: bool = False, workers: int = None) -> None:
+        """This method is a settler for decomposition mode. If activated, orders that
+        never share a resource are split into independent models which are solved
+        in parallel by a pool of processes
+
+        Args:
+            activated (bool, optional): True if wanted to activate decomposition mode.
+                Defaults to False.
+            workers (int, optional): Number of processes in the pool. Defaults to the
+                number of cores.
+        """
+        self.decompose = activated
+        self.workers = workers or cpu_count()
+
+    def batch_mode(self, activated: bool = False, size: int = None) -> None:
+        """This method is a settler for batch mode. If activated, orders of the same
+        material whose windows overlap are merged into campaigns before ignition.
+        Durations of a campaign are calculated by the linked functions on the sum of
+        the quantities and its window is the intersection of the windows. Each plan
+        of a campaign is split into consecutive plans of its orders in the result.
+        Orders only join a campaign if some recipe of the campaign still fits in its
+        window. Orders added by 'add_orders' are not merged
+
+        Args:
+            activated (bool, optional): True if wanted to activate batch mode. Defaults to False.
+            size (int, optional): Maximum number of orders of a campaign. Defaults to None.
+        """
+        self.batching = activated
+        self.batch_size = size
+
+    def symmetry_mode(self, activated: bool = False) -> None:
+        """This method is a settler for symmetry breaking mode. If activated, orders
+        that can swap their plans (same material, window, quantity, priority, recipes
+        and durations) are ordered by their start, so the solver does not explore
+        their permutations
+
+        Args:
+            activated (bool, optional): True if wanted to activate symmetry breaking.
+                Defaults to False.
+        """
+        self.symmetry = activated
+
+    def redundant_mode(self, activated: bool = False, kinds: List[str] = None) -> None:
+        """This method is a settler for redundant constrains. They do not change the
+        solutions, but they help the propagation on instances with tight windows:
+        "cumulative" sees the resources of the same type as a single cumulative
+        resource and "energy" bounds the span of each recipe by the work of its
+        busiest resource
+
+        Args:
+            activated (bool, optional): True if wanted to add redundant constrains.
+                Defaults to False.
+            kinds (List[str], optional): Redundant constrains to be added. Defaults to all
+                of 'REDUNDANCIES'.
+
+        Raises:
+            NotImplementedError: If some kind of redundant constrain is not implemented
+        """
+        kinds = list(REDUNDANCIES if kinds is None else kinds)
+        for kind in kinds:
+            if kind not in REDUNDANCIES:
+                raise NotImplementedError(
+                    f"redundant constrain '{kind}' not implemented. "
+                    f"Try one of this: {REDUNDANCIES}")
+        self.redundancies = kinds if activated else []
+
+    def compact_mode(self, activated: bool = False) -> None:
+        """This method is a settler for compact mode. If activated, fixed plans and
+        stops are posted as constant intervals instead of variables, overlapping or
+        adjacent ones are merged and only their parts inside the windows of the
+        orders of each resource are kept. Plans of the history (e.g. before the
+        pivot) do not grow the model
+
+        Args:
+            activated (bool, optional): True if wanted to activate compact mode. Defaults to False.
+        """
+        self.compact = activated
+
+    def lexicographic_mode(self, activated: bool = False) -> None:
+        """This method is a settler for lexicographic optimization. If activated, the
+        objetives are optimized one after another in the order they were given to
+        'optimize' instead of their sum: each stage keeps the value reached by the
+        previous objetive as a bound and starts from its solution. Every stage is
+        solved with the search parameters. Components of decomposition mode only
+        optimize the first objetive
+
+        Args:
+            activated (bool, optional): True if wanted to activate lexicographic mode.
+                Defaults to False.
+        """
+        self.lexicographic = activated
+
+    def soft_mode(self, activated: bool = False, lateness: timedelta = timedelta(days=7)) -> None:
+        """This method is a settler for soft windows. If activated, orders may end up
+        to 'lateness' after their 'endAt' instead of being left out of the program,
+        so the "tardiness" objetive can trade the delay of some orders against the
+        others. It is activated by 'optimize' with objetives of due dates
+
+        Args:
+            activated (bool, optional): True if wanted to activate soft windows. Defaults to False.
+            lateness (timedelta, optional): Maximum delay of an order. Defaults to
+                timedelta(days=7).
+        """
+        self.lateness = lateness if activated else timedelta(0)
+
+    def __lateness(self) -> int:
+        """Maximum delay of the orders in units of the scale, see 'soft_mode'
+
+        Returns:
+            int: Lateness of the orders, zero with hard windows
+        """
+        if not self.lateness:
+            return 0
+        return dt.to_int(self.pivot + self.lateness, self.pivot, self.scale)
+
+    def cache_mode(self, activated: bool = False, directory: str = None, limit: int = 32) -> None:
+        """This method is a settler for caching mode. If activated, the built model
+        is stored on disk keyed by a content hash of the demand, the recipes (and
+        durations of their processes), the fixed plans and the stops. Later runs over
+        the same inputs rehydrate it instead of building it again. Linked functions
+        must be deterministic, otherwise the hash changes on every run
+
+        Models are stored as the raw proto and a JSON index map, never pickled, and
+        the least recently used ones are evicted beyond 'limit'. The directory should
+        be private to the user running the scheduler
+
+        Args:
+            activated (bool, optional): True if wanted to activate caching mode. Defaults to False.
+            directory (str, optional): Directory of the cache, required to activate it.
+                Defaults to None.
+            limit (int, optional): Maximum number of stored models. Defaults to 32.
+        """
+        if activated and directory is None and self.cache_dir is None:
+            raise ValueError("Caching mode needs the directory of the cache")
+        if limit < 1:
+            raise ValueError(f"Limit of the cache must be positive, got {limit}")
+        self.caching = activated
+        self.cache_limit = limit
+        if directory is not None:
+            self.cache_dir = directory
+
+    def __init_components(self, components: List[Tuple[List[GraphQLType], Set[str]]]) -> None:
+        """Ignite an independent FlowShop model for each group of orders that shares
+        resources. Fixed plans and stops are given to the group owning the resource
+
+        Args:
+            components (List[Tuple[List[GraphQLType], Set[str]]]): Orders and names of
+                the resources of each group, see 'find_components'
+        """
+        self.__init_fixed()
+
+        for orders, resources in components:
+            # Orders without recipes are not scheduled at all
+            if not resources:
+                continue
+
+            component = self.__create_child(
+                orders, [plan for plan in self.out_program.plans
+                         if plan.resource.name in resources])
+
+            component.__init_model()
+            component.__init_build()
+            component.__init_symmetries()
+            component.__init_redundancies()
+            component.__init_changeovers()
+            component.__init_hints()
+            component.__init_target()
+            self.components.append(component)
+
+    def __run_components(self) -> None:
+        """Solve all components in a pool of processes and merge their status
+        """
+        workers = min(self.workers, len(self.components))
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for component in self.components:
+                # Cores are shared between the solvers running at the same time
+                parameters = component.solver.parameters
+                parameters.num_search_workers = max(1, parameters.num_search_workers // workers)
+                futures.append(executor.submit(
+                    solve_model_proto,
+                    component.model.Proto().SerializeToString(),
+                    parameters.SerializeToString()))
+
+            for component, future in zip(self.components, futures):
+                component.solver = ResponseSolver(parameters=component.solver.parameters)
+                component.solver.response.ParseFromString(future.result())
+                component.status = component.solver.StatusName()
+
+        # The worst status of the components is the status of the whole program
+        self.status = merge_statuses(component.status for component in self.components)
+
+    def rolling_mode(self, activated: bool = False, window: timedelta = timedelta(days=7),
+                     step: timedelta = timedelta(days=3)) -> None:
+        """This method is a settler for rolling-horizon mode. If activated, only the
+        orders released within a window of time are solved at once. Orders whose plans
+        start within the first step of the window are committed as fixed plans, then
+        the window is advanced by a step and the rest of the orders are solved again
+
+        Args:
+            activated (bool, optional): True if wanted to activate rolling-horizon mode.
+                Defaults to False.
+            window (timedelta, optional): Extension of each window. Defaults to 7 days.
+            step (timedelta, optional): Extension committed on each window. Defaults to 3 days.
+
+        Raises:
+            ValueError: If the step is not positive or is greater than the window
+        """
+        if not timedelta(0) < step <= window:
+            raise ValueError(
+                f"step {step} must be positive and not greater than window {window}")
+        self.rolling = activated
+        self.window = window
+        self.step = step
+
+    def lns_mode(self, activated: bool = False, **params: Any) -> None:
+        """This method is a settler for Large Neighborhood Search mode. If activated,
+        the solution of the run is improved iteratively: all the orders but a
+        neighborhood are fixed to their current plans and the neighborhood is
+        solved again with a short time limit. Only useful with an objective, and
+        usually combined with the "fast-feasible" preset
+
+        Args:
+            activated (bool, optional): True if wanted to activate LNS mode. Defaults to False.
+            **params: Any key of 'LNS_SEARCH': "neighborhoods" (kinds used in turns, see
+                'NEIGHBORHOODS'), "iterations", "solvertime" (seconds per iteration), "budget"
+                (seconds for all the iterations), "size" (maximum relaxed orders), "seed" and
+                "log" (function to output each iteration, 'print' if not given in verbose mode)
+
+        Raises:
+            NotImplementedError: If some neighborhood is not implemented
+            ValueError: If no neighborhood is given
+            KeyError: If some parameter does not exist
+        """
+        unknown = [key for key in params if key not in LNS_SEARCH]
+        if unknown:
+            raise KeyError(
+                f"parameters {unknown} do not exist. Try some of this: {list(LNS_SEARCH)}")
+        for kind in params.get("neighborhoods", []):
+            if kind not in NEIGHBORHOODS:
+                raise NotImplementedError(
+                    f"neighborhood '{kind}' not implemented. Try one of this: {NEIGHBORHOODS}")
+        if "neighborhoods" in params and not params["neighborhoods"]:
+            raise ValueError(f"LNS needs some neighborhood. Try some of this: {NEIGHBORHOODS}")
+
+        self.lns = activated
+        self.lns_params.update(params)
+
+    def __run_lns(self, verbose: int = 0) -> None:
+        """Improve the current solution through Large Neighborhood Search. Each
+        iteration solves a copy of the model with the variables of all the orders
+        but the neighborhood fixed, and it is accepted if the objective improves
+
+        Args:
+            verbose (int, optional): Verbose mode 0,1 or 2. Iterations are only printed
+                in verbose mode unless a "log" function is given. Defaults to 0.
+        """
+        if not self.or_targets or self.status != "FEASIBLE":
+            return
+
+        params = self.lns_params
+        log = params["log"] or (print if verbose else lambda message: None)
+        rng = Random(params["seed"])
+        sense = 1 if self.optim_mode == "minimize" else -1
+        size = params["size"] or max(1, len(self.ignitions) // 5)
+        best = self.solver.ResponseProto()
+        bound = best.best_objective_bound
+        walltime = best.wall_time
+        start = perf_counter()
+
+        for iteration in range(params["iterations"]):
+            if params["budget"] is not None and perf_counter() - start > params["budget"]:
+                break
+
+            current = ResponseSolver(response=best)
+            kind = params["neighborhoods"][iteration % len(params["neighborhoods"])]
+            relaxed = select_neighborhood(
+                kind, selected_instances(self.ignitions, current), current, size, rng)
+
+            # Solve a copy of the model with all but the neighborhood fixed
+            model = cp_model.CpModel()
+            model.Proto().CopyFrom(self.model.Proto())
+            fix_model_proto(model.Proto(), self.ignitions, relaxed, list(best.solution))
+            solver = cp_model.CpSolver()
+            solver.parameters.CopyFrom(self.solver.parameters)
+            solver.parameters.max_time_in_seconds = params["solvertime"]
+            solver.parameters.stop_after_first_solution = False
+            solver.parameters.random_seed = rng.randrange(1 << 16)
+            solver.Solve(model)
+            candidate = solver.ResponseProto()
+            walltime += candidate.wall_time
+
+            objective = best.objective_value
+            if candidate.status in [cp_model.FEASIBLE, cp_model.OPTIMAL]:
+                objective = candidate.objective_value
+            improvement = sense * (best.objective_value - objective)
+            log(f"LNS iteration {iteration} ({kind}, {len(relaxed)} orders): objective "
+                f"{best.objective_value:g} -> {objective:g} in {candidate.wall_time:.2f} s, "
+                f"{improvement / max(candidate.wall_time, 1e-6):.2f} per second")
+
+            if improvement < 0 or candidate.status not in [cp_model.FEASIBLE, cp_model.OPTIMAL]:
+                continue
+
+            # The bound of a neighborhood is not a bound of the whole model
+            candidate.best_objective_bound = bound
+            best = candidate
+            if self.callback is not None:
+                self.callback(Solution(
+                    program=create_program(self.out_program, ResponseSolver(response=best),
+                                           self.ignitions, self.pivot, self.scale, self.campaigns),
+                    objective=best.objective_value,
+                    bound=bound,
+                    walltime=walltime))
+            if best.objective_value == bound:
+                break
+
+        best.wall_time = walltime
+        self.solver = ResponseSolver(response=best, parameters=self.solver.parameters)
+        if best.objective_value == bound:
+            self.status = "OPTIMAL"
+
+    def __create_child(self, orders: List[GraphQLType], plans: List[GraphQLType],
+                       pivot: datetime = None) -> "FlowShop":
+        """Create a FlowShop sharing the configuration of this one to solve a subset
+        of the orders given some fixed plans
+
+        Args:
+            orders (List[GraphQLType]): Orders to be scheduled
+            plans (List[GraphQLType]): Fixed plans, stops included
+            pivot (datetime, optional): Pivot of the child. Defaults to the current pivot.
+
+        Returns:
+            FlowShop: New model, not ignited yet
+        """
+        child = FlowShop(
+            recetary=self.recetary,
+            optionals=self.optionals,
+            funbook=self.funbook,
+            changeovers=self.changeovers,
+            setupfunc=self.setupfunc,
+            sequencing=self.sequencing,
+            hint_program=self.hint_program,
+            pivot=pivot or self.pivot,
+            targets=self.targets,
+            scale=self.scale,
+            optim_mode=self.optim_mode,
+            lexicographic=self.lexicographic,
+            parameters=self.parameters,
+            batching=self.batching,
+            batch_size=self.batch_size,
+            caching=self.caching,
+            cache_dir=self.cache_dir,
+            cache_limit=self.cache_limit,
+            symmetry=self.symmetry,
+            redundancies=self.redundancies,
+            compact=self.compact,
+            lateness=self.lateness)
+        child.demand = copy(self.demand)
+        child.demand.orders = orders
+        child.in_program = copy(self.out_program)
+        child.in_program.plans = plans
+        return child
+
+    def run_scenarios(self, scenarios: List[Scenario], workers: int = None) -> List[Dict[str, Any]]:
+        """Solve what-if variants of this model in a pool of processes. Each scenario
+        is a copy of this model with its deltas applied (see 'Scenario'), sharing the
+        compiled recipes and the linked functions, and solved in decomposition or LNS
+        mode as this model. Intermediate programs are not streamed to the callback, see
+        'set_solution_callback'. Workers are forked where it is safe, so master data is
+        neither parsed nor pickled again, otherwise they are spawned (see
+        'scenario_context'). Cores are shared between the solvers running at the same time
+
+        Args:
+            scenarios (List[Scenario]): Variants to be solved
+            workers (int, optional): Scenarios solved at the same time. Defaults to the
+                available cores.
+
+        Returns:
+            List[Dict[str, Any]]: Comparison table with a row per scenario: its name
+                ("scenario"), status, value of each objetive ("objetives"), number of
+                scheduled orders ("orders") and seconds spent ("runtime")
+
+        Raises:
+            NotImplementedError: If rolling-horizon mode is activated
+        """
+        # Windows solve the same orders again, their objetives can not be merged
+        if self.rolling:
+            raise NotImplementedError(
+                "Scenarios are not solved in rolling-horizon mode. Try 'rolling_mode(False)'")
+        self.__init_fixed()
+        workers = min(workers or cpu_count() or 1, len(scenarios)) or 1
+        cores = self.parameters["workers"] or cpu_count() or 1
+
+        models = []
+        for scenario in scenarios:
+            orders = [order for order in self.demand.orders if order.name not in scenario.cuts]
+            child = self.__create_child(orders + list(scenario.orders),
+                                        list(self.out_program.plans), pivot=scenario.pivot)
+            child.add_stops(scenario.stops)
+            child.parameters = dict(self.parameters, **scenario.parameters)
+            child.parameters["workers"] = max(1, cores // workers)
+            child.decompose, child.workers = self.decompose, self.workers
+            child.lns, child.lns_params = self.lns, dict(self.lns_params)
+            models.append(child)
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=sc.scenario_context(),
+                                 initializer=sc.init_scenarios, initargs=(models,)) as executor:
+            rows = list(executor.map(sc.solve_scenario, range(len(scenarios))))
+
+        return [dict(scenario=scenario.name, **row) for scenario, row in zip(scenarios, rows)]
+
+    def __run_windows(self) -> None:
+        """Solve the demand window by window, committing the plans of each window
+        into the output program. Fixed plans that end before the release of the
+        orders of a window are not given to it, so each model stays bounded
+        """
+        self.__init_fixed()
+        remaining = sorted(self.demand.orders, key=lambda order: order.startAt)
+        cursor = self.pivot
+        statuses = []
+
+        while remaining:
+            # Jump over periods of time without released orders
+            if remaining[0].startAt >= cursor + self.window:
+                cursor = remaining[0].startAt
+            orders = [order for order in remaining
+                      if order.startAt < cursor + self.window]
+            release = min(order.startAt for order in orders)
+            plans = [plan for plan in self.out_program.plans if plan.endAt > release]
+
+            window = self.__create_child(orders, plans, pivot=cursor)
+            window.decompose = self.decompose
+            window.workers = self.workers
+            window.run()
+            statuses.append(window.status)
+            if window.status in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"]:
+                break
+
+            # Commit the orders starting within the step. Orders without plans
+            # can not be scheduled at all, so they are committed too
+            new_plans = window.result().plans[len(plans):]
+            starts = {}
+            for plan in new_plans:
+                name = plan.toSolve.name
+                starts[name] = min(starts.get(name, plan.startAt), plan.startAt)
+            committed = {order.name for order in orders
+                         if order.name not in starts or starts[order.name] < cursor + self.step}
+            # Nothing started within the step, the whole window is committed
+            if not committed:
+                committed = {order.name for order in orders}
+
+            self.out_program.plans.extend(plan for plan in new_plans
+                                          if plan.toSolve.name in committed)
+            remaining = [order for order in remaining if order.name not in committed]
+            cursor += self.step
+
+        self.status = merge_statuses(statuses)
+
     def run(self, verbose: int = 0) -> None:
         """Run the algorithm for scheduling given constrains, data and objetive
 
         Args:
             verbose (int, optional): Verbose mode 0,1 or 2. Defaults to 0.
         """
+        self.__init_state()
+        if self.rolling:
+            with pt.solver_context("flowshop", verbose) as report:
+                self.__run_windows()
+            report(self.status)
+            return
+
+        components = find_components(self.demand.orders, self.recetary) if self.decompose else []
+        if len(components) > 1:
+            self.__init_components(components)
+            with pt.solver_context("flowshop", verbose) as report:
+                self.__run_components()
+            report(self.status)
+            return
+
+        self.build()
+        self.__solve(verbose)
+
+    def build(self) -> None:
+        """Build the model of the whole demand without solving it: recipe instances,
+        fixed plans, constrains, hints and objetives. Decomposition and rolling-horizon
+        modes are not applied. 'run' builds the model and solves it, a model built
+        alone is solved by 'resolve'
+        """
+        self.__init_state()
         self.__init_model()
-        self.__init_demand()
-        self.__init_program()
-        self.__init_constrains()
+        self.__init_build()
+        self.__init_symmetries()
+        self.__init_redundancies()
+        self.__init_changeovers()
+        self.__init_hints()
         self.__init_target()
 
+    def resolve(self, verbose: int = 0) -> None:
+        """Solve again the model built by the last 'run' (or 'build') after adding or
+        removing orders, see 'add_orders' & 'remove_orders'. The model is not built again.
+        Decomposition and rolling-horizon modes split the demand into models that
+        are not kept, orders added or removed after them are solved by a new 'run'
+
+        Args:
+            verbose (int, optional): Verbose mode 0,1 or 2. Defaults to 0.
+
+        Raises:
+            NotImplementedError: If the last 'run' was in decomposition or rolling-horizon mode
+            ValueError: If there is no model built by 'run'
+        """
+        if self.components or (self.rolling and self.model is None):
+            raise NotImplementedError(
+                "Models of decomposition and rolling-horizon modes are not kept. Try 'run' again")
+        if self.model is None:
+            raise ValueError("There is no model to be solved again. Try 'run' first")
+
+        self.solver = cp_model.CpSolver()
+        self.printer = cp_model.ObjectiveSolutionPrinter()
+        ignite_search_params(self.solver, self.parameters)
+        self.__solve(verbose)
+
+    def __solve(self, verbose: int = 0) -> None:
+        """Solve the built model and improve it through LNS if activated
+
+        Args:
+            verbose (int, optional): Verbose mode 0,1 or 2. Defaults to 0.
+        """
+        # Stream the program of each new solution to the user
+        if self.callback is not None:
+            self.printer = SolutionStreamer(self.out_program, self.ignitions, self.pivot,
+                                            self.scale, self.callback, self.campaigns)
+
         # Running Ortools solver
         with pt.solver_context("flowshop", verbose) as report:
-            s = self.solver.SolveWithSolutionCallback(self.model, self.printer)
-            self.status = self.solver.StatusName(s)
+            if self.lexicographic and len(self.or_targets) > 1:
+                self.__solve_lexicographic()
+            else:
+                s = self.solver.SolveWithSolutionCallback(self.model, self.printer)
+                self.status = self.solver.StatusName(s)
+            if self.lns:
+                self.__run_lns(verbose)
         report(self.status)
 
+    def __solve_lexicographic(self) -> None:
+        """Solve a stage for each objetive, see 'lexicographic_mode'. If a stage does
+        not find a solution, the solution of the previous one is kept
+        """
+        # Bounds of a previous solve are not valid anymore
+        for index in self.or_bounds:
+            self.model.Proto().constraints[index].Clear()
+        self.or_bounds = []
+
+        statuses = []
+        for stage in range(len(self.or_targets)):
+            solver = self.solver
+            if stage:
+                solution = self.__previous_solution()
+                self.or_bounds.append(ignite_lexicographic_stage(
+                    self.model, self.or_targets, stage, self.optim_mode, solution))
+                self.solver = cp_model.CpSolver()
+                ignite_search_params(self.solver, self.parameters)
+            else:
+                ignite_lexicographic_stage(self.model, self.or_targets, stage, self.optim_mode)
+
+            s = self.solver.SolveWithSolutionCallback(self.model, self.printer)
+            status = self.solver.StatusName(s)
+            if status not in ["FEASIBLE", "OPTIMAL"]:
+                if stage:
+                    self.solver = solver
+                    status = "FEASIBLE"
+                statuses.append(status)
+                break
+            self.status = status
+            statuses.append(status)
+
+        self.status = merge_statuses(statuses)
+
     def result(self) -> Program:
         """Get program and demand generated for the scheduler.
 
@@ -295,21 +1469,21 @@ class FlowShop(object):
             return self.in_program
 
         # Create and insert new plans into program if feasible solution was found
-        for networks in self.ignitions.values():
-            for GraphRecipe in networks:
-                or_recipe = self.solver.Value(GraphRecipe.graph["or_recipe"])
-                if not or_recipe:
-                    continue
-                insert_plans(self.out_program, self.solver,
-                             GraphRecipe, self.pivot, self.scale)
+        program = create_program(self.out_program, self.solver,
+                                 self.ignitions, self.pivot, self.scale, self.campaigns)
+
+        # Each component inserts its new plans after the fixed ones it was given
+        for component in self.components:
+            program.plans.extend(
+                component.result().plans[len(component.in_program.plans):])
 
         # Recalculating extension from the program
-        self.out_program.startAt = min(
-            plan.startAt for plan in self.out_program.plans)
-        self.out_program.endAt = max(
-            plan.endAt for plan in self.out_program.plans)
+        program.startAt = min(
+            plan.startAt for plan in program.plans)
+        program.endAt = max(
+            plan.endAt for plan in program.plans)
 
-        return self.out_program
+        return program
 
     def request(self) -> Demand:
         """Get the demand of orders requested by the given solution
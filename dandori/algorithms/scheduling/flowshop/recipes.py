@@ -0,0 +1,267 @@
+from typing import Any, Dict, Iterable, List, Tuple
+from collections import defaultdict
+# Thrid-party dependencies
+from attr import attrib, attrs
+from networkx import DiGraph, topological_sort
+# Scheduler dependencies
+from dandori.models import Order, Recipe
+
+
+@attrs
+class CompiledRecipe:
+    """Recipe's network dependency compiled into flat lists. Nodes are indexed in
+    topological order, so every predecessor of a node has a lower index. Relations
+    between nodes, resources and edges are stored in CSR layout: the items of the
+    i-th row are 'indices[indptr[i]:indptr[i + 1]]'
+    """
+    recipe = attrib(default=None)
+    locked = attrib(default=False)
+    names = attrib(factory=list)  # node, process.name
+    tasks = attrib(factory=list)  # node, Task
+    times = attrib(factory=list)  # node, Time
+    optional = attrib(factory=list)  # node, bool
+    groups = attrib(factory=dict)  # task.group, [node]
+    resources = attrib(factory=list)  # resource, Resource
+    resource_names = attrib(factory=list)  # resource, resource.name
+    res_indptr = attrib(factory=lambda: [0])  # node -> resources
+    res_indices = attrib(factory=list)
+    pred_indptr = attrib(factory=lambda: [0])  # node -> predecessors
+    pred_indices = attrib(factory=list)
+    succ_indptr = attrib(factory=lambda: [0])  # node -> successors
+    succ_indices = attrib(factory=list)
+    edges = attrib(factory=list)  # edge, (node, node)
+    shared_indptr = attrib(factory=lambda: [0])  # edge -> resources in common
+    shared_indices = attrib(factory=list)
+
+    @property
+    def size(self) -> int:
+        """Number of processes of the recipe"""
+        return len(self.names)
+
+    def node_resources(self, node: int) -> List[int]:
+        """Indices of the resources where the process is performed
+
+        Args:
+            node (int): Index of the process
+
+        Returns:
+            List[int]: Indices of the resources
+        """
+        return self.res_indices[self.res_indptr[node]:self.res_indptr[node + 1]]
+
+    def edge_resources(self, edge: int) -> List[int]:
+        """Indices of the resources shared by both processes of an edge
+
+        Args:
+            edge (int): Index of the edge
+
+        Returns:
+            List[int]: Indices of the resources in common
+        """
+        return self.shared_indices[self.shared_indptr[edge]:self.shared_indptr[edge + 1]]
+
+    def critical_paths(self, work: List[int]) -> Tuple[List[int], List[int]]:
+        """Calculates for each node the longest path of work that must be done
+        before it starts ("head") and after it ends ("tail")
+
+        Args:
+            work (List[int]): Amount of work of each node. Non-mandatory nodes
+                should have zero work
+
+        Returns:
+            Tuple[List[int], List[int]]: Heads and tails of each node
+        """
+        heads, tails = [0] * self.size, [0] * self.size
+
+        for v in range(self.size):
+            for k in range(self.pred_indptr[v], self.pred_indptr[v + 1]):
+                u = self.pred_indices[k]
+                heads[v] = max(heads[v], heads[u] + work[u])
+
+        for u in reversed(range(self.size)):
+            for k in range(self.succ_indptr[u], self.succ_indptr[u + 1]):
+                v = self.succ_indices[k]
+                tails[u] = max(tails[u], tails[v] + work[v])
+
+        return heads, tails
+
+
+def compile_recipe(NetTemplate: DiGraph, locked: bool = False) -> CompiledRecipe:
+    """Compile the network dependency template of a recipe into flat lists. This is
+    done once per recipe, so the model building loop never touches the graph
+
+    Args:
+        NetTemplate (DiGraph): Network dependency template of the recipe
+        locked (bool, optional): True if transitions between dependent processes
+            must be modeled. Defaults to False.
+
+    Returns:
+        CompiledRecipe: Compiled form of the template
+    """
+    compiled = CompiledRecipe(recipe=NetTemplate.graph["recipe"], locked=locked)
+    index = {node: i for i, node in enumerate(topological_sort(NetTemplate))}
+    resources = {}  # resource.name, index
+
+    for node in index:
+        info = NetTemplate.nodes[node]
+        compiled.names.append(node)
+        compiled.tasks.append(info["task"])
+        compiled.times.append(info["time"])
+        compiled.optional.append(bool(info["task"].optional))
+        if info["task"].optional:
+            compiled.groups.setdefault(info["task"].group, []).append(index[node])
+
+        for resource in info["resources"]:
+            if resource.name not in resources:
+                resources[resource.name] = len(compiled.resources)
+                compiled.resources.append(resource)
+                compiled.resource_names.append(resource.name)
+            compiled.res_indices.append(resources[resource.name])
+        compiled.res_indptr.append(len(compiled.res_indices))
+
+        compiled.pred_indices.extend(index[u] for u in NetTemplate.predecessors(node))
+        compiled.pred_indptr.append(len(compiled.pred_indices))
+        compiled.succ_indices.extend(index[v] for v in NetTemplate.successors(node))
+        compiled.succ_indptr.append(len(compiled.succ_indices))
+
+    for u in range(compiled.size):
+        u_resources = compiled.node_resources(u)
+        for k in range(compiled.succ_indptr[u], compiled.succ_indptr[u + 1]):
+            v = compiled.succ_indices[k]
+            v_resources = compiled.node_resources(v)
+            compiled.edges.append((u, v))
+            compiled.shared_indices.extend(r for r in u_resources if r in v_resources)
+            compiled.shared_indptr.append(len(compiled.shared_indices))
+
+    return compiled
+
+
+@attrs
+class Recetary:
+    """Registry of compiled recipes. Recipes are indexed by their code and by the
+    name of the materials they produce, so membership and lookups are O(1)
+    """
+    recipes = attrib(factory=dict)  # recipe.code, CompiledRecipe
+    materials = attrib(factory=lambda: defaultdict(list))  # material.name, [CompiledRecipe]
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.recipes
+
+    def __getitem__(self, name: str) -> List[CompiledRecipe]:
+        """Compiled recipes producing the material. Unknown materials have no recipes"""
+        return self.materials.get(name, [])
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def register(self, compiled: CompiledRecipe, materials: Iterable[str]) -> bool:
+        """Register a compiled recipe unless its code is already registered
+
+        Args:
+            compiled (CompiledRecipe): Compiled recipe to register
+            materials (Iterable[str]): Names of the materials produced by the recipe
+
+        Returns:
+            bool: True if the recipe was registered
+        """
+        code = compiled.recipe.code
+        if code in self.recipes:
+            return False
+
+        self.recipes[code] = compiled
+        for name in materials:
+            self.materials[name].append(compiled)
+        return True
+
+
+@attrs
+class RecipeInstance:
+    """Recipe ignited for a single order. The compiled template (structure, processes,
+    resources) is shared by all the orders and never modified, only per-order data
+    is stored in the instance, indexed as the nodes and edges of the template
+    """
+    template = attrib(factory=CompiledRecipe)
+    order = attrib(default=None)
+    durations = attrib(factory=list)  # node, int
+    heads = attrib(factory=list)  # node, int
+    tails = attrib(factory=list)  # node, int
+    or_recipe = attrib(default=None)
+    or_vars = attrib(factory=list)  # node, ORTuple
+    or_trans = attrib(factory=dict)  # edge, ORTuple
+    or_alts = attrib(factory=dict)  # node, [(ORTuple, [resource])] alternative groups of resources
+
+    @property
+    def recipe(self) -> Recipe:
+        """Recipe which provides the template"""
+        return self.template.recipe
+
+    @property
+    def locked(self) -> bool:
+        """True if transitions between dependent processes must be modeled"""
+        return self.template.locked
+
+    def node_tuples(self, node: int) -> List[Tuple[int, Any]]:
+        """Resources where the process may be performed, each one with the ORtuple
+        of the interval occupying it. Resources of the alternative groups of the
+        process are occupied by the interval of their group, the rest by the
+        interval of the process
+
+        Args:
+            node (int): Index of the process
+
+        Returns:
+            List[Tuple[int, Any]]: Index of the resource & ORtuple, a resource of
+                many groups is listed once per group
+        """
+        alternatives = self.or_alts.get(node, [])
+        grouped = {r for _, group in alternatives for r in group}
+        pairs = [(r, self.or_vars[node])
+                 for r in self.template.node_resources(node) if r not in grouped]
+        pairs.extend((r, or_tuple) for or_tuple, group in alternatives for r in group)
+        return pairs
+
+
+def create_recipe_instance(compiled: CompiledRecipe, order: Order,
+                           durations: List[int] = None) -> RecipeInstance:
+    """Ignite a compiled recipe for the given order. Durations of the processes are
+    calculated through the functions linked to them (unless they are given), then
+    the longest paths of work before and after each process are calculated
+
+    Args:
+        compiled (CompiledRecipe): Compiled network dependency of the recipe
+        order (Order): Order to be fulfilled by the recipe
+        durations (List[int], optional): Durations of each node. Defaults to None.
+
+    Returns:
+        RecipeInstance: New lightweight instance sharing the template
+    """
+    if durations is None:
+        durations = [time.evaluate(order=order, process=task.process)
+                     for task, time in zip(compiled.tasks, compiled.times)]
+    work = [0 if optional else duration
+            for optional, duration in zip(compiled.optional, durations)]
+    heads, tails = compiled.critical_paths(work)
+
+    return RecipeInstance(template=compiled, order=order, durations=durations,
+                          heads=heads, tails=tails)
+
+
+def find_interchangeable(ignitions: Dict[str, List[RecipeInstance]]) -> List[List[str]]:
+    """Group the orders that can swap their plans without changing the program:
+    same material, window, quantity & priority, and the same recipes with the
+    same durations
+
+    Args:
+        ignitions (Dict[str, List[RecipeInstance]]): Recipe instances grouped by the name
+            of the order
+
+    Returns:
+        List[List[str]]: Sorted names of the orders of each group with more than one order
+    """
+    groups = defaultdict(list)
+    for name, networks in ignitions.items():
+        order = networks[0].order
+        key = (order.material.name, order.startAt, order.endAt, order.quantity, order.priority,
+               tuple((instance.recipe.code, tuple(instance.durations)) for instance in networks))
+        groups[key].append(name)
+    return [sorted(names) for names in groups.values() if len(names) > 1]
@@ -0,0 +1,108 @@
+import sys
+import threading
+from time import perf_counter
+from typing import Any, Dict, List
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.context import BaseContext
+# Thrid-party dependencies
+from attr import attrib, attrs
+# Scheduler dependencies
+from .decomposition import merge_objetives
+
+# Models of the scenarios solved by this worker, see 'init_scenarios'. It is only
+# set inside the workers of the pool, never in the process running the scenarios
+SCENARIO_MODELS = []
+
+
+@attrs
+class Scenario:
+    """What-if variant of a base FlowShop. Each field is a delta over the base model
+
+    Args:
+        name (str): Name of the scenario in the comparison table
+        orders (List[GraphQLType]): New orders added to the demand
+        cuts (List[str]): Names of the orders removed from the demand
+        stops (List[GraphQLType]): New stops added to the base ones
+        pivot (datetime): Pivot of the scenario. Defaults to the base pivot
+        parameters (Dict[str, Any]): Search parameters over the base ones (e.g. its
+            "solvertime" budget), see 'DEFAULT_SEARCH'
+    """
+    name = attrib()
+    orders = attrib(factory=list)
+    cuts = attrib(factory=list)
+    stops = attrib(factory=list)
+    pivot = attrib(default=None)
+    parameters = attrib(factory=dict)
+
+
+def scenario_context() -> BaseContext:
+    """Start method of the workers of the pool. Forked workers inherit the models
+    (compiled recipes and linked functions included) without pickling, but forking
+    is only safe on POSIX systems but macOS and while no other thread is running.
+    Otherwise workers are spawned and the models are pickled, so linked functions
+    must be importable (e.g. defined at the top level of a module)
+
+    Returns:
+        BaseContext: Multiprocessing context of the pool
+    """
+    if ("fork" in get_all_start_methods() and sys.platform != "darwin"
+            and threading.active_count() == 1):
+        return get_context("fork")
+    return get_context("spawn")
+
+
+def init_scenarios(models: List[Any]) -> None:
+    """Initializer of each worker of the pool, it keeps the models of the scenarios
+
+    Args:
+        models (List[FlowShop]): Models of the scenarios, not ignited yet
+    """
+    global SCENARIO_MODELS
+    SCENARIO_MODELS = models
+
+
+def solve_scenario(index: int) -> Dict[str, Any]:
+    """Build and solve one of the models of 'SCENARIO_MODELS'. This function is meant
+    to be run inside a process pool, see 'init_scenarios'
+
+    Args:
+        index (int): Position of the model in 'SCENARIO_MODELS'
+
+    Returns:
+        Dict[str, Any]: Row of the comparison table, see 'scenario_row'
+    """
+    model = SCENARIO_MODELS[index]
+    start = perf_counter()
+    model.run()
+    return scenario_row(model, perf_counter() - start)
+
+
+def scenario_row(model: Any, runtime: float) -> Dict[str, Any]:
+    """Row of the comparison table of a solved scenario
+
+    Args:
+        model (FlowShop): Solved model of the scenario
+        runtime (float): Seconds spent building and solving the model
+
+    Returns:
+        Dict[str, Any]: Status ("status"), value of each objetive ("objetives"), number
+            of scheduled orders ("orders") and seconds spent ("runtime"). Components of
+            decomposition mode are merged, see 'merge_objetives'
+    """
+    values, orders = [None] * len(model.targets), set()
+    if model.status in ["FEASIBLE", "OPTIMAL"]:
+        if model.components:
+            values = merge_objetives(model.targets, [
+                [component.solver.Value(or_target) for or_target in component.or_targets]
+                for component in model.components])
+        else:
+            values = [model.solver.Value(or_target) for or_target in model.or_targets]
+        # New plans are inserted after the fixed ones, campaigns are split into orders
+        orders = {plan.toSolve.name for plan in model.result().plans[len(model.in_program.plans):]
+                  if plan.toSolve}
+    return {
+        "status": model.status,
+        "objetives": dict(zip(model.targets, values)),
+        "orders": len(orders),
+        "runtime": runtime,
+    }
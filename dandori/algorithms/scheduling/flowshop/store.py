@@ -0,0 +1,121 @@
+from typing import Any, Dict, Iterable, List
+# Thrid-party dependencies
+import numpy as np
+from attr import attrib, attrs
+
+# Kinds of tasks
+PROCESS, TRANSITION, FIXED = range(3)
+
+# Columns of the store, proto indices of the variables of each task
+ACTIVE, START, END, DURATION, INTERVAL, KIND = range(6)
+
+
+@attrs
+class VariableStore:
+    """Central store of the tasks of the model: processes, transitions and fixed plans.
+    Each task is registered once with the proto indices of its variables in a row
+    of a NumPy array (-1 if it has no such variable, e.g. the presence of fixed plans)
+    and each resource keeps the positions of its tasks. Constraints and objetives are
+    posted by slicing these arrays instead of walking the ORtuples of each resource
+    """
+    table = attrib(factory=lambda: np.empty((0, 6), dtype=np.int64))
+    removed = attrib(factory=lambda: np.empty(0, dtype=bool))
+    resources = attrib(factory=dict)  # resource.name, positions of its tasks
+    pending = attrib(factory=list)  # Rows not merged into the table yet
+    assigned = attrib(factory=list)  # resource.name & position not merged yet
+
+    def __len__(self) -> int:
+        return len(self.table) + len(self.pending)
+
+    def extend(self, or_output: Dict[str, List[Any]], transition: bool = False) -> None:
+        """Register the ORtuples of each resource. ORtuples shared between resources
+        of the same output (e.g. a process performed in many resources) are
+        registered once
+
+        Args:
+            or_output (Dict[str, List[ORTuple]]): ORtuples grouped by the name of the resource
+            transition (bool, optional): True if they are transitions. Defaults to False.
+        """
+        positions = {}  # id(ORTuple), position
+        for name, or_tuples in or_output.items():
+            for or_tuple in or_tuples:
+                if id(or_tuple) not in positions:
+                    positions[id(or_tuple)] = len(self)
+                    kind = TRANSITION if transition else PROCESS
+                    if or_tuple.active is None:
+                        kind = FIXED
+                    self.pending.append(tuple(-1 if or_var is None else or_var.Index()
+                                              for or_var in or_tuple) + (kind,))
+                self.assigned.append((name, positions[id(or_tuple)]))
+
+    def remove(self, actives: Iterable[int]) -> None:
+        """Leave out the tasks whose presence is one of the given variables from the
+        slices of the store (e.g. the processes of removed orders). Their variables
+        are still in the model
+
+        Args:
+            actives (Iterable[int]): Proto indices of the presence variables
+        """
+        self.flush()
+        self.removed |= np.isin(self.table[:, ACTIVE], list(actives))
+
+    def flush(self) -> None:
+        """Merge the tasks registered since the last slice into the arrays
+        """
+        if self.pending:
+            self.table = np.vstack([self.table, np.array(self.pending, dtype=np.int64)])
+            self.removed = np.concatenate([self.removed, np.zeros(len(self.pending), dtype=bool)])
+            self.pending = []
+
+        grouped = {}
+        for name, position in self.assigned:
+            grouped.setdefault(name, []).append(position)
+        for name, positions in grouped.items():
+            self.resources[name] = np.concatenate([
+                self.resources.get(name, np.empty(0, dtype=np.int64)),
+                np.array(positions, dtype=np.int64)])
+        self.assigned = []
+
+    def names(self) -> List[str]:
+        """Names of the resources with tasks
+
+        Returns:
+            List[str]: Names of the resources
+        """
+        self.flush()
+        return list(self.resources)
+
+    def tasks(self, name: str = None, kinds: List[int] = None, since: int = 0) -> np.ndarray:
+        """Positions of the tasks of a resource, or of the whole model
+
+        Args:
+            name (str, optional): Name of the resource. Defaults to all the tasks.
+            kinds (List[int], optional): Kinds of the tasks. Defaults to all of them.
+            since (int, optional): Only tasks registered from this position on, see
+                'len'. Defaults to 0.
+
+        Returns:
+            np.ndarray: Positions of the tasks, removed ones left out
+        """
+        self.flush()
+        if name is None:
+            positions = np.arange(len(self.table), dtype=np.int64)
+        else:
+            positions = self.resources.get(name, np.empty(0, dtype=np.int64))
+        mask = (positions >= since) & ~self.removed[positions]
+        if kinds is not None:
+            mask &= np.isin(self.table[positions, KIND], kinds)
+        return positions[mask]
+
+    def column(self, column: int, positions: np.ndarray) -> List[int]:
+        """Proto indices of a variable of some tasks
+
+        Args:
+            column (int): Variable of the tasks, e.g. 'END'
+            positions (np.ndarray): Positions of the tasks, see 'tasks'
+
+        Returns:
+            List[int]: Proto index of the variable of each task
+        """
+        self.flush()
+        return self.table[positions, column].tolist()
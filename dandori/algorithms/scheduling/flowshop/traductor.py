@@ -1,51 +1,91 @@
-from typing import List
-from datetime import datetime, timedelta
-from collections import defaultdict
-from ortools.sat.python.cp_model import CpSolver
-from networkx import DiGraph
-from dandori.models import Plan, Program, Stop
+from copy import copy
+from typing import Callable, Dict, List
+from datetime import datetime
+from collections import defaultdict, namedtuple
+import numpy as np
+from ortools.sat.python.cp_model import CpSolver, CpSolverSolutionCallback, ObjectiveSolutionPrinter
+from dandori.models import Order, Plan, Program, Stop
 from dandori.helpers import datetools as dt
+from .recipes import RecipeInstance
+from .campaigns import split_span
+
+Solution = namedtuple("Solution", "program objective bound walltime")
+
+
+def solution_values(solver: CpSolver) -> np.ndarray:
+    """Values of all the variables of the model in the solution, read at once from
+    the response instead of variable by variable
+
+    Args:
+        solver (CpSolver): OR-tools instance with a solution. Solution callbacks and
+            'ResponseSolver' are accepted too
+
+    Returns:
+        np.ndarray: Value of each variable by its index
+    """
+    if isinstance(solver, CpSolverSolutionCallback):
+        response = solver.Response()
+    else:  # CpSolver or ResponseSolver
+        response = solver.ResponseProto()
+    return np.array(response.solution, dtype=np.int64)
 
 
 def insert_plans(
         program: Program,
-        solver: CpSolver,
-        GraphRecipe: DiGraph,
+        values: np.ndarray,
+        instances: List[RecipeInstance],
         pivot: datetime,
-        scale: str = "hours") -> None:
+        scale: str = "hours",
+        campaigns: Dict[str, List[Order]] = None) -> None:
     """Function to map the OR-tools' CpSolver's solution variables into the
     Schedule-Logic plans in order to generate a program solution considerating
-    all constrains and objective-function.
+    all constrains and objective-function. Values of all the processes are read
+    in a single pass and their offsets are converted to datetimes at once
 
     Args:
         program (Program): Schedule logic instance to insert all the plans
-        solver (CpSolver): OR-tools instace to view the value of the CpModel's variables
-        GraphRecipe (DiGraph): Recipe Graph to download all the OR-tools variables from
+        values (np.ndarray): Value of each variable in the solution, see 'solution_values'
+        instances (List[RecipeInstance]): Activated recipe instances to download all the
+            OR-tools variables from
         pivot (datetime): Minimal timestamp from which we calculate intervals
         scale (str, optional): Time scale for the duration of the plans. Defaults to "hours".
+        campaigns (Dict[str, List[Order]], optional): Orders merged by the name of
+            their campaign. Plans are split between them, see 'split_span'. Defaults to None.
     """
-    for _, info in GraphRecipe.nodes(data=True):
+    nodes = [(instance, node) for instance in instances for node in range(len(instance.or_vars))]
+    if not nodes:
+        return
+    indices = np.array([(or_tuple.active.Index(), or_tuple.start.Index(), or_tuple.end.Index())
+                        for instance in instances for or_tuple in instance.or_vars], dtype=np.int64)
+    actives, starts, ends = values[indices].T
 
-        active = solver.Value(info["or_vars"].active)
+    spans = []  # order, resource, process, recipe, start, end
+    for (instance, node), active, start, end in zip(nodes, actives, starts, ends):
         if not active:
             continue
+        or_tuple = instance.or_vars[node]
+        compiled = instance.template
+        process = compiled.tasks[node].process
+        resources = [compiled.resources[r] for r, or_node in instance.node_tuples(node)
+                     if or_node is or_tuple or values[or_node.active.Index()]]
+        members = (campaigns or {}).get(instance.order.name)
+        spans.extend((order, resource, process, instance.recipe, first, last)
+                     for order, first, last in (split_span(members, start, end) if members
+                                                else [(instance.order, start, end)])
+                     for resource in resources)
 
-        start = solver.Value(info["or_vars"].start)
-        end = solver.Value(info["or_vars"].end)
-        process = info["task"].process
-        recipe = GraphRecipe.graph["recipe"]
-        order = GraphRecipe.graph["order"]
-
-        program.plans.extend([Plan(
-            startAt=pivot + timedelta(**{scale: start}),
-            endAt=pivot + timedelta(**{scale: end}),
-            program=program,
-            resource=resource,
-            process=process,
-            toSolve=order,
-            material=order.material,
-            recipe=recipe,
-        ) for resource in info["resources"]])
+    firsts = dt.to_datetimes([span[4] for span in spans], pivot, scale)
+    lasts = dt.to_datetimes([span[5] for span in spans], pivot, scale)
+    program.plans.extend([Plan(
+        startAt=first,
+        endAt=last,
+        program=program,
+        resource=resource,
+        process=process,
+        toSolve=order,
+        material=order.material,
+        recipe=recipe,
+    ) for (order, resource, process, recipe, _, _), first, last in zip(spans, firsts, lasts)])
 
 
 def insert_stops(program: Program, stops: List[Stop]) -> None:
@@ -70,3 +110,79 @@ def insert_stops(program: Program, stops: List[Stop]) -> None:
             stop=stop
         ) for resource, stop in group]
         program.plans.extend(dt.squash_intervals(plans))
+
+
+def create_program(
+        base: Program,
+        solver: CpSolver,
+        ignitions: Dict[str, List[RecipeInstance]],
+        pivot: datetime,
+        scale: str = "hours",
+        campaigns: Dict[str, List[Order]] = None) -> Program:
+    """Create a new program with the plans of 'base' plus the plans of the recipes
+    activated in the solution. 'base' is not modified
+
+    Args:
+        base (Program): Program with the fixed plans and stops
+        solver (CpSolver): OR-tools instance to view the value of the CpModel's variables
+        ignitions (Dict[str, List[RecipeInstance]]): Recipe instances grouped by the name
+            of the order
+        pivot (datetime): Minimal timestamp from which we calculate intervals
+        scale (str, optional): Time scale for the duration of the plans. Defaults to "hours".
+        campaigns (Dict[str, List[Order]], optional): Orders merged by the name of
+            their campaign. Defaults to None.
+
+    Returns:
+        Program: New program
+    """
+    program = copy(base)
+    program.plans = list(base.plans)
+
+    # Parents of decomposition and rolling-horizon modes have nothing to read
+    if ignitions:
+        values = solution_values(solver)
+        instances = [instance for networks in ignitions.values()
+                     for instance in networks if values[instance.or_recipe.Index()]]
+        insert_plans(program, values, instances, pivot, scale, campaigns)
+
+    # Recalculating extension from the program
+    if program.plans:
+        program.startAt = min(plan.startAt for plan in program.plans)
+        program.endAt = max(plan.endAt for plan in program.plans)
+    return program
+
+
+class SolutionStreamer(ObjectiveSolutionPrinter):
+    """Solution callback that, besides printing the objective, materializes a program
+    on each new solution and emits it to the user's callback as a 'Solution' with
+    the objective, the best bound and the wall time
+    """
+
+    def __init__(
+            self,
+            base: Program,
+            ignitions: Dict[str, List[RecipeInstance]],
+            pivot: datetime,
+            scale: str,
+            callback: Callable[[Solution], None],
+            campaigns: Dict[str, List[Order]] = None):
+        ObjectiveSolutionPrinter.__init__(self)
+        self.base = base
+        self.ignitions = ignitions
+        self.pivot = pivot
+        self.scale = scale
+        self.callback = callback
+        self.campaigns = campaigns
+
+    def on_solution_callback(self) -> None:
+        """Called by the solver on each new solution
+        """
+        ObjectiveSolutionPrinter.on_solution_callback(self)
+        program = create_program(self.base, self, self.ignitions,
+                                 self.pivot, self.scale, self.campaigns)
+        self.callback(Solution(
+            program=program,
+            objective=self.ObjectiveValue(),
+            bound=self.BestObjectiveBound(),
+            walltime=self.WallTime(),
+        ))
@@ -182,7 +182,8 @@ class RoutingScheduler:
                 code = rel.material.code
                 self.recetary[code][vehicule] = GraphRecipe
 
-    def link_function(self, function: Callable, codes: List[str]) -> None:
+    def link_function(self, function: Callable, codes: List[str], cache_key: Callable = None,
+                      cache_size: int = 1024, batch: bool = False) -> None:
         """This method links the current callable with identifier 'code' to all
         the Schedule-Logic's Functions with the same code in order to calculate
         process time in a fashinable way
@@ -191,11 +192,18 @@ class RoutingScheduler:
             function(Callable): function to be called during execution, Has to
                 return and integer and have 'order' & 'process' as inputs
             code(str): Identifier of the function
+            cache_key(Callable, optional): Function with 'order' & 'process' as inputs
+                returning a hashable key to memoize durations. Defaults to None.
+            cache_size(int, optional): Maximum number of memoized durations. Defaults to 1024.
+            batch(bool, optional): True if the function has 'orders' & 'processes' arrays
+                as inputs and returns an array of integers. Defaults to False.
         """
-        raise_invalid_func(function, FunctionType.PROCESS_TIME)
+        raise_invalid_func(function, FunctionType.PROCESS_TIME, batch)
         for code in codes:
             self.funbook[code].call = function
             self.funbook[code].linked = True
+            self.funbook[code].batch = batch
+            self.funbook[code].memoize(cache_key, cache_size)
 
     def __init_program(self) -> None:
         """Ignite program
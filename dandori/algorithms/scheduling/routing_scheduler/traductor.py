@@ -1,12 +1,12 @@
 from typing import Dict, List, Callable
 from datetime import datetime, timedelta
+from itertools import islice
 from collections import defaultdict, namedtuple
 # Thrid-party dependencies
 from pydash import group_by
 from networkx import DiGraph, topological_sort
 # Self dependencies
-from dandori.models import Order, Plan, Program
-from dandori.helpers.graphtools import calculate_durations
+from dandori.models import Order, Plan, Program, evaluate_durations
 from dandori.algorithms.scheduling.routing_scheduler.globals import MAX_COST_PER_ARC
 
 Vehicule = namedtuple("Vehicule", ["index", "allowedOrders"])
@@ -167,27 +167,36 @@ def stack_fifo_plans(
         RuntimeError: [description]
     """
     last_used = last_use_in_resources(program, pivot)
+    graphs = []
 
     for order in orders:
         # Get selected recipe given the vehicule for the current material
-        # ! cuidado. La restriccion de dependencia solo se cumple si el grafo es lineal: 0->1->2->3
-        # TODO: modificar el generador de planes para que respete la restricción de dependencia.
-        # * Hint: guardar los minEndAt de los nodos ya explorados en un defaultdict y usar G.incoming[node]
         GraphRecipe = recetary[order.material.code].get(code)
 
         if not GraphRecipe:
             raise RuntimeError(
                 f"There is no recipe associate with material '{order.material.code}' in vehicule '{code}'")
+        graphs.append(GraphRecipe)
+
+    # Calculate extension of all processes at once, see 'evaluate_durations'
+    durations = iter(evaluate_durations([
+        (info["time"], order, info["task"].process)
+        for order, GraphRecipe in zip(orders, graphs)
+        for _, info in GraphRecipe.nodes(data=True)]))
 
-        GraphRecipe.graph["order"] = order
-        calculate_durations(GraphRecipe)  # calculate extension or processes
+    for order, GraphRecipe in zip(orders, graphs):
+        # ! cuidado. La restriccion de dependencia solo se cumple si el grafo es lineal: 0->1->2->3
+        # TODO: modificar el generador de planes para que respete la restricción de dependencia.
+        # * Hint: guardar los minEndAt de los nodos ya explorados en un defaultdict y usar
+        # * G.incoming[node]
+        duration = dict(zip(GraphRecipe.nodes, islice(durations, len(GraphRecipe))))
         sorted_nodes = list(topological_sort(GraphRecipe))  # FIFO sort
 
         for node in sorted_nodes:
             # Get maxStartAt from resource occupancy and calculate minEndAt
             info = GraphRecipe.nodes[node]
             maxStartAt = max(last_used[r.code] for r in info["resources"])
-            minEndAt = maxStartAt + timedelta(**{scale: info["task"].duration})
+            minEndAt = maxStartAt + timedelta(**{scale: duration[node]})
 
             # Update last used in resources
             for r in info["resources"]:
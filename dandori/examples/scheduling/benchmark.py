@@ -0,0 +1,43 @@
+import tracemalloc
+from time import perf_counter
+from typing import Dict, Union
+from dandori.examples import build_models
+from dandori.examples.scheduling.flowshop import make_flowshop_example
+
+
+def benchmark_flowshop_build(**kwargs: Union[int, str]) -> Dict[str, float]:
+    """Measure time and memory spent building (not solving) a FlowShop model for a
+    random instance, see 'FlowShop.build'. Memory is the peak of the Python
+    allocations traced by tracemalloc, not the memory of the process (OR-tools
+    allocates outside the interpreter). It is measured in a second build because
+    tracing allocations slows down the interpreter
+
+    Returns:
+        Dict[str, float]: Build time in seconds and peak of traced allocations in MiB
+    """
+    data = build_models(**kwargs)
+    report = {"orders": len(data["demand"].orders)}
+
+    model = make_flowshop_example(data=data)
+    start = perf_counter()
+    model.build()
+    report["seconds"] = perf_counter() - start
+
+    model = make_flowshop_example(data=data)
+    tracemalloc.start()
+    model.build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report["traced_peak_mib"] = peak / (1 << 20)
+
+    return report
+
+
+if __name__ == "__main__":
+    print(benchmark_flowshop_build(
+        num_orders=2000,
+        num_products=20,
+        num_recipes_per_prod=3,
+        num_processors=10,
+        max_processes=5,
+        min_order_extension=100))
@@ -9,23 +9,28 @@ from dandori.generators.gen_model import connect_models
 def make_flowshop_example(
         with_ids: bool = False,
         with_optional: bool = False,
+        data: dict = None,
         ** kwargs: Union[int, str]) -> FlowShop:
 
-    # Setting Flowshop's model
-    data = build_models(**kwargs)
+    # Setting Flowshop's model. Random data is built if none was given
+    if data is None:
+        data = build_models(**kwargs)
     if with_ids:
         assing_random_unique_ids(data)
 
     if with_optional:
         torc = "TORC-FLWS"  # Test Optional Resource Constraint - FlowShop
-        material = Material(code=torc)
-        process = Process(code=torc)
+        material = Material(code=torc, name=torc)
+        process = Process(code=torc, name=torc)
         torc_recipe = Recipe(code=torc)
         resources = [Resource(code=i, name=i) for i in ["A", "B", "C", "D", "E", "F"]]
         connect_models([process], resources)
         connect_models([torc_recipe], [process])
         connect_models([torc_recipe], [material])
-        torc_order = Order(code=torc, name=torc, material=material)
+        orders = data["demand"].orders
+        torc_order = Order(code=torc, name=torc, material=material, quantity=1,
+                           startAt=min(order.startAt for order in orders),
+                           endAt=max(order.endAt for order in orders))
         # Append artificial order & recipe to input data
         data["demand"].orders.append(torc_order)
         data["recipes"].append(torc_recipe)
@@ -37,6 +42,8 @@ def make_flowshop_example(
     model.set_demand(data["demand"])
     model.add_recipes(data["recipes"])
     model.add_stops(data["stops"])
+    if with_optional:
+        model.add_optionals(torc, torc, [["A", "B"], ["C", "D"], ["E"], ["F"]])
 
     return model
 
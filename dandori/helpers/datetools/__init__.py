@@ -1 +1,2 @@
-from .tools import to_int, to_iso8601, is_intersected, tolerance, round_date, squash_intervals
+from .tools import to_int, to_datetimes, to_iso8601, is_intersected, tolerance, round_date, \
+    squash_intervals
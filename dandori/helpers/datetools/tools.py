@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Sequence
 from datetime import datetime, timedelta
+import numpy as np
 from gstorm import GraphQLType
 from inflect import engine
 
@@ -42,6 +43,33 @@ def to_int(date_obj: datetime, pivot: datetime, scale: str = "seconds") -> int:
     return time_conversor(date_obj, pivot, map_scales[scale])
 
 
+def to_datetimes(offsets: Sequence[float], pivot: datetime,
+                 scale: str = "seconds") -> List[datetime]:
+    """Convert many offsets from a pivot datetime into datetime.datetime objects at
+    once, the inverse of 'to_int'. Offsets are rounded to microseconds in a single
+    vectorized pass
+
+    Args:
+        offsets (Sequence[float]): Offsets from the pivot in units of the scale
+        pivot (datetime): Datetime as a reference point
+        scale (str, optional): Scale of time of the offsets. May be one of the
+            followings: "seconds", "minutes", "hours", "days". Defaults to "seconds".
+
+    Raises:
+        NotImplementedError: In case 'scale' it is not defined
+
+    Returns:
+        List[datetime]: Datetime of each offset
+    """
+    if scale not in map_scales:
+        raise NotImplementedError(
+            f"Scale '{scale}' not registered. "
+            f"You may try one of the followings: {list(map_scales)}")
+    unit = timedelta(**{scale: 1}) // timedelta(microseconds=1)
+    micros = np.rint(np.asarray(offsets, dtype=np.float64) * unit).astype("timedelta64[us]")
+    return [pivot + delta for delta in micros.tolist()]
+
+
 def to_iso8601(date_obj: datetime, t: bool = True, z: bool = True) -> str:
     """Datetime function to get a string from a datetime object in ISO-8601 format
 
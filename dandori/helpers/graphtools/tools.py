@@ -259,7 +259,7 @@ def calculate_durations(GraphRecipe: DiGraph, **args) -> None:
 
     for _, info in GraphRecipe.nodes(data=True):
         args["process"] = info["task"].process
-        info["task"].duration = int(info["time"].call(**args))
+        info["task"].duration = info["time"].evaluate(**args)
 
 
 def calculate_quantities(GraphRecipe: DiGraph, redo: bool = False, **inputs: Any) -> None:
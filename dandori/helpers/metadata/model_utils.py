@@ -5,6 +5,7 @@ from inspect import getfullargspec
 from collections import defaultdict
 from enum import Enum
 from typing import Callable, List, Union, Any
+import numpy as np
 from gstorm import GraphQLType
 from dandori.models import *
 from dandori.models import __models__, __arcs__, __relations__, __enums__, __version__
@@ -209,15 +210,17 @@ def plural_field(obj: Union[GraphQLType, Enum, str]) -> str:
     return eng.plural(modelname[0].lower() + modelname[1:])
 
 
-def raise_invalid_func(function: Callable, ftype: FunctionType) -> None:
+def raise_invalid_func(function: Callable, ftype: FunctionType, batch: bool = False) -> None:
     """This method raise a ValueError exception if the given 'function' is not compatible with the Scheduler's standards
 
     Args:
         function (Callable): A callable function
         ftype (FunctionType): Type of output funtion. Read more about Schedule-Logic
+        batch (bool, optional): True if 'function' receives arrays of inputs and returns
+            an array of integers. Defaults to False.
 
     Raises:
-        ValueError: If 'function' does not return an integer
+        ValueError: If 'function' does not return an integer (or an array in batch mode)
         ValueError: If 'function' lacks the correct inputs
     """
     _inputs = {
@@ -226,20 +229,29 @@ def raise_invalid_func(function: Callable, ftype: FunctionType) -> None:
         FunctionType.CHANGEOVER_COST: ["prev_order", "next_order", "changeover"],
         FunctionType.INGREDIENT_QUANTITY: ["order", "recipe"],
     }
-
-    # Get function's metadata
-    fargs = getfullargspec(function).annotations
+    _batch_inputs = {
+        FunctionType.PROCESS_TIME: ["orders", "processes"],
+    }
 
     # Raise invalid function
     if not isinstance(function, Callable):
         raise ValueError(
             f"Instance {function} is not callable")
-    if not fargs.get("return") == int:
+    if batch and ftype not in _batch_inputs:
+        raise NotImplementedError(
+            f"Batch mode is not implemented for {ftype}")
+
+    # Get function's metadata
+    fargs = getfullargspec(function).annotations
+    inputs = _batch_inputs[ftype] if batch else _inputs[ftype]
+    output = np.ndarray if batch else int
+
+    if not fargs.get("return") == output:
         raise ValueError(
-            f"Callable '{function.__name__}' does not return 'int' value")
-    if not all(fargs.get(attr) for attr in _inputs[ftype]):
+            f"Callable '{function.__name__}' does not return '{output.__name__}' value")
+    if not all(fargs.get(attr) for attr in inputs):
         raise ValueError(
-            f"Callable '{function.__name__}' lacks one of the following parameters: {_inputs[ftype]}")
+            f"Callable '{function.__name__}' lacks one of the following parameters: {inputs}")
 
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import random
-from typing import Callable
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
 import attr
+import numpy as np
 
 
 # * code = "DEFAULT_SDL_TIME_CODE" *
@@ -9,11 +11,176 @@ def DEFAULT_TIME_FUNCTION(**kwargs):
     return random.randint(5*60, 30*60)
 
 
+def object_array(items: List[Any]) -> np.ndarray:
+    """One dimensional array of objects. Items are assigned one by one so sequence-like
+    objects are not unpacked by NumPy"""
+    array = np.empty(len(items), dtype=object)
+    for i, item in enumerate(items):
+        array[i] = item
+    return array
+
+
 @attr.s
 class Time:
-    """Time class for register callables functions in funbook
+    """Time class for register callables functions in funbook. If a cache key is
+    given, durations are memoized by the key's value with LRU eviction. Functions
+    in batch mode receive arrays of orders & processes and return an array of durations
     """  # TODO [SDLMICRO-137]: eliminar esta clase
     duration: int = attr.ib(default=0)
     scale: str = attr.ib(default="hours")
     linked: bool = attr.ib(default=False)
     call: Callable = attr.ib(default=DEFAULT_TIME_FUNCTION)
+    batch: bool = attr.ib(default=False)
+    cache_key: Callable = attr.ib(default=None)
+    cache_size: int = attr.ib(default=None)
+    cache: OrderedDict = attr.ib(factory=OrderedDict, repr=False)
+    hits: int = attr.ib(default=0)
+    misses: int = attr.ib(default=0)
+
+    def evaluate(self, **kwargs: Any) -> int:
+        """Calculate the duration through the linked function. Memoized values are
+        returned without calling the function again
+
+        Returns:
+            int: Duration in the scale of the function
+        """
+        if self.batch:
+            return int(self.evaluate_batch([kwargs["order"]], [kwargs["process"]])[0])
+
+        if self.cache_key is None:
+            return int(self.call(**kwargs))
+
+        key = self.cache_key(**kwargs)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        duration = int(self.call(**kwargs))
+        self._store(key, duration)
+        return duration
+
+    def evaluate_batch(self, orders: List[Any], processes: List[Any]) -> np.ndarray:
+        """Calculate the durations of many (order, process) pairs. Functions in batch
+        mode are called once with the pairs whose duration is not memoized, otherwise
+        the function is called pair by pair
+
+        Args:
+            orders (List[Any]): Orders of each pair
+            processes (List[Any]): Processes of each pair
+
+        Raises:
+            ValueError: If the batch function does not return one duration per pair
+
+        Returns:
+            np.ndarray: Integer durations of each pair
+        """
+        if not self.batch:
+            return np.fromiter((self.evaluate(order=order, process=process)
+                                for order, process in zip(orders, processes)),
+                               dtype=np.int64, count=len(orders))
+
+        if self.cache_key is None:
+            return self._call_batch(orders, processes)
+
+        # Pairs with the same key are calculated once
+        keys = [self.cache_key(order=order, process=process)
+                for order, process in zip(orders, processes)]
+        missing = {}  # key, index of its first pair
+        for i, key in enumerate(keys):
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            elif key not in missing:
+                missing[key] = i
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        indices = list(missing.values())
+        values = self._call_batch([orders[i] for i in indices], [processes[i] for i in indices])
+        calculated = dict(zip(missing, values.tolist()))
+        durations = np.array([calculated[key] if key in calculated else self.cache[key]
+                              for key in keys], dtype=np.int64)
+
+        for key, duration in calculated.items():
+            self._store(key, duration)
+        return durations
+
+    def memoize(self, cache_key: Callable = None, cache_size: int = None) -> None:
+        """Set (or unset if 'cache_key' is None) the memoization of the durations.
+        Previous memoized values are discarded
+
+        Args:
+            cache_key (Callable, optional): Function with the same inputs than 'call'
+                returning a hashable value. Calls with the same key must have the same
+                duration. Defaults to None.
+            cache_size (int, optional): Maximum number of memoized durations. Defaults
+                to None (unbounded).
+
+        Raises:
+            ValueError: If 'cache_key' is not callable
+        """
+        if cache_key is not None and not callable(cache_key):
+            raise ValueError(f"Instance {cache_key} is not callable")
+        self.cache_key = cache_key
+        self.cache_size = cache_size
+        self.cache_clear()
+
+    def _call_batch(self, orders: List[Any], processes: List[Any]) -> np.ndarray:
+        """Call the batch function and check its output"""
+        if not orders:
+            return np.zeros(0, dtype=np.int64)
+        durations = np.asarray(self.call(orders=object_array(orders),
+                                         processes=object_array(processes)), dtype=np.int64)
+        if durations.shape != (len(orders),):
+            raise ValueError(
+                f"Callable '{self.call.__name__}' returned {durations.shape} durations, "
+                f"expected ({len(orders)},)")
+        return durations
+
+    def _store(self, key: Any, duration: int) -> None:
+        """Memoize a duration evicting the least recently used one if the cache is full"""
+        self.cache[key] = duration
+        if self.cache_size is not None and len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def cache_clear(self) -> None:
+        """Discard all memoized durations and reset the counters
+        """
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def cache_info(self) -> Dict[str, int]:
+        """Statistics of the memoization
+
+        Returns:
+            Dict[str, int]: Hits, misses, current size and maximum size of the cache
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self.cache), "maxsize": self.cache_size}
+
+
+def evaluate_durations(requests: List[Tuple[Time, Any, Any]]) -> List[int]:
+    """Calculate the durations of many (time, order, process) requests. Requests are
+    grouped by their Time, so each function in batch mode is called just once
+
+    Args:
+        requests (List[Tuple[Time, Any, Any]]): Time of the process, order and process
+
+    Returns:
+        List[int]: Durations in the same order than the requests
+    """
+    durations = [0] * len(requests)
+    groups = {}  # id(time), (time, [index])
+
+    # Time instances are not hashable, they are grouped by identity
+    for i, (time, _, _) in enumerate(requests):
+        groups.setdefault(id(time), (time, []))[1].append(i)
+
+    for time, indices in groups.values():
+        values = time.evaluate_batch([requests[i][1] for i in indices],
+                                     [requests[i][2] for i in indices])
+        for i, duration in zip(indices, values.tolist()):
+            durations[i] = duration
+    return durations
@@ -44,7 +44,7 @@ from .UomType import UomType
 
 # Others
 from .Task import Task
-from .Time import Time
+from .Time import Time, evaluate_durations
 from .Ingredient import Ingredient
 
 __models__ = [
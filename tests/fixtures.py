@@ -8,7 +8,7 @@ from dandori.examples.scheduling import make_flowshop_example
 from dandori.algorithms.scheduling.flowshop.ignition import ignite_optimizator, ignite_program, ignite_transitions
 from dandori.algorithms.scheduling.flowshop.constrains import add_dependency, add_resource_no_overlap, add_single_recipe
 from dandori.helpers import datetools as dt
-from dandori.models import Lot, Demand, InventoryGroup, Material, Order
+from dandori.models import Lot, Demand, InventoryGroup, Material, Order, Process
 from dandori.algorithms.inventory.just_in_time.planner import JustInTime
 from datetime import datetime
 
@@ -161,12 +161,34 @@ def ignit_program():
         model._FlowShop__init_model()
         or_output = ignite_program(
             model.model, model.in_program, model.pivot, model.scale)
-        for name, or_list in or_output.items():
-            model.or_data[name].extend(or_list)
+        model.store.extend(or_output)
         return "Pass on program ignit test"
     return init_program
 
 
+@pytest.fixture(scope='session')
+def link_durations():
+    """
+    By giving a Flowshop model, link the same duration to every function of its funbook.
+    """
+    def link(model, time=60):
+        """
+        Replace the duration functions of the model by a constant one
+        Args:
+            model: Flowshop
+            time (int): Duration of every process in units of the scale. Defaults to 60
+        Returns:
+            Flowshop: The same model
+        """
+        def duration(order: Order, process: Process) -> int:
+            return time
+
+        for code in list(model.funbook):
+            model.link_function(duration, code)
+        return model
+    return link
+
+
 @pytest.fixture(scope='session')
 def ignit_constrains():
     """
@@ -183,7 +205,7 @@ def ignit_constrains():
             for GraphRecipe in networks:
                 # Processes dependency
                 add_dependency(model.model, GraphRecipe)
-        add_resource_no_overlap(model.model, model.or_data, model.or_trans)
+        add_resource_no_overlap(model.model, model.store)
         return "Pass on constrain ignit test"
     return init_constrains
 
@@ -202,7 +224,7 @@ def ignit_target():
         if not model.targets:
             return "No target provided"
         model.or_targets = ignite_optimizator(
-            model, model.or_data, model.or_trans,
+            model, model.store,
             model.targets, model.optim_mode)
         return "Pass on target ignit test"
     return init_target
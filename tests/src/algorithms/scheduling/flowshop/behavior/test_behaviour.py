@@ -1,11 +1,43 @@
 import pytest
+import numpy as np
+from copy import copy, deepcopy
+from datetime import datetime, timedelta
+from collections import defaultdict
+from networkx import DiGraph
+from ortools.sat.python import cp_model
+from dandori.helpers import datetools as dt
+from dandori.models import Order, Process, Changeover, Function, Recipe, Resource, Task
 from dandori.validators.valid_metadata import valid_metadata
 from dandori.examples import generate_random_inputs, build_models
+from dandori.algorithms.scheduling.flowshop.constrains import add_dependency, add_energy_bound, \
+    add_resource_precedences
+from dandori.algorithms.scheduling.flowshop.campaigns import create_campaign
+from dandori.algorithms.scheduling.flowshop.decomposition import find_components
+from dandori.algorithms.scheduling.flowshop.ignition import ORTuple, ignite_recipe
+from dandori.algorithms.scheduling.flowshop.recipes import Recetary, compile_recipe, \
+    create_recipe_instance, find_interchangeable
+from dandori.algorithms.scheduling.flowshop.scenarios import Scenario
+from dandori.algorithms.scheduling.flowshop.store import FIXED, INTERVAL, PROCESS, TRANSITION
+from dandori.algorithms.scheduling.flowshop.globals import DEFAULT_SEARCH, PRESETS
 from dandori.examples.scheduling import make_flowshop_example
+from dandori.algorithms.scheduling import FlowShop
 
 cases = generate_random_inputs(cases=10, size=(1, 5))
 
 
+def make_diamond(resources):
+    """
+    Network dependency a -> (b, c) -> d of a hand-built recipe, performed in the given
+    resources by name of the node
+    """
+    network = DiGraph(recipe=Recipe(code="diamond"))
+    for node, names in resources.items():
+        network.add_node(node, task=Task(process=Process(name=node, code=node)), time=None,
+                         resources=[Resource(name=name) for name in names])
+    network.add_edges_from([("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")])
+    return network
+
+
 @pytest.mark.flowshop
 @pytest.mark.parametrize(["guid", "inputs"], cases.items())
 def test_difference_result(flowshop_result, build_instances, guid, inputs):
@@ -45,3 +77,1166 @@ def test_ignitions(ignit_program, ignit_constrains, ignit_target, build_instance
     target = ignit_target(model)
     assert target, \
         f"Target from {data} got problem while try ignition"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_recipe_registry(build_instances, guid, inputs):
+    """
+    Register a duplicated recipe ahead of the rest. Duplicates are skipped and the rest of
+    recipes registered
+    """
+    recipes = build_instances(guid, **inputs)["recipes"]
+    model = FlowShop()
+    model.add_recipes(recipes[:1])
+    model.add_recipes(recipes)
+    assert len(model.recetary) == len({recipe.code for recipe in recipes}), \
+        f"Recipes (guid={guid}) were not registered"
+    for recipe in recipes:
+        for rel in recipe.recipeMaterials:
+            codes = {compiled.recipe.code for compiled in model.recetary[rel.material.name]}
+            assert recipe.code in codes, \
+                f"Recipe {recipe.code} (guid={guid}) is not indexed by its material"
+
+
+@pytest.mark.flowshop
+def test_compiled_recipe():
+    """
+    Compile a hand-built diamond network a -> (b, c) -> d. CSR rows of resources,
+    predecessors, successors and shared resources must match the network, as well as
+    the heads and tails of its work
+    """
+    compiled = compile_recipe(make_diamond(
+        {"a": ["R1"], "b": ["R1", "R2"], "c": ["R2"], "d": ["R1"]}))
+
+    names = compiled.names
+    index = {name: i for i, name in enumerate(names)}
+    assert compiled.size == 4 and names[0] == "a" and names[-1] == "d", \
+        "Nodes are not in topological order"
+    assert len(compiled.res_indptr) == len(compiled.pred_indptr) == compiled.size + 1, \
+        "CSR rows do not match the nodes"
+    resources = {name: {compiled.resource_names[r] for r in compiled.node_resources(index[name])}
+                 for name in names}
+    assert resources == {"a": {"R1"}, "b": {"R1", "R2"}, "c": {"R2"}, "d": {"R1"}}, \
+        "Resources of the nodes were not compiled"
+    preds = {names[v]: {names[compiled.pred_indices[k]] for k in
+                        range(compiled.pred_indptr[v], compiled.pred_indptr[v + 1])}
+             for v in range(compiled.size)}
+    succs = {names[u]: {names[compiled.succ_indices[k]] for k in
+                        range(compiled.succ_indptr[u], compiled.succ_indptr[u + 1])}
+             for u in range(compiled.size)}
+    assert preds == {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"b", "c"}}, \
+        "Predecessors were not compiled"
+    assert succs == {"a": {"b", "c"}, "b": {"d"}, "c": {"d"}, "d": set()}, \
+        "Successors were not compiled"
+    shared = {(names[u], names[v]): {compiled.resource_names[r]
+                                     for r in compiled.edge_resources(k)}
+              for k, (u, v) in enumerate(compiled.edges)}
+    assert shared == {("a", "b"): {"R1"}, ("a", "c"): set(),
+                      ("b", "d"): {"R1"}, ("c", "d"): set()}, \
+        "Shared resources of the edges were not compiled"
+
+    work = {"a": 1, "b": 2, "c": 5, "d": 3}
+    heads, tails = compiled.critical_paths([work[name] for name in names])
+    assert dict(zip(names, heads)) == {"a": 0, "b": 1, "c": 1, "d": 6}, \
+        "Heads do not match the longest paths before each node"
+    assert dict(zip(names, tails)) == {"a": 8, "b": 3, "c": 3, "d": 0}, \
+        "Tails do not match the longest paths after each node"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_warm_start(guid, inputs):
+    """
+    Solve an instance, then solve it again taking the first program as hint.
+    Warm-started model must remain feasible
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    model = make_flowshop_example(data=data)
+    model.run()
+    program = model.result()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+    warm_model = make_flowshop_example(data=data)
+    warm_model.set_hint_program(program)
+    warm_model.run()
+    assert warm_model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Warm-started program (guid={guid}) was not successful"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_build(guid, inputs):
+    """
+    Build a model without solving it, then solve it with 'resolve'. It must match
+    the model built and solved by 'run'
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    model = make_flowshop_example(data=data)
+    model.build()
+    assert model.model is not None and model.status == "UNKNOWN", \
+        f"Model (guid={guid}) was solved by 'build'"
+    model.resolve()
+    ran = make_flowshop_example(data=data)
+    ran.run()
+    assert model.status == ran.status, \
+        f"Built model (guid={guid}) does not match the one of 'run'"
+    assert len(model.model.Proto().constraints) == len(ran.model.Proto().constraints), \
+        f"Built model (guid={guid}) does not match the one of 'run'"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_tight_domains(guid, inputs):
+    """
+    Ignite the recipes of an order. Starts are shifted by the work before and after each
+    process, and a recipe that does not fit in the window of its order is discarded
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    model = make_flowshop_example(data=data)
+    order = model.demand.orders[0]
+    start = dt.to_int(order.startAt, model.pivot, model.scale)
+    end = dt.to_int(order.endAt, model.pivot, model.scale)
+
+    for compiled in model.recetary[order.material.name]:
+        instance = create_recipe_instance(compiled, order, [60] * compiled.size)
+        or_model = cp_model.CpModel()
+        ignite_recipe(or_model, instance, model.pivot, model.scale)
+        for node, or_tuple in enumerate(instance.or_vars):
+            lower = start + instance.heads[node]
+            upper = end - instance.tails[node] - instance.durations[node]
+            assert list(or_tuple.start.Proto().domain) == [lower, upper], \
+                f"Start (guid={guid}) of {compiled.names[node]} was not tightened"
+            # Ends of absent intervals stay free down to the release of the order
+            assert list(or_tuple.end.Proto().domain) == [start, upper + 60], \
+                f"End (guid={guid}) of {compiled.names[node]} was not tightened"
+
+        # The window is one minute shorter than the critical path of the recipe
+        path = max(head + duration + tail for head, duration, tail
+                   in zip(instance.heads, instance.durations, instance.tails))
+        short = copy(order)
+        short.endAt = short.startAt + timedelta(minutes=path - 1)
+        for window, fits in [(order, True), (short, False)]:
+            instance = create_recipe_instance(compiled, window, [60] * compiled.size)
+            or_model = cp_model.CpModel()
+            ignite_recipe(or_model, instance, model.pivot, model.scale)
+            or_model.Maximize(instance.or_recipe)
+            solver = cp_model.CpSolver()
+            assert solver.Solve(or_model) == cp_model.OPTIMAL, \
+                f"Recipe {compiled.recipe.code} (guid={guid}) can not be ignited"
+            assert solver.Value(instance.or_recipe) == fits, \
+                f"Recipe {compiled.recipe.code} (guid={guid}) was discarded by mistake"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_objective_bounds(link_durations, guid, inputs):
+    """
+    Solve an instance, then solve it again with the domains of the processes and the bounds
+    of the objetive relaxed. Tightening them must not cut off the optimal program
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    # Dependent processes share the first resource of their recipe, so there are transitions
+    for recipe in data["recipes"]:
+        arcs = recipe.recipeProcesses[0].process.processResources[:1]
+        for relation in recipe.recipeProcesses[1:]:
+            relation.process.processResources = list(relation.process.processResources) + arcs
+
+    for target in ["makespan", "transitions"]:
+        model = make_flowshop_example(data=data)
+        model.recetary = Recetary()
+        model.add_recipes(data["recipes"], locked=True)
+        link_durations(model)
+        model.set_parameters("deterministic", solvertime=30)
+        model.optimize(target)
+        model.run()
+        # Random instances may be infeasible, but not because of the bounds
+        if model.status not in ["OPTIMAL", "INFEASIBLE"]:
+            continue
+
+        relaxed = cp_model.CpModel()
+        relaxed.Proto().CopyFrom(model.model.Proto())
+        variables = relaxed.Proto().variables
+        for networks in model.ignitions.values():
+            for instance in networks:
+                window = [dt.to_int(instance.order.startAt, model.pivot, model.scale),
+                          dt.to_int(instance.order.endAt, model.pivot, model.scale)]
+                for or_tuple in instance.or_vars:
+                    for or_var in [or_tuple.start, or_tuple.end]:
+                        del variables[or_var.Index()].domain[:]
+                        variables[or_var.Index()].domain.extend(window)
+        del variables[model.or_targets[0].Index()].domain[:]
+        variables[model.or_targets[0].Index()].domain.extend([0, 1 << 40])
+
+        solver = cp_model.CpSolver()
+        solver.parameters.num_search_workers = 1
+        solver.parameters.max_time_in_seconds = 30
+        status = solver.StatusName(solver.Solve(relaxed))
+        if model.status == "INFEASIBLE":
+            assert status not in ["FEASIBLE", "OPTIMAL"], \
+                f"Bounds (guid={guid}, target={target}) cut off every program"
+        elif status == "OPTIMAL":
+            assert solver.ObjectiveValue() == model.solver.ObjectiveValue(), \
+                f"Bounds (guid={guid}, target={target}) cut off the optimal program"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_memoized_durations(guid, inputs):
+    """
+    Link a memoized function keyed by material and process. It must be called once per distinct key
+    """
+    calls = []
+
+    def duration(order: Order, process: Process) -> int:
+        calls.append((order.material.code, process.code))
+        return 60
+
+    data = build_models(min_order_extension=100, **inputs)
+    model = make_flowshop_example(data=data)
+    for code in list(model.funbook):
+        model.link_function(duration, code, cache_key=lambda order, process: (
+            order.material.code, process.code))
+    model.run()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+    info = [time.cache_info() for time in model.funbook.values()]
+    assert len(calls) == len(set(calls)) == sum(stats["misses"] for stats in info), \
+        f"Durations (guid={guid}) were calculated more than once"
+    evaluations = sum(instance.template.size
+                      for networks in model.ignitions.values() for instance in networks)
+    assert evaluations == sum(stats["hits"] + stats["misses"] for stats in info), \
+        f"Durations (guid={guid}) were not counted"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_batch_durations(guid, inputs):
+    """
+    Link a vectorized function to every code. It must be called once per code with all the processes
+    """
+    calls = []
+
+    def durations(orders: np.ndarray, processes: np.ndarray) -> np.ndarray:
+        calls.append(len(orders))
+        return np.full(len(orders), 60)
+
+    data = build_models(min_order_extension=100, **inputs)
+    model = make_flowshop_example(data=data)
+    for code in list(model.funbook):
+        model.link_function(durations, code, batch=True)
+    model.run()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+    assert len(calls) <= len(model.funbook), \
+        f"Batch functions (guid={guid}) were called more than once"
+    evaluations = sum(instance.template.size
+                      for networks in model.ignitions.values() for instance in networks)
+    assert sum(calls) == evaluations, \
+        f"Batch functions (guid={guid}) missed some processes"
+    assert all(duration == 60 for networks in model.ignitions.values()
+               for instance in networks for duration in instance.durations), \
+        f"Durations (guid={guid}) were not taken from the batch function"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_parameters(link_durations, guid, inputs):
+    """
+    Solve an instance twice with the deterministic preset. Both programs must be the same
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    programs = []
+    for _ in range(2):
+        model = link_durations(make_flowshop_example(data=data))
+        model.set_parameters("deterministic", solvertime=30)
+        model.optimize("makespan")
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful"
+        assert model.solver.parameters.num_search_workers == 1, \
+            f"Preset (guid={guid}) was not applied"
+        programs.append(sorted((plan.resource.name, plan.startAt, plan.endAt)
+                               for plan in model.result().plans))
+    assert programs[0] == programs[1], \
+        f"Programs (guid={guid}) are not deterministic"
+
+    model.set_parameters("quality")
+    assert model.parameters == dict(DEFAULT_SEARCH, **PRESETS["quality"]), \
+        f"Preset (guid={guid}) kept parameters of the previous preset"
+
+    with pytest.raises(NotImplementedError):
+        model.set_parameters("unknown-preset")
+    with pytest.raises(KeyError):
+        model.set_parameters(unknown=1)
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_solution_callback(guid, inputs):
+    """
+    Stream the solutions of an optimization. Each solution has a program with all the orders
+    and no worse objective
+    """
+    solutions = []
+    data = build_models(min_order_extension=100, **inputs)
+    model = make_flowshop_example(data=data)
+    model.set_solution_callback(solutions.append)
+    model.optimize("makespan")
+    model.run()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+    assert solutions, \
+        f"No solution (guid={guid}) was streamed"
+
+    orders = {order.name for order in model.demand.orders}
+    for prev, solution in zip([None] + solutions, solutions):
+        solved = {plan.toSolve.name for plan in solution.program.plans if plan.toSolve}
+        assert solved == orders, \
+            f"Streamed program (guid={guid}) has orders without plans"
+        assert solution.bound <= solution.objective, \
+            f"Streamed bound (guid={guid}) is greater than the objective"
+        if prev:
+            assert solution.objective <= prev.objective and solution.walltime >= prev.walltime, \
+                f"Streamed solution (guid={guid}) is not an improvement"
+    assert len(model.result().plans) == len(solutions[-1].program.plans), \
+        f"Last streamed program (guid={guid}) is not the result"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_rolling_horizon(link_durations, guid, inputs):
+    """
+    Solve orders released along several weeks window by window. Every order must be
+    scheduled without overlaps
+    """
+    inputs = {**inputs, "num_orders": 20, "order_start_range": (0, 21)}
+    data = build_models(min_order_extension=2, max_order_extension=4, **inputs)
+    model = link_durations(make_flowshop_example(data=data))
+    model.rolling_mode(True, window=timedelta(days=5), step=timedelta(days=2))
+    model.run()
+    program = model.result()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+    solved = {plan.toSolve.name for plan in program.plans if plan.toSolve}
+    assert solved == {order.name for order in model.demand.orders}, \
+        f"Program (guid={guid}) has orders without plans"
+
+    intervals = {}
+    for plan in program.plans:
+        intervals.setdefault(plan.resource.name, []).append((plan.startAt, plan.endAt))
+    for name, items in intervals.items():
+        items.sort()
+        assert all(prev[1] <= next[0] for prev, next in zip(items, items[1:])), \
+            f"Plans (guid={guid}) overlap in resource {name}"
+
+    with pytest.raises(ValueError):
+        model.rolling_mode(True, window=timedelta(days=1), step=timedelta(days=2))
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_lns(guid, inputs):
+    """
+    Improve the first solution of an instance through LNS. Each iteration is logged and the
+    objective never gets worse
+    """
+    logs = []
+    data = build_models(min_order_extension=100, **inputs)
+    model = make_flowshop_example(data=data)
+    model.optimize("makespan")
+    model.set_parameters("fast-feasible")
+    model.lns_mode(True, iterations=6, solvertime=1, log=logs.append)
+    model.run()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+    assert len(logs) <= 6, \
+        f"LNS (guid={guid}) exceeded its iterations"
+    for line in logs:
+        before, after = line.split("objective ")[1].split(" in ")[0].split(" -> ")
+        assert float(after) <= float(before), \
+            f"LNS (guid={guid}) made the objective worse: {line}"
+    solved = {plan.toSolve.name for plan in model.result().plans if plan.toSolve}
+    assert solved == {order.name for order in model.demand.orders}, \
+        f"Program (guid={guid}) has orders without plans"
+    # The solver of the best neighborhood is read like the one of the first solution
+    if model.status in ["FEASIBLE", "OPTIMAL"]:
+        objective = model.solver.ObjectiveValue()
+        assert objective == model.solver.Value(model.or_targets[0]), \
+            f"Objective of LNS (guid={guid}) does not match its makespan"
+        assert model.solver.BestObjectiveBound() <= objective, \
+            f"Bound of LNS (guid={guid}) is above its objective"
+        assert model.solver.WallTime() > 0 and model.solver.parameters.max_time_in_seconds == 10, \
+            f"Solver of LNS (guid={guid}) lost its statistics"
+
+    with pytest.raises(NotImplementedError):
+        model.lns_mode(True, neighborhoods=["unknown"])
+    with pytest.raises(ValueError):
+        model.lns_mode(True, neighborhoods=[])
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_incremental_orders(guid, inputs):
+    """
+    Add a rush order and cancel another one after a run, then solve the same model again
+    """
+    inputs = {**inputs, "num_orders": 6}
+    data = build_models(min_order_extension=100, **inputs)
+    rush = data["demand"].orders.pop()
+    model = make_flowshop_example(data=data)
+    model.optimize("makespan")
+    model.run()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+
+    cancelled = model.demand.orders[0].name
+    model.add_orders([rush])
+    model.remove_orders([cancelled])
+    model.resolve()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful after the changes"
+    solved = {plan.toSolve.name for plan in model.result().plans if plan.toSolve}
+    assert solved == {order.name for order in model.demand.orders}, \
+        f"Program (guid={guid}) does not match the new demand"
+    assert rush.name in solved and cancelled not in solved, \
+        f"Program (guid={guid}) does not reflect the changes"
+
+    with pytest.raises(ValueError):
+        model.add_orders([rush])
+    with pytest.raises(ValueError):
+        model.remove_orders([cancelled])
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_incremental_strength(link_durations, guid, inputs):
+    """
+    Add a copy of an order after a run. Symmetry breaking and redundant constrains must cover it
+    as in a new run
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    twin = deepcopy(data["demand"].orders[0])
+    twin.name, twin.code = f"{twin.name} twin", f"{twin.code} twin"
+    models = []
+    for incremental in [True, False]:
+        model = link_durations(make_flowshop_example(data=data))
+        model.symmetry_mode(True)
+        model.redundant_mode(True, kinds=["energy", "cumulative"])
+        model.optimize("makespan")
+        if incremental:
+            model.run()
+            model.add_orders([twin])
+            model.resolve()
+        else:
+            model.add_orders([twin])
+            model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful"
+        models.append(model)
+
+    incremental, fresh = models
+    assert twin.name in incremental.or_symmetries, \
+        f"Order (guid={guid}) added after the run has no symmetry breaking"
+    assert len(incremental.or_redundancies) == len(fresh.or_redundancies), \
+        f"Orders (guid={guid}) added after the run have no redundant constrains"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_model_cache(link_durations, tmp_path, guid, inputs):
+    """
+    Solve the same inputs twice in caching mode. The second model is rehydrated from disk and
+    gives the same program
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    programs = []
+    for target in ["makespan", "transitions"]:
+        model = link_durations(make_flowshop_example(data=data))
+        model.cache_mode(True, directory=str(tmp_path))
+        model.set_parameters("deterministic", solvertime=30)
+        model.optimize(target)
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful"
+        programs.append(model)
+
+    assert not programs[0].rehydrated and programs[1].rehydrated, \
+        f"Model (guid={guid}) was not rehydrated from the cache"
+    assert len(list(tmp_path.glob("*.json"))) == 1, \
+        f"Model (guid={guid}) was stored more than once"
+    solved = {plan.toSolve.name for plan in programs[1].result().plans if plan.toSolve}
+    assert solved == {order.name for order in programs[1].demand.orders}, \
+        f"Rehydrated program (guid={guid}) has orders without plans"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_corrupt_cache(link_durations, tmp_path, guid, inputs):
+    """
+    Corrupt the stored models and solve again. Corrupt models are a cache miss, they are built
+    and stored again
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    model = make_flowshop_example(data=data)
+    with pytest.raises(ValueError):
+        model.cache_mode(True)
+    # Nothing stored yet, then a corrupt JSON map, an empty one and a corrupt proto
+    for corruption in [None, b"\x80corrupt", b"{}", None]:
+        for stored in tmp_path.iterdir():
+            if stored.suffix == ".pb" or corruption is not None:
+                stored.write_bytes(corruption or b"\x80corrupt")
+        model = link_durations(make_flowshop_example(data=data))
+        model.cache_mode(True, directory=str(tmp_path), limit=1)
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful"
+        assert not model.rehydrated, \
+            f"Corrupt model (guid={guid}) was rehydrated from the cache"
+    assert len(list(tmp_path.glob("*.json"))) == 1, \
+        f"Models (guid={guid}) were not evicted"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_symmetry_breaking(link_durations, guid, inputs):
+    """
+    Solve orders with the same window with and without symmetry breaking. Optimal makespans must
+    be the same and interchangeable orders must come out in the order of their names
+    """
+    inputs = {**inputs, "num_orders": 5}
+    data = build_models(min_order_extension=100, **inputs)
+    first = data["demand"].orders[0]
+    for order in data["demand"].orders:
+        order.startAt, order.endAt = first.startAt, first.endAt
+        order.quantity, order.priority = first.quantity, first.priority
+
+    makespans = []
+    for activated in [False, True]:
+        model = link_durations(make_flowshop_example(data=data))
+        model.symmetry_mode(activated)
+        model.set_parameters("deterministic", solvertime=30)
+        model.optimize("makespan")
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful"
+        makespans.append((model.status, model.solver.ObjectiveValue()))
+
+    materials = [model.ignitions[name][0].order.material.name for name in model.ignitions]
+    assert bool(model.or_symmetries) == (len(materials) > len(set(materials))), \
+        f"Interchangeable orders (guid={guid}) were not ordered"
+    for names in find_interchangeable(model.ignitions):
+        for first, second in zip(names, names[1:]):
+            recipes = [next(k for k, instance in enumerate(model.ignitions[name])
+                            if model.solver.BooleanValue(instance.or_recipe))
+                       for name in (first, second)]
+            assert recipes[0] <= recipes[1], \
+                f"Order {second} (guid={guid}) selected an earlier recipe than {first}"
+            if recipes[0] < recipes[1]:
+                continue
+            prev, post = (model.ignitions[name][recipes[0]] for name in (first, second))
+            if all(prev.template.optional):
+                continue
+            node = prev.template.optional.index(False)
+            assert model.solver.Value(prev.or_vars[node].start) <= \
+                model.solver.Value(post.or_vars[node].start), \
+                f"Order {second} (guid={guid}) starts before {first}"
+    if makespans[0][0] == makespans[1][0] == "OPTIMAL":
+        assert makespans[0] == makespans[1], \
+            f"Symmetry breaking (guid={guid}) changed the optimal makespan"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_redundant_constrains(link_durations, guid, inputs):
+    """
+    Solve an instance with and without redundant constrains. Optimal makespans must be the same
+    and the redundant constrains must be posted in the model
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    makespans = []
+    for activated in [False, True]:
+        model = link_durations(make_flowshop_example(data=data))
+        model.redundant_mode(activated)
+        model.set_parameters("deterministic", solvertime=30)
+        model.optimize("makespan")
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful"
+        makespans.append((model.status, model.solver.ObjectiveValue()))
+
+    # One cumulative per type with many resources, energy bounds are linear constrains
+    groups = defaultdict(set)
+    for networks in model.ignitions.values():
+        for instance in networks:
+            for resource in instance.template.resources:
+                groups[resource.resourceType].add(resource.name)
+    kinds = [model.model.Proto().constraints[index].WhichOneof("constraint")
+             for index in model.or_redundancies]
+    assert kinds.count("cumulative") == sum(len(names) > 1 for names in groups.values()), \
+        f"Cumulative constrains (guid={guid}) were not posted"
+    assert set(kinds) <= {"cumulative", "lin_max", "linear"}, \
+        f"Redundant constrains (guid={guid}) have unexpected constrains"
+    if makespans[0][0] == makespans[1][0] == "OPTIMAL":
+        assert makespans[0] == makespans[1], \
+            f"Redundant constrains (guid={guid}) changed the optimal makespan"
+
+    with pytest.raises(NotImplementedError):
+        model.redundant_mode(True, ["unknown"])
+
+
+@pytest.mark.flowshop
+def test_energy_bound():
+    """
+    Ignite a diamond recipe whose parallel branches are performed in the same resource. The
+    energy bound is only posted if the work of the busiest resource exceeds the critical path,
+    and then it bounds the span of the recipe without the NoOverlap of the resource
+    """
+    pivot = datetime(2021, 1, 1)
+    order = Order(name="diamond", startAt=pivot, endAt=pivot + timedelta(minutes=200))
+    for branch, energy in [("R1", 60), ("R2", 50)]:
+        compiled = compile_recipe(make_diamond(
+            {"a": ["R2"], "b": ["R1"], "c": [branch], "d": ["R2"]}))
+        durations = [{"a": 10, "b": 30, "c": 30, "d": 10}[name] for name in compiled.names]
+        instance = create_recipe_instance(compiled, order, durations)
+        or_model = cp_model.CpModel()
+        ignite_recipe(or_model, instance, pivot, "minutes")
+        add_dependency(or_model, instance)
+        size = len(or_model.Proto().constraints)
+        add_energy_bound(or_model, instance)
+        assert (len(or_model.Proto().constraints) > size) == (branch == "R1"), \
+            f"Energy bound of branches in {branch} was posted by mistake"
+
+        or_model.Add(instance.or_recipe == 1)
+        or_span = or_model.NewIntVar(0, 200, "span")
+        or_model.AddMaxEquality(or_span, [or_tuple.end for or_tuple in instance.or_vars])
+        or_model.Minimize(or_span)
+        solver = cp_model.CpSolver()
+        assert solver.Solve(or_model) == cp_model.OPTIMAL, \
+            "Diamond recipe can not be ignited"
+        assert solver.ObjectiveValue() == energy, \
+            f"Span of branches in {branch} is not bounded by the busiest resource"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_compact_program(link_durations, guid, inputs):
+    """
+    Solve an instance with months of stops in compact mode. Stops add no variables, they are
+    merged into one fixed interval per block inside the window of each resource and no plan
+    overlaps them
+    """
+    inputs = {**inputs, "num_stops": 30, "stop_start_range": (-24 * 60, 24 * 60)}
+    data = build_models(min_order_extension=100, **inputs)
+    sizes = []
+    for stops in [data["stops"], []]:
+        model = link_durations(make_flowshop_example(data={**data, "stops": stops}))
+        model.compact_mode(True)
+        model.optimize("makespan")
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful"
+        sizes.append(len(model.model.Proto().variables))
+        if stops:
+            program = model.result()
+            compacted = model
+
+    assert sizes[0] == sizes[1], \
+        f"Fixed plans (guid={guid}) added variables to the model"
+    # Overlapping or adjacent plans make a single block, blocks out of the window are dropped
+    for name, (lower, upper) in compacted.or_windows.items():
+        blocks = []
+        for start, end in sorted((dt.to_int(plan.startAt, compacted.pivot, compacted.scale),
+                                  dt.to_int(plan.endAt, compacted.pivot, compacted.scale))
+                                 for plan in compacted.out_program.plans
+                                 if plan.resource.name == name):
+            if blocks and start <= blocks[-1][1]:
+                blocks[-1][1] = max(blocks[-1][1], end)
+            else:
+                blocks.append([start, end])
+        inside = [block for block in blocks if max(block[0], lower) < min(block[1], upper)]
+        assert len(compacted.store.tasks(name, kinds=[FIXED])) == len(inside), \
+            f"Fixed plans (guid={guid}) of {name} were not merged into blocks of its window"
+    fixed = [plan for plan in program.plans if plan.stop]
+    for plan in program.plans:
+        if plan.stop:
+            continue
+        for stop in fixed:
+            assert plan.resource.name != stop.resource.name or \
+                plan.endAt <= stop.startAt or stop.endAt <= plan.startAt, \
+                f"Plan (guid={guid}) overlaps a stop in resource {stop.resource.name}"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_changeovers(link_durations, guid, inputs):
+    """
+    Add changeovers between all the materials of the demand. Consecutive plans of different
+    materials in a resource keep the setup time
+    """
+    def setup(prev_order: Order, next_order: Order, changeover: Changeover) -> int:
+        return 45
+
+    data = build_models(min_order_extension=100, **inputs)
+    data["demand"].orders = data["demand"].orders[:2]
+    materials = {order.material.code: order.material for order in data["demand"].orders}
+    processes = {rel.process.code: rel.process
+                 for recipe in data["recipes"] for rel in recipe.recipeProcesses}
+    changeovers = [Changeover(before=before, after=after, process=process,
+                              changeoverFunction=Function(code="setup"))
+                   for before in materials.values() for after in materials.values()
+                   if before is not after for process in processes.values()]
+
+    for sequencing in ["precedence", "circuit"]:
+        model = link_durations(make_flowshop_example(data=data))
+        model.add_changeovers(changeovers)
+        model.set_changeover_function(setup)
+        model.set_sequencing(sequencing)
+        model.optimize("makespan")
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful with {sequencing} sequencing"
+
+        plans = sorted((plan for plan in model.result().plans if plan.toSolve),
+                       key=lambda plan: (plan.resource.name, plan.startAt))
+        for prev, post in zip(plans, plans[1:]):
+            if prev.resource.name != post.resource.name or prev.material.code == post.material.code:
+                continue
+            assert post.startAt - prev.endAt >= timedelta(minutes=45), \
+                f"Plans (guid={guid}) have no setup time in resource {post.resource.name}"
+
+    # Plans of the first order are fixed, the second one keeps the setup after the last of them
+    if len(data["demand"].orders) < 2:
+        return
+    demands = [copy(data["demand"]) for _ in range(2)]
+    for demand, order in zip(demands, data["demand"].orders):
+        demand.orders = [order]
+    demands[1].orders[0].startAt = demands[0].orders[0].startAt
+    model = link_durations(make_flowshop_example(data=data))
+    model.set_demand(demands[0])
+    model.optimize("makespan")
+    model.run()
+    program = model.result()
+    program.plans = [plan for plan in program.plans if not plan.stop]  # Stops are added again
+    model = link_durations(make_flowshop_example(data=data))
+    model.set_program(program)
+    model.set_demand(demands[1])
+    model.add_changeovers(changeovers)
+    model.set_changeover_function(setup)
+    model.optimize("makespan")
+    model.run()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful with fixed plans"
+    last = {}
+    for plan in program.plans:
+        name = plan.resource.name
+        if plan.toSolve and (name not in last or plan.endAt > last[name].endAt):
+            last[name] = plan
+    for plan in model.result().plans[len(program.plans):]:
+        fixed = last.get(plan.resource.name)
+        if fixed is None or plan.startAt < fixed.endAt or fixed.material.code == plan.material.code:
+            continue
+        assert plan.startAt - fixed.endAt >= timedelta(minutes=45), \
+            f"Plans (guid={guid}) have no setup time after fixed plans in {plan.resource.name}"
+
+
+@pytest.mark.flowshop
+def test_precedence_pruning():
+    """
+    Sequence pairs of processes of a resource with setup times. Pairs whose intervals can not
+    overlap get no literal nor constraint, the rest are sequenced
+    """
+    def process(model, lower, upper):
+        or_start = model.NewIntVar(lower, upper, "")
+        or_duration = model.NewIntVar(10, 10, "")
+        or_end = model.NewIntVar(lower, upper + 10, "")
+        or_active = model.NewBoolVar("")
+        return ORTuple(active=or_active, start=or_start, end=or_end, duration=or_duration,
+                       interval=model.NewOptionalIntervalVar(
+                           or_start, or_duration, or_end, or_active, ""))
+
+    # Latest end of the first process and setup time against the earliest start of the second
+    for second, arcs, added in [((100, 110), {(0, 1): 5}, (0, 0)),
+                                ((15, 30), {(0, 1): 5}, (0, 1)),
+                                ((0, 50), {(0, 1): 5, (1, 0): 5}, (1, 2))]:
+        or_model = cp_model.CpModel()
+        or_tuples = [process(or_model, 0, 10), process(or_model, *second)]
+        sizes = len(or_model.Proto().variables), len(or_model.Proto().constraints)
+        add_resource_precedences(or_model, or_tuples, arcs)
+        assert (len(or_model.Proto().variables) - sizes[0],
+                len(or_model.Proto().constraints) - sizes[1]) == added, \
+            f"Processes starting in {second} were not sequenced as expected"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_alternative_resources(link_durations, tmp_path, guid, inputs):
+    """
+    Select a group of optional resources through alternative intervals, also when the model is
+    rehydrated from the cache
+    """
+    groups = [["A", "B"], ["C", "D"], ["E"], ["F"]]
+    data = build_models(min_order_extension=100, **inputs)
+    for with_optional in [True, False]:
+        # The optional order & recipe are appended to the data the first time
+        model = make_flowshop_example(data=data, with_optional=with_optional)
+        if not with_optional:
+            model.add_optionals("TORC-FLWS", "TORC-FLWS", groups)
+        link_durations(model)
+        model.cache_mode(True, directory=str(tmp_path))
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}) was not successful"
+        resources = [plan.resource.name for plan in model.result().plans
+                     if plan.process and plan.process.code == "TORC-FLWS"]
+        assert resources in groups, \
+            f"Program (guid={guid}) did not select a single group of optional resources"
+    assert model.rehydrated, \
+        f"Model (guid={guid}) was not rehydrated from the cache"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_program_values(link_durations, guid, inputs):
+    """
+    Solve an instance with optional groups of resources and read its program. Plans built
+    from all the values at once must match plans built variable by variable
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    model = link_durations(make_flowshop_example(data=data, with_optional=True))
+    model.run()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+
+    expected = []
+    solver = model.solver
+    for networks in model.ignitions.values():
+        for instance in networks:
+            # Processes of inactive recipes have no plans
+            if not solver.BooleanValue(instance.or_recipe):
+                continue
+            compiled = instance.template
+            for node, or_tuple in enumerate(instance.or_vars):
+                if not solver.BooleanValue(or_tuple.active):
+                    continue
+                start, end = dt.to_datetimes(
+                    [solver.Value(or_tuple.start), solver.Value(or_tuple.end)],
+                    model.pivot, model.scale)
+                expected.extend((instance.order.name, compiled.resource_names[r],
+                                 compiled.names[node], instance.recipe.code, start, end)
+                                for r, or_node in instance.node_tuples(node)
+                                if or_node is or_tuple or solver.BooleanValue(or_node.active))
+
+    plans = model.result().plans[len(model.out_program.plans):]
+    assert sorted(expected) == sorted((plan.toSolve.name, plan.resource.name, plan.process.name,
+                                       plan.recipe.code, plan.startAt, plan.endAt)
+                                      for plan in plans), \
+        f"Plans (guid={guid}) do not match the values of their variables"
+    assert any(plan.process.code == "TORC-FLWS" for plan in plans), \
+        f"Program (guid={guid}) has no plans of alternative resources"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_batch_campaigns(guid, inputs):
+    """
+    Duplicate the orders of an instance and solve it in batch mode. Duplicates are merged into
+    campaigns and every order gets its own plans
+    """
+    def duration(order: Order, process: Process) -> int:
+        return 10 + order.quantity
+
+    data = build_models(min_order_extension=100, **inputs)
+    duplicates = []
+    for order in data["demand"].orders:
+        duplicate = deepcopy(order)
+        duplicate.name, duplicate.code = f"{order.name} copy", f"{order.code} copy"
+        duplicates.append(duplicate)
+    data["demand"].orders.extend(duplicates)
+
+    model = make_flowshop_example(data=data)
+    for code in list(model.funbook):
+        model.link_function(duration, code)
+    model.batch_mode(True)
+    model.run()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+    assert len(model.ignitions) <= len(data["demand"].orders) // 2, \
+        f"Orders (guid={guid}) were not merged into campaigns"
+
+    plans = [plan for plan in model.result().plans if plan.toSolve]
+    assert {plan.toSolve.name for plan in plans} == {order.name for order in model.demand.orders}, \
+        f"Program (guid={guid}) has orders without plans"
+    for plan in plans:
+        assert plan.toSolve.startAt - dt.tolerance <= plan.startAt and \
+            plan.endAt <= plan.toSolve.endAt + dt.tolerance, \
+            f"Plan (guid={guid}) is out of the window of its order"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_tight_campaigns(guid, inputs):
+    """
+    Solve two orders of the same material whose windows overlap, but whose intersection is too
+    short for their merged work. They are not merged into a campaign in batch mode
+    """
+    def duration(order: Order, process: Process) -> int:
+        return order.quantity
+
+    data = build_models(min_order_extension=100, **inputs)
+    first = data["demand"].orders[0]
+    first.quantity = 60
+    model = make_flowshop_example(data=data)
+    # Fastest recipe of the order, its processes last the quantity in minutes
+    paths = []
+    for compiled in model.recetary[first.material.name]:
+        instance = create_recipe_instance(compiled, first, [60] * compiled.size)
+        paths.append(max(head + duration + tail for head, duration, tail
+                         in zip(instance.heads, instance.durations, instance.tails)))
+    path = min(paths)
+    second = deepcopy(first)
+    second.name, second.code = f"{first.name} copy", f"{first.code} copy"
+    first.endAt = first.startAt + timedelta(minutes=path * 3 // 2)
+    second.startAt = first.startAt + timedelta(minutes=path)
+    second.endAt = second.startAt + timedelta(minutes=path * 3 // 2)
+    data["demand"].orders = [first, second]
+
+    statuses = []
+    for batching in [False, True]:
+        model = make_flowshop_example(data=data)
+        for code in list(model.funbook):
+            model.link_function(duration, code)
+        model.batch_mode(batching)
+        model.run()
+        statuses.append(model.status)
+    assert not model.campaigns and len(model.ignitions) == 2, \
+        f"Orders (guid={guid}) were merged into a campaign that does not fit"
+    assert statuses[0] == statuses[1], \
+        f"Batch mode (guid={guid}) changed the status of the program"
+
+    # Orders without quantity or priority count as zero
+    first.quantity = first.priority = None
+    campaign = create_campaign([first, second])
+    assert campaign.quantity == second.quantity and campaign.priority == (second.priority or 0), \
+        f"Campaign (guid={guid}) of orders without quantity or priority was not created"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_due_dates(link_durations, guid, inputs):
+    """
+    Shrink the windows of the orders so they can not be met and optimize the objetives of due
+    dates with soft windows. Every order must be scheduled and the objetive must match the
+    weighted deviations of the completions of the orders
+    """
+    for target in ["tardiness", "earliness", "completion"]:
+        data = build_models(min_order_extension=100, **inputs)
+        for order in data["demand"].orders:
+            order.endAt = order.startAt + timedelta(minutes=1)
+
+        model = link_durations(make_flowshop_example(data=data))
+        model.soft_mode(True)
+        model.set_parameters("deterministic", solvertime=30)
+        model.optimize(target)
+        model.run()
+        assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+            f"Program (guid={guid}, target={target}) was not successful"
+        if target == "tardiness":
+            assert model.solver.ObjectiveValue() > 0, \
+                f"Program (guid={guid}) met windows that can not be met"
+
+        # Completion is the latest end of the mandatory final processes of the selected recipe
+        expected = 0
+        for networks in model.ignitions.values():
+            instance = next(instance for instance in networks
+                            if model.solver.BooleanValue(instance.or_recipe))
+            compiled = instance.template
+            ends = [model.solver.Value(instance.or_vars[node].end) for node in range(compiled.size)
+                    if not compiled.optional[node] and
+                    compiled.succ_indptr[node] == compiled.succ_indptr[node + 1]]
+            if not ends:
+                continue
+            due = dt.to_int(instance.order.endAt, model.pivot, model.scale)
+            deviation = {"tardiness": max(max(ends) - due, 0),
+                         "earliness": max(due - max(ends), 0),
+                         "completion": max(ends)}[target]
+            expected += max(instance.order.priority or 0, 1) * deviation
+        assert model.solver.ObjectiveValue() == expected, \
+            f"Program (guid={guid}, target={target}) does not match its weighted {target}"
+
+        planned = {plan.toSolve.name for plan in model.result().plans if plan.toSolve}
+        assert planned == {order.name for order in model.demand.orders}, \
+            f"Program (guid={guid}, target={target}) has orders without plans"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_lexicographic(link_durations, guid, inputs):
+    """
+    Optimize the makespan and then the completion of the orders in lexicographic mode. The
+    makespan must be the same as optimizing it alone
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    values = []
+    for targets in [["makespan"], ["makespan", "completion"]]:
+        model = link_durations(make_flowshop_example(data=data))
+        model.lexicographic_mode(True)
+        model.set_parameters("deterministic", solvertime=30)
+        for target in targets:
+            model.optimize(target)
+        model.run()
+        assert model.status == "OPTIMAL", \
+            f"Program (guid={guid}, targets={targets}) was not optimal"
+        values.append(model.solver.Value(model.or_targets[0]))
+
+    assert len(model.or_bounds) == 1, f"Program (guid={guid}) was not solved in stages"
+    assert values[0] == values[1], f"Program (guid={guid}) lost the optimal makespan"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_scenarios(link_durations, guid, inputs):
+    """
+    Solve what-if variants of an instance in a process pool. Each row of the comparison table
+    must match solving its variant alone, also in decomposition mode
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    orders = data["demand"].orders
+    scenarios = [
+        Scenario("base"),
+        Scenario("cut", cuts=[orders[0].name]),
+        Scenario("later", pivot=data["demand"].startAt - timedelta(days=1),
+                 parameters={"solvertime": 10}),
+    ]
+
+    model = link_durations(make_flowshop_example(data=data))
+    model.optimize("makespan")
+    rows = model.run_scenarios(scenarios, workers=2)
+    assert [row["scenario"] for row in rows] == ["base", "cut", "later"], \
+        f"Comparison table (guid={guid}) lost some scenarios"
+
+    model.run()
+    assert rows[0]["status"] == model.status, f"Scenario (guid={guid}) is not the base model"
+    if model.status == "OPTIMAL":
+        assert rows[0]["objetives"] == {"makespan": model.solver.ObjectiveValue()}, \
+            f"Scenario (guid={guid}) did not reach the optimum of the base model"
+    assert rows[1]["orders"] <= len(orders) - 1, f"Scenario (guid={guid}) did not cut the demand"
+
+    # Two independent copies of the instance are decomposed, their rows merge the components
+    extra = build_models(min_order_extension=100, **inputs)
+    data["demand"].orders.extend(extra["demand"].orders)
+    data["recipes"].extend(extra["recipes"])
+    data["stops"].extend(extra["stops"])
+    model = link_durations(make_flowshop_example(data=data))
+    model.decomposition_mode(True, workers=2)
+    model.set_parameters("deterministic", solvertime=30)
+    model.optimize("makespan")
+    model.optimize("transitions")
+    row, = model.run_scenarios([Scenario("base")], workers=1)
+    model.run()
+    assert row["status"] == model.status and model.components, \
+        f"Scenario (guid={guid}) was not solved in decomposition mode"
+    if model.status in ["FEASIBLE", "OPTIMAL"]:
+        planned = {plan.toSolve.name for plan in model.result().plans if plan.toSolve}
+        assert row["orders"] == len(planned) == len(model.demand.orders), \
+            f"Scenario (guid={guid}) did not count the orders of its components"
+    if model.status == "OPTIMAL":
+        makespans, transitions = zip(*(
+            [component.solver.Value(or_target) for or_target in component.or_targets]
+            for component in model.components))
+        assert row["objetives"] == {"makespan": max(makespans),
+                                    "transitions": sum(transitions)}, \
+            f"Scenario (guid={guid}) did not merge the objetives of its components"
+
+    model.rolling_mode(True)
+    with pytest.raises(NotImplementedError):
+        model.run_scenarios([Scenario("base")])
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_variable_store(guid, inputs):
+    """
+    Build an instance with transitions and add an order afterwards. Transitions never end up
+    among the processes of a resource and every interval is in the NoOverlap of its resource
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    extra = deepcopy(data["demand"].orders[0])
+    extra.name, extra.code = f"{extra.name} copy", f"{extra.code} copy"
+    # Dependent processes share the first resource of their recipe
+    for recipe in data["recipes"]:
+        arcs = recipe.recipeProcesses[0].process.processResources[:1]
+        for relation in recipe.recipeProcesses[1:]:
+            relation.process.processResources = list(relation.process.processResources) + arcs
+
+    model = make_flowshop_example(data=data)
+    model.recetary = Recetary()
+    model.add_recipes(data["recipes"], locked=True)
+    model.optimize("makespan")
+    model.run()
+    model.add_orders([extra])
+
+    proto, store = model.model.Proto(), model.store
+    transitions = {or_tuple.interval.Index() for networks in model.ignitions.values()
+                   for instance in networks for or_tuple in instance.or_trans.values()}
+    for name in store.names():
+        processes = set(store.column(INTERVAL, store.tasks(name, kinds=[PROCESS])))
+        trans = set(store.column(INTERVAL, store.tasks(name, kinds=[TRANSITION])))
+        assert not processes & trans, \
+            f"Transitions (guid={guid}) of {name} are among its processes"
+        assert trans <= transitions, \
+            f"Transitions (guid={guid}) of {name} are not transitions of its instances"
+        intervals = set(store.column(INTERVAL, store.tasks(name)))
+        if intervals:
+            overlap = proto.constraints[model.or_overlaps[name]].no_overlap
+            assert intervals <= set(overlap.intervals), \
+                f"Intervals (guid={guid}) of {name} are out of its NoOverlap"
+    assert transitions <= set(store.column(INTERVAL, store.tasks(kinds=[TRANSITION]))), \
+        f"Transitions (guid={guid}) are missing from the store"
+
+
+@pytest.mark.flowshop
+@pytest.mark.parametrize(["guid", "inputs"], cases.items())
+def test_decomposition(guid, inputs):
+    """
+    Join two independent instances into one and solve it in decomposition mode.
+    Every order must be scheduled
+    """
+    data = build_models(min_order_extension=100, **inputs)
+    extra = build_models(min_order_extension=100, **inputs)
+    data["demand"].orders.extend(extra["demand"].orders)
+    data["recipes"].extend(extra["recipes"])
+    data["stops"].extend(extra["stops"])
+
+    model = make_flowshop_example(data=data)
+    assert len(find_components(model.demand.orders, model.recetary)) > 1, \
+        f"Instance (guid={guid}) was not decomposed"
+    model.decomposition_mode(True, workers=2)
+    model.optimize("makespan")
+    model.run()
+    program = model.result()
+    assert model.status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
+        f"Program (guid={guid}) was not successful"
+    solved = {plan.toSolve.name for plan in program.plans if plan.toSolve}
+    assert solved == {order.name for order in model.demand.orders}, \
+        f"Program (guid={guid}) has orders without plans"
+    # Solvers of the components are read as the solver of a single model
+    for component in model.components:
+        solver = component.solver
+        assert solver.BestObjectiveBound() <= solver.ObjectiveValue() and solver.WallTime() >= 0, \
+            f"Solver of a component (guid={guid}) can not be read"
+        assert solver.parameters.num_search_workers >= 1, \
+            f"Solver of a component (guid={guid}) lost its parameters"
+    with pytest.raises(NotImplementedError):
+        model.resolve()
+
+    # Running again must not solve nor merge the components of the first run
+    for decompose in [True, False]:
+        model.decomposition_mode(decompose, workers=2)
+        model.set_parameters(solvertime=30)
+        model.run()
+        plans = [plan for plan in model.result().plans if plan.toSolve]
+        tasks = {(plan.toSolve.name, plan.process.name, plan.resource.name) for plan in plans}
+        recipes = {(plan.toSolve.name, plan.recipe.code) for plan in plans}
+        assert len(tasks) == len(plans) and len(recipes) == len(model.demand.orders), \
+            f"Program (guid={guid}) kept plans of a previous run"
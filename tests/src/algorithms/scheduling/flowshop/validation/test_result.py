@@ -112,14 +112,14 @@ def test_optional_resources(flowshop_result: Callable, guid: int, inputs: dict[s
         guid (int): Parameter for recognize a specific flowshop model
         inputs (dict[str, int]): Parameters for randomly create input data
     """
-    program, status = flowshop_result(guid, **inputs)
+    program, status = flowshop_result(f"{guid}-optional", with_optional=True, **inputs)
 
     assert status not in ["MODEL_INVALID", "INFEASIBLE", "UNKNOWN"], \
         f"Program (guid={guid}) was not successful"
 
     code = "TORC-FLWS"
     plans_by_process = ph.filter_(program.plans,
-                                  lambda plan: plan.process.name == code)
+                                  lambda plan: plan.process and plan.process.name == code)
     optional_resource_names = [plan.resource.name for plan in plans_by_process]
 
     assert optional_resource_names in [["A", "B"], ["C", "D"], ["E"], ["F"]], \
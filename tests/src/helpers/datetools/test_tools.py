@@ -1,6 +1,6 @@
 import pytest
 from datetime import datetime, timedelta
-from dandori.helpers.datetools import to_int, to_iso8601, is_intersected
+from dandori.helpers.datetools import to_int, to_datetimes, to_iso8601, is_intersected
 from dandori.models import Demand
 from tests.fixtures import random_datetime
 
@@ -41,6 +41,15 @@ def test_to_int_days(days):
         "Funcion de to_int no esta regresando el valor correcto"
 
 
+@pytest.mark.parametrize("scale", ["seconds", "minutes", "hours", "days"])
+def test_to_datetimes(scale):
+    a = datetime.now()
+    offsets = [0, 1.5, 2.0, 1000]
+    expected = [a + timedelta(**{scale: offset}) for offset in offsets]
+    assert to_datetimes(offsets, pivot=a, scale=scale) == expected, \
+        "Funcion de to_datetimes no esta regresando el valor correcto"
+
+
 @pytest.mark.parametrize("scale", ["calabaza", "Seconds", "ora", "ano"])
 def test_to_int_scale_exception(scale):
     a = datetime.now()